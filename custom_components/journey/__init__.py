@@ -6,23 +6,41 @@ https://github.com/intrinseca/journey
 
 import asyncio
 import logging
+import time
+from datetime import timedelta
+from functools import partial
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import HomeAssistant, callback
 from homeassistant.core_config import Config
+from homeassistant.exceptions import ConfigEntryError
 from homeassistant.helpers import config_validation as cv
 
-from .api import ApiClient, GoogleMapsApiClient, HereMapsApiClient
 from .const import (
     CONF_API_TOKEN,
-    CONF_DESTINATION,
+    CONF_DEPARTURE_CALENDAR,
+    CONF_DEPARTURE_WINDOWS,
+    CONF_MOVEMENT_THRESHOLD,
     CONF_ORIGIN,
+    CONF_ROUTE_GEOMETRY,
+    CONF_SECONDARY_API,
+    CONF_SECONDARY_API_TOKEN,
     CONF_SELECTED_API,
     CONF_SELECTED_API_GOOGLE,
+    DEFAULT_MOVEMENT_THRESHOLD,
+    DEFAULT_STARTUP_STAGGER,
     DOMAIN,
     PLATFORMS,
 )
 from .coordinator import JourneyDataUpdateCoordinator
+from .failover import FailoverApiClient
+from .helpers import async_get_resolver, get_entry_destinations
+from .history import ProfileApiClient, async_get_history
+from .hub import async_get_hub
+from .registry import async_get_registry, get_entry_provider
+from .scheduler import DepartureWindow
+from .services import async_setup_services
+from .store import async_get_store
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -31,33 +49,108 @@ CONFIG_SCHEMA = cv.config_entry_only_config_schema(DOMAIN)
 
 # pylint: disable=unused-argument
 async def async_setup(hass: HomeAssistant, config: Config):
-    """Set up this integration using YAML is not supported."""
+    """Set up the service actions; YAML configuration is not supported."""
+    async_setup_services(hass)
     return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Set up this integration using UI."""
+    start = time.perf_counter()
     if hass.data.get(DOMAIN) is None:
         hass.data.setdefault(DOMAIN, {})
 
-    client: ApiClient
-    if entry.data.get(CONF_SELECTED_API) == CONF_SELECTED_API_GOOGLE:
-        client = GoogleMapsApiClient(entry.data[CONF_API_TOKEN])
-    else:
-        client = HereMapsApiClient(entry.data[CONF_API_TOKEN])
+    store = await async_get_store(hass)
+    registry = async_get_registry(hass)
+    provider = get_entry_provider(entry)
+    token = entry.data[CONF_API_TOKEN]
+
+    # Shared clients are released as the entry unloads, or if setup fails
+    shared = await registry.async_acquire(provider, token)
+    store.async_add_cache(provider, shared.cache)
+
+    async def release() -> None:
+        await registry.async_release(provider, token)
+        if registry.cache(provider, token) is not shared.cache:
+            # That was the last user, so keep what its cache held
+            store.async_remove_cache(provider, shared.cache)
+
+    entry.async_on_unload(release)
+    client = shared.client
+
+    # With a second provider configured, requests fail over and are hedged
+    if (secondary := entry.data.get(CONF_SECONDARY_API)) is not None:
+        secondary_token = entry.data[CONF_SECONDARY_API_TOKEN]
+        fallback = await registry.async_acquire(secondary, secondary_token)
+        entry.async_on_unload(
+            partial(registry.async_release, secondary, secondary_token)
+        )
+        client = FailoverApiClient(
+            client, fallback.client, shared.health, fallback.health
+        )
+
+    # Quiet times of the week are answered from the route's typical profile
+    client = ProfileApiClient(client, await async_get_history(hass), provider)
+
+    # Entries on one token poll at evenly spread points of their interval
+    phase = shared.phases.acquire(entry.entry_id)
+    entry.async_on_unload(lambda: shared.phases.release(entry.entry_id))
+
+    resolver = async_get_resolver(hass)
+    entry.async_on_unload(resolver.async_add_user(entry.entry_id))
+
+    try:
+        departure_windows = [
+            DepartureWindow.parse(window)
+            for window in entry.data.get(CONF_DEPARTURE_WINDOWS, [])
+        ]
+    except ValueError as ex:
+        raise ConfigEntryError(str(ex)) from ex
 
     coordinator = JourneyDataUpdateCoordinator(
         hass,
         client=client,
         origin=entry.data[CONF_ORIGIN],
-        destination=entry.data[CONF_DESTINATION],
+        destinations=get_entry_destinations(entry),
+        budget=shared.budget,
+        movement_threshold=entry.data.get(
+            CONF_MOVEMENT_THRESHOLD, DEFAULT_MOVEMENT_THRESHOLD
+        ),
+        resolver=resolver,
+        hub=async_get_hub(hass),
+        phase=phase,
+        departure_windows=departure_windows,
+        departure_calendar=entry.data.get(CONF_DEPARTURE_CALENDAR),
+        geocoder=shared.geocoder,
+        router=registry.router(provider, token)
+        if entry.data.get(CONF_ROUTE_GEOMETRY)
+        else None,
+    )
+
+    # Show the last journeys straight away, and spread the first refreshes out
+    # rather than sending every entry's requests at once. Nothing here waits
+    # on the network, so setup completes without the first refresh.
+    journeys, age = store.async_get_journeys(entry.entry_id)
+    coordinator.async_restore(
+        journeys, timedelta(seconds=phase * DEFAULT_STARTUP_STAGGER), age
     )
+    _LOGGER.debug("Restored %d journeys, %.0f s old", len(journeys), age)
+
+    @callback
+    def save_journeys() -> None:
+        if coordinator.data:
+            store.async_set_journeys(entry.entry_id, coordinator.data)
+
+    entry.async_on_unload(coordinator.async_add_listener(save_journeys))
 
     hass.data[DOMAIN][entry.entry_id] = coordinator
 
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
-    entry.add_update_listener(async_reload_entry)
+    entry.async_on_unload(entry.add_update_listener(async_reload_entry))
+
+    coordinator.metrics.setup_time = time.perf_counter() - start
+    _LOGGER.debug("Set up %s in %.3f s", entry.title, coordinator.metrics.setup_time)
     return True
 
 
@@ -103,12 +196,21 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         )
     )
     if unloaded:
-        hass.data[DOMAIN].pop(entry.entry_id)
+        coordinator = hass.data[DOMAIN].pop(entry.entry_id)
+        await coordinator.async_shutdown()
 
     return unloaded
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Forget the saved journeys of a deleted entry."""
+    (await async_get_store(hass)).async_remove_journeys(entry.entry_id)
+
+
 async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
-    """Reload config entry."""
-    await async_unload_entry(hass, entry)
-    await async_setup_entry(hass, entry)
+    """Reload config entry.
+
+    Going through the config entries manager runs the entry's unload callbacks,
+    so the listeners of the old setup are gone before the new one starts.
+    """
+    await hass.config_entries.async_reload(entry.entry_id)
@@ -1,19 +1,16 @@
-"""Sample API Client."""
+"""Common interface, results and errors of the travel time APIs."""
 
-import asyncio
-import json
-import logging
 import math
 import typing
 from dataclasses import dataclass
-from datetime import datetime
 
-from googlemaps import Client
-from here_location_services import LS
+from .geometry import RouteGeometry
 
 TIMEOUT = 10
 
-_LOGGER: logging.Logger = logging.getLogger(__package__)
+# Known-good route used to check credentials
+TEST_ORIGIN = (51.478, 0)
+TEST_DESTINATION = (51.748, 0.02)
 
 
 @dataclass
@@ -54,10 +51,10 @@ class TravelTimeData:
 
     @property
     def delay_factor(self):
-        """Get the delay to the journey as a percentage."""
+        """Get the delay to the journey as a percentage, or 0 if it is unknown."""
         return (
             round(100 * self.delay / self.travel_time_secs)
-            if self.travel_time_secs > 0
+            if self.travel_time_secs > 0 and not math.isnan(self.delay)
             else 0
         )
 
@@ -65,16 +62,47 @@ class TravelTimeData:
 class TravelTimeApiError(Exception):
     """Exception raised when API returns an error."""
 
-    pass
+    def __init__(self, message: str, retry_after: float | None = None) -> None:
+        """Initialise the error, optionally with when to try again in seconds."""
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TransientApiError(TravelTimeApiError):
+    """The provider failed in a way that may clear up by itself."""
+
+
+class QuotaExceededError(TravelTimeApiError):
+    """The token has used up its request allowance."""
+
+
+class AuthenticationError(TravelTimeApiError):
+    """The token was rejected."""
+
+
+class LocationNotFoundError(TravelTimeApiError):
+    """An address could not be found."""
+
+
+def http_error(
+    provider: str, status: int, message: str | None, retry_after: str | None
+) -> TravelTimeApiError:
+    """Get the error for a failed HTTP response."""
+    text = f"{provider} returned status {status}: {message}"
+    if status == 429:
+        return QuotaExceededError(
+            text, float(retry_after) if retry_after and retry_after.isdigit() else None
+        )
+    if status in (401, 403):
+        return AuthenticationError(text)
+    if status >= 500:
+        return TransientApiError(text)
+    return TravelTimeApiError(text)
 
 
 class ApiClient(typing.Protocol):
     """Interface for Travel Time APIs."""
 
-    def get_traveltime(self, origin: str, destination: str) -> TravelTimeData:
-        """Get travel time now from origin to destination."""
-        ...
-
     async def async_get_traveltime(
         self, origin: str, destination: str
     ) -> TravelTimeData:
@@ -86,104 +114,40 @@ class ApiClient(typing.Protocol):
         ...
 
 
-class GoogleMapsApiClient(ApiClient):
-    """API client for the Google Travel Time API."""
+class Geocoder(typing.Protocol):
+    """Interface for APIs that can turn an address into coordinates."""
 
-    def __init__(self, gmaps_token: str) -> None:
-        """Initialise the API client."""
-        self._gmaps_token = gmaps_token
-        self._gmaps_client = Client(gmaps_token, timeout=TIMEOUT)
+    async def async_geocode(self, address: str) -> str:
+        """Get the 'lat,long' coordinates of an address (async)."""
+        ...
 
-    def get_traveltime(self, origin: str, destination: str) -> TravelTimeData:
-        """Get the travel time from origin to destination using Google Maps."""
 
-        result = self._gmaps_client.distance_matrix(
-            origins=[origin],
-            destinations=[destination],
-            mode="driving",
-            departure_time=datetime.now(),
-        )
+@typing.runtime_checkable
+class Router(typing.Protocol):
+    """Interface for APIs that can return the shape of a route."""
 
-        _LOGGER.debug("Raw Google response: %s", json.dumps(result))
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get travel time now from origin to destination, and the route (async)."""
+        ...
 
-        status = result["rows"][0]["elements"][0]["status"]
-        if status != "OK":
-            raise TravelTimeApiError(f"Google returned status {status}")
 
-        return TravelTimeData(
-            result["rows"][0]["elements"][0]["duration"]["value"],
-            result["rows"][0]["elements"][0]["duration_in_traffic"]["value"],
-            result["rows"][0]["elements"][0]["distance"]["value"],
-        )
+class MatrixApiClient(ApiClient, typing.Protocol):
+    """Interface for Travel Time APIs that can answer many pairs in one request."""
 
-    async def async_get_traveltime(
-        self, origin: str, destination: str
-    ) -> TravelTimeData:
-        """Get the travel time from origin to destination using Google Maps."""
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self.get_traveltime, origin, destination
-        )
+    async def async_get_traveltime_matrix(
+        self, origins: list[str], destinations: list[str]
+    ) -> list[list[TravelTimeData | TravelTimeApiError]]:
+        """Get travel times now between every origin and destination (async)."""
+        ...
 
-    async def test_credentials(self) -> bool:
-        """Check the Google Maps API credentials."""
-
-        def test_api() -> bool:
-            try:
-                self._gmaps_client.distance_matrix(
-                    origins=[(51.478, 0)], destinations=[(51.748, 0.02)], mode="driving"
-                )
-                return True
-            except Exception as ex:
-                _LOGGER.error("Failed to validate credentials - %s", ex)
-                raise
-
-        return await asyncio.get_event_loop().run_in_executor(None, test_api)
-
-
-class HereMapsApiClient(ApiClient):
-    """API client for the HERE Maps Routing Time API."""
-
-    def __init__(self, here_token: str) -> None:
-        """Initialise the API client."""
-        self._here_token = here_token
-        self._here_client = LS(api_key=here_token)
-
-    def get_traveltime(self, origin: str, destination: str) -> TravelTimeData:
-        """Get the travel time from origin to destination using Google Maps."""
-        origin_split = [float(x) for x in origin.split(",")]
-        destination_split = [float(x) for x in destination.split(",")]
-
-        result = self._here_client.car_route(
-            origin=origin_split,
-            destination=destination_split,
-            return_results=["summary", "typicalDuration"],
-        )
 
-        return TravelTimeData(
-            result.routes[0]["sections"][0]["summary"]["typicalDuration"],
-            result.routes[0]["sections"][0]["summary"]["duration"],
-            result.routes[0]["sections"][0]["summary"]["length"],
-        )
+def split_coords(coords: str) -> list[float]:
+    """Convert a 'lat,long' string to a list of floats."""
+    return [float(x) for x in coords.split(",")]
 
-    async def async_get_traveltime(
-        self, origin: str, destination: str
-    ) -> TravelTimeData:
-        """Get the travel time from origin to destination using Google Maps."""
-        return await asyncio.get_event_loop().run_in_executor(
-            None, self.get_traveltime, origin, destination
-        )
 
-    async def test_credentials(self) -> bool:
-        """Check the HERE API credentials."""
-
-        def test_api() -> bool:
-            try:
-                self._here_client.car_route(
-                    origin=(51.478, 0), destination=(51.748, 0.02)
-                )
-                return True
-            except Exception as ex:
-                _LOGGER.error("Failed to validate credentials - %s", ex)
-                raise
-
-        return await asyncio.get_event_loop().run_in_executor(None, test_api)
+def join_coords(coords: typing.Iterable[float]) -> str:
+    """Convert a coordinate pair to a 'lat,long' string."""
+    return ",".join(str(x) for x in coords)
@@ -0,0 +1,209 @@
+"""Classification of errors and backoff after them."""
+
+import logging
+import random
+import time
+from collections import Counter
+from collections.abc import Coroutine
+from enum import StrEnum
+from typing import Any, TypeVar
+
+from .api import (
+    ApiClient,
+    AuthenticationError,
+    Geocoder,
+    LocationNotFoundError,
+    QuotaExceededError,
+    Router,
+    TransientApiError,
+    TravelTimeApiError,
+    TravelTimeData,
+)
+from .geometry import RouteGeometry
+from .helpers import FindCoordinatesError
+
+# Random spread applied to each delay, as a fraction of it
+JITTER = 0.1
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+_T = TypeVar("_T")
+
+
+class ErrorClass(StrEnum):
+    """Kinds of failure, each with its own backoff schedule."""
+
+    TRANSIENT = "transient"
+    QUOTA = "quota"
+    AUTH = "auth"
+    LOCATION = "location"
+
+
+# First and longest delay of each class, in seconds
+SCHEDULES: dict[ErrorClass, tuple[float, float]] = {
+    ErrorClass.TRANSIENT: (30, 900),
+    ErrorClass.QUOTA: (300, 3600),
+    ErrorClass.AUTH: (3600, 86400),
+    ErrorClass.LOCATION: (60, 1800),
+}
+
+# Consecutive failures of each class before a token stops sending requests.
+# Quota and auth errors affect every user of a token, so one is enough; a
+# transient error may just be one bad request. Location errors are about one
+# place, not the token, so they never stop it.
+TOKEN_THRESHOLDS: dict[ErrorClass, int] = {
+    ErrorClass.TRANSIENT: 3,
+    ErrorClass.QUOTA: 1,
+    ErrorClass.AUTH: 1,
+}
+
+_ERRORS: dict[ErrorClass, type[TravelTimeApiError]] = {
+    ErrorClass.TRANSIENT: TransientApiError,
+    ErrorClass.QUOTA: QuotaExceededError,
+    ErrorClass.AUTH: AuthenticationError,
+}
+
+
+def classify(ex: BaseException) -> ErrorClass:
+    """Get the class of an error, treating anything unrecognised as transient."""
+    if isinstance(ex, QuotaExceededError):
+        return ErrorClass.QUOTA
+    if isinstance(ex, AuthenticationError):
+        return ErrorClass.AUTH
+    if isinstance(ex, FindCoordinatesError | LocationNotFoundError):
+        return ErrorClass.LOCATION
+    return ErrorClass.TRANSIENT
+
+
+class Backoff:
+    """Exponential backoff, tracked separately for each class of error.
+
+    Repeated failures of a class double its delay, up to the schedule's
+    maximum. A delay given by the provider (e.g. a quota reset time) is used
+    when longer. Any success resets everything.
+    """
+
+    def __init__(self, thresholds: dict[ErrorClass, int] | None = None) -> None:
+        """Initialise the backoff, inactive."""
+        self.thresholds = thresholds or {}
+        self.failures: Counter[ErrorClass] = Counter()
+        self.error_class: ErrorClass | None = None
+        self._until = 0.0
+
+    @property
+    def remaining(self) -> float:
+        """Get the seconds left to wait, or zero if requests may be sent."""
+        return max(0.0, self._until - time.monotonic())
+
+    def record_failure(
+        self, error_class: ErrorClass, retry_after: float | None = None
+    ) -> float:
+        """Count a failure, returning how long to wait before trying again."""
+        self.failures[error_class] += 1
+        if self.failures[error_class] < self.thresholds.get(error_class, 1):
+            return 0.0
+
+        first, longest = SCHEDULES[error_class]
+        delay = min(first * 2 ** (self.failures[error_class] - 1), longest)
+        delay *= random.uniform(1 - JITTER, 1 + JITTER)
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        self.error_class = error_class
+        self._until = max(self._until, time.monotonic() + delay)
+        return self.remaining
+
+    def record_success(self) -> None:
+        """Reset the backoff."""
+        self.failures.clear()
+        self.error_class = None
+        self._until = 0.0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the backoff."""
+        return {
+            "error_class": self.error_class,
+            "remaining": self.remaining,
+            "failures": dict(self.failures),
+        }
+
+
+class BackoffApiClient(ApiClient):
+    """Wraps a token's client, stopping requests while the token backs off.
+
+    Requests made meanwhile fail straight away with an error of the class that
+    started the backoff, carrying the time left in retry_after, so every entry
+    on the token waits until then too. Route and geocoding requests, if the
+    provider can answer them, go through the same gate.
+    """
+
+    def __init__(
+        self,
+        client: ApiClient,
+        router: Router | None = None,
+        geocoder: Geocoder | None = None,
+    ) -> None:
+        """Initialise the client."""
+        self._client = client
+        self.router = router
+        self.geocoder = geocoder
+        self.backoff = Backoff(TOKEN_THRESHOLDS)
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination unless backing off."""
+        return await self._async_gated(
+            self._client.async_get_traveltime(origin, destination)
+        )
+
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get travel time and route from origin to destination unless backing off."""
+        if self.router is None:
+            raise TravelTimeApiError("Provider does not return routes")
+
+        return await self._async_gated(self.router.async_get_route(origin, destination))
+
+    async def async_geocode(self, address: str) -> str:
+        """Get the coordinates of an address unless backing off."""
+        if self.geocoder is None:
+            raise TravelTimeApiError("Provider does not geocode addresses")
+
+        return await self._async_gated(self.geocoder.async_geocode(address))
+
+    async def _async_gated(self, request: Coroutine[Any, Any, _T]) -> _T:
+        if (remaining := self.backoff.remaining) > 0 and self.backoff.error_class:
+            request.close()
+            raise _ERRORS[self.backoff.error_class](
+                f"Token is backing off after {self.backoff.error_class} errors",
+                remaining,
+            )
+
+        try:
+            result = await request
+        except Exception as ex:
+            error_class = classify(ex)
+            if type(ex) is TravelTimeApiError or error_class not in TOKEN_THRESHOLDS:
+                # e.g. no route between two points or an unknown address,
+                # which say nothing about the token
+                raise
+
+            if delay := self.backoff.record_failure(
+                error_class, getattr(ex, "retry_after", None)
+            ):
+                _LOGGER.warning(
+                    "Pausing requests on token for %.0f s after %s error: %s",
+                    delay,
+                    error_class,
+                    ex,
+                )
+            raise
+
+        self.backoff.record_success()
+        return result
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
@@ -0,0 +1,177 @@
+"""Batching of travel time requests into Distance Matrix calls."""
+
+import asyncio
+import logging
+from collections import defaultdict
+from collections.abc import Hashable
+from dataclasses import dataclass, field
+
+from .api import ApiClient, MatrixApiClient, TravelTimeApiError, TravelTimeData
+from .metrics import JourneyMetrics
+from .ratelimit import REQUEST_KEY, REQUEST_METRICS, REQUEST_PRIORITY
+
+# Limits of the Distance Matrix API for a single request
+MAX_ORIGINS = 25
+MAX_DESTINATIONS = 25
+MAX_ELEMENTS = 100
+
+# How long to wait for other requests before sending a batch
+BATCH_WINDOW = 0.5
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass
+class _Request:
+    origin: str
+    destination: str
+    priority: int
+    metrics: JourneyMetrics | None = None
+    future: asyncio.Future[TravelTimeData] = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+def plan_batches(requests: list[_Request]) -> list[list[_Request]]:
+    """Split pending requests into matrix-sized batches.
+
+    Distance Matrix calls are billed per element, so every batch is a single row
+    (one origin, many destinations) or a single column (many origins, one
+    destination). This avoids paying for the cross pairs nobody asked for.
+    """
+    batches: list[list[_Request]] = []
+
+    by_destination: dict[str, list[_Request]] = defaultdict(list)
+    for request in requests:
+        by_destination[request.destination].append(request)
+
+    singles: list[_Request] = []
+    for group in by_destination.values():
+        if len({request.origin for request in group}) > 1:
+            batches.extend(_chunk(group, min(MAX_ORIGINS, MAX_ELEMENTS)))
+        else:
+            singles.extend(group)
+
+    by_origin: dict[str, list[_Request]] = defaultdict(list)
+    for request in singles:
+        by_origin[request.origin].append(request)
+
+    for group in by_origin.values():
+        batches.extend(_chunk(group, min(MAX_DESTINATIONS, MAX_ELEMENTS)))
+
+    return batches
+
+
+def _chunk(requests: list[_Request], size: int) -> list[list[_Request]]:
+    return [requests[i : i + size] for i in range(0, len(requests), size)]
+
+
+class BatchingApiClient(ApiClient):
+    """Wraps a matrix-capable client, merging concurrent requests into one call.
+
+    Requests made within BATCH_WINDOW of the first pending request are sent
+    together, and each caller receives only its own element of the result.
+
+    A request submitted under a REQUEST_KEY that is already pending is
+    collapsed into it, taking the newest locations and the highest priority.
+    Each matrix call is made at the highest REQUEST_PRIORITY of its requests,
+    so a client below that rate limits calls sends urgent batches first.
+    """
+
+    def __init__(self, client: MatrixApiClient, window: float = BATCH_WINDOW) -> None:
+        """Initialise the batcher."""
+        self._client = client
+        self._window = window
+        self._pending: dict[Hashable, _Request] = {}
+        self._flush_handle: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        """Return the number of requests waiting for the next batch."""
+        return len(self._pending)
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Queue a request to be sent with the next batch."""
+        key = REQUEST_KEY.get()
+        if key is None:
+            key = object()
+
+        priority = REQUEST_PRIORITY.get()
+        if (request := self._pending.get(key)) is not None:
+            _LOGGER.debug("Collapsing duplicate request for %s", key)
+            request.origin, request.destination = origin, destination
+            request.priority = min(request.priority, priority)
+        else:
+            request = self._pending[key] = _Request(
+                origin, destination, priority, REQUEST_METRICS.get()
+            )
+
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(
+                self._window, self._flush
+            )
+
+        return await asyncio.shield(request.future)
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
+
+    def _flush(self) -> None:
+        pending, self._pending = list(self._pending.values()), {}
+        self._flush_handle = None
+
+        pending = [request for request in pending if not request.future.done()]
+        if not pending:
+            return
+
+        batches = plan_batches(pending)
+        _LOGGER.debug(
+            "Sending %d requests in %d matrix calls", len(pending), len(batches)
+        )
+
+        for request in pending:
+            if request.metrics is not None:
+                request.metrics.api_calls += 1
+
+        for batch in batches:
+            task = asyncio.get_running_loop().create_task(self._async_send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _async_send(self, batch: list[_Request]) -> None:
+        # The task runs in the context of whichever request started the window
+        REQUEST_KEY.set(None)
+        REQUEST_METRICS.set(None)
+        REQUEST_PRIORITY.set(min(request.priority for request in batch))
+
+        origins = list(dict.fromkeys(request.origin for request in batch))
+        destinations = list(dict.fromkeys(request.destination for request in batch))
+
+        try:
+            results = await self._client.async_get_traveltime_matrix(
+                origins, destinations
+            )
+        except Exception as ex:  # pylint: disable=broad-except
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(ex)
+            return
+
+        for request in batch:
+            if request.future.done():
+                continue
+
+            try:
+                result = results[origins.index(request.origin)][
+                    destinations.index(request.destination)
+                ]
+            except IndexError:
+                result = TravelTimeApiError("Incomplete matrix response")
+
+            if isinstance(result, Exception):
+                request.future.set_exception(result)
+            else:
+                request.future.set_result(result)
@@ -0,0 +1,259 @@
+"""In-memory cache of travel time results and geocoded addresses."""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import asdict
+
+from .api import ApiClient, Geocoder, LocationNotFoundError, TravelTimeData
+from .const import (
+    DEFAULT_CACHE_MAX_TTL,
+    DEFAULT_CACHE_MIN_TTL,
+    DEFAULT_CACHE_PRECISION,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_GEOCODE_NOT_FOUND_TTL,
+    DEFAULT_GEOCODE_TTL,
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Set by the caller to refuse cached results older than this, in seconds
+REQUEST_MAX_AGE: ContextVar[float | None] = ContextVar(
+    "journey_request_max_age", default=None
+)
+
+
+def quantise(location: str, precision: int) -> str:
+    """Round a 'lat,long' location to a number of decimal places.
+
+    Anything that is not a coordinate pair (e.g. an address) is normalised for
+    case and whitespace instead.
+    """
+    try:
+        lat, long = (float(x) for x in location.split(","))
+    except ValueError:
+        return " ".join(location.lower().split())
+
+    return f"{lat:.{precision}f},{long:.{precision}f}"
+
+
+class RouteCache:
+    """LRU cache of travel times keyed on quantised origin and destination.
+
+    Results expire sooner when traffic is heavy, as the delay is then more
+    likely to change quickly.
+    """
+
+    def __init__(
+        self,
+        precision: int = DEFAULT_CACHE_PRECISION,
+        max_size: int = DEFAULT_CACHE_SIZE,
+        min_ttl: float = DEFAULT_CACHE_MIN_TTL,
+        max_ttl: float = DEFAULT_CACHE_MAX_TTL,
+    ) -> None:
+        """Initialise the cache."""
+        self.precision = precision
+        self.max_size = max_size
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._entries: OrderedDict[tuple[str, str], tuple[float, TravelTimeData]] = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        """Return the number of cached routes."""
+        return len(self._entries)
+
+    def key(self, origin: str, destination: str) -> tuple[str, str]:
+        """Get the cache key for a route."""
+        return (
+            quantise(origin, self.precision),
+            quantise(destination, self.precision),
+        )
+
+    def ttl(self, data: TravelTimeData) -> float:
+        """Get how long a result should be cached, based on the traffic delay."""
+        return max(self.min_ttl, self.max_ttl / (1 + max(data.delay_factor, 0) / 10))
+
+    def get(
+        self, origin: str, destination: str, max_age: float | None = None
+    ) -> TravelTimeData | None:
+        """Get a cached result, if there is one that has not expired.
+
+        With max_age, results cached more than max_age seconds ago are passed
+        over, but kept for callers happy with older ones. Their age follows
+        from the expiry, as the TTL depends only on the result.
+        """
+        key = self.key(origin, destination)
+
+        if (entry := self._entries.get(key)) is not None:
+            expires, data = entry
+            now = time.monotonic()
+            if expires <= now:
+                del self._entries[key]
+            elif max_age is None or now - (expires - self.ttl(data)) <= max_age:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        return None
+
+    def put(self, origin: str, destination: str, data: TravelTimeData) -> None:
+        """Add a result to the cache, evicting the least recently used."""
+        key = self.key(origin, destination)
+
+        self._entries[key] = (time.monotonic() + self.ttl(data), data)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def dump(self) -> list[tuple[str, str, float, dict]]:
+        """Get the unexpired routes, with wall clock expiry times, for saving."""
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        return [
+            (origin, destination, expires + offset, asdict(data))
+            for (origin, destination), (expires, data) in self._entries.items()
+            if expires > now
+        ]
+
+    def restore(self, routes: list) -> None:
+        """Add saved routes that have not expired and are not already cached."""
+        offset = time.time() - time.monotonic()
+        now = time.monotonic()
+        for origin, destination, expires_at, data in routes:
+            expires = expires_at - offset
+            if expires <= now or (origin, destination) in self._entries:
+                continue
+
+            self._entries[(origin, destination)] = (expires, TravelTimeData(**data))
+            self._entries.move_to_end((origin, destination), last=False)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    @property
+    def stats(self) -> dict[str, int | float]:
+        """Get the cache counters."""
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class CachingApiClient(ApiClient):
+    """Wraps a client, answering repeated requests from a RouteCache."""
+
+    def __init__(self, client: ApiClient, cache: RouteCache) -> None:
+        """Initialise the client."""
+        self._client = client
+        self.cache = cache
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination, using the cache if possible."""
+        if (
+            result := self.cache.get(origin, destination, REQUEST_MAX_AGE.get())
+        ) is not None:
+            _LOGGER.debug("Using cached travel time for %s -> %s", origin, destination)
+            return result
+
+        result = await self._client.async_get_traveltime(origin, destination)
+        self.cache.put(origin, destination, result)
+        return result
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
+
+
+class CachingGeocoder(Geocoder):
+    """Wraps a geocoder, remembering each address's coordinates for a long time.
+
+    Addresses that could not be found are remembered too, for a shorter time.
+    Concurrent lookups of one address share a single request.
+    """
+
+    def __init__(
+        self,
+        geocoder: Geocoder,
+        ttl: float = DEFAULT_GEOCODE_TTL,
+        not_found_ttl: float = DEFAULT_GEOCODE_NOT_FOUND_TTL,
+        max_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        """Initialise the geocoder."""
+        self._geocoder = geocoder
+        self.ttl = ttl
+        self.not_found_ttl = not_found_ttl
+        self.max_size = max_size
+
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self._pending: dict[str, asyncio.Future[str]] = {}
+
+    async def async_geocode(self, address: str) -> str:
+        """Get the coordinates of an address, using the cache if possible."""
+        key = quantise(address, DEFAULT_CACHE_PRECISION)
+
+        if (entry := self._entries.get(key)) is not None:
+            expires, coords = entry
+            if expires > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                if coords is None:
+                    raise LocationNotFoundError(f"{address!r} was not found")
+                return coords
+
+            del self._entries[key]
+
+        if (pending := self._pending.get(key)) is not None:
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        future = self._pending[key] = asyncio.ensure_future(
+            self._async_geocode(key, address)
+        )
+        return await asyncio.shield(future)
+
+    async def _async_geocode(self, key: str, address: str) -> str:
+        try:
+            coords = await self._geocoder.async_geocode(address)
+        except LocationNotFoundError:
+            self._put(key, None, self.not_found_ttl)
+            raise
+        finally:
+            self._pending.pop(key, None)
+
+        _LOGGER.debug("Geocoded %r to %s", address, coords)
+        self._put(key, coords, self.ttl)
+        return coords
+
+    def _put(self, key: str, coords: str | None, ttl: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl, coords)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Get the geocode cache counters."""
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
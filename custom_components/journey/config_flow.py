@@ -4,18 +4,30 @@ from typing import Any
 
 import voluptuous as vol
 from homeassistant import config_entries
+from homeassistant.helpers import selector
 
-from .api import GoogleMapsApiClient, HereMapsApiClient
 from .const import (
     CONF_API_TOKEN,
+    CONF_DEPARTURE_CALENDAR,
+    CONF_DEPARTURE_WINDOWS,
     CONF_DESTINATION,
+    CONF_DESTINATIONS,
+    CONF_ETA_UNRECORDED,
+    CONF_MOVEMENT_THRESHOLD,
     CONF_NAME,
     CONF_ORIGIN,
+    CONF_ROUTE_GEOMETRY,
+    CONF_SECONDARY_API,
+    CONF_SECONDARY_API_TOKEN,
     CONF_SELECTED_API,
     CONF_SELECTED_API_GOOGLE,
-    CONF_SELECTED_API_HERE,
+    CONF_SKIP_UNCHANGED,
+    DEFAULT_MOVEMENT_THRESHOLD,
     DOMAIN,
 )
+from .providers import PROVIDERS
+from .registry import async_get_registry
+from .scheduler import DepartureWindow
 
 
 class JourneyFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type: ignore
@@ -31,47 +43,86 @@ class JourneyFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
 
     async def async_step_user(self, user_input=None):
         """Handle a flow initialized by the user."""
+        return self.async_show_menu(step_id="user", menu_options=["journey", "fan_out"])
+
+    async def async_step_journey(self, user_input=None):
+        """Configure a journey from an origin to one destination."""
+        return await self._async_step_create(user_input, "journey")
+
+    async def async_step_fan_out(self, user_input=None):
+        """Configure journeys from one origin to a list of destinations."""
+        return await self._async_step_create(user_input, "fan_out")
+
+    async def _async_step_create(self, user_input, step_id):
+        """Create an entry from either kind of journey form."""
         self._errors = {}
 
         if user_input is not None:
-            valid = await self._test_credentials(
+            if not _valid_departure_windows(user_input):
+                self._errors[CONF_DEPARTURE_WINDOWS] = "departure_windows"
+            elif not await self._test_secondary_credentials(user_input):
+                self._errors[CONF_SECONDARY_API_TOKEN] = "secondary_auth"
+            elif await self._test_credentials(
                 user_input[CONF_API_TOKEN], user_input[CONF_SELECTED_API]
-            )
-            if valid:
+            ):
                 return self.async_create_entry(
                     title=user_input[CONF_NAME], data=user_input
                 )
             else:
                 self._errors["base"] = "auth"
 
-            return await self._show_config_form(user_input)
+            return await self._show_config_form(user_input, step_id=step_id)
 
-        return await self._show_config_form(user_input)
+        return await self._show_config_form(user_input, step_id=step_id)
 
     async def async_step_reconfigure(self, user_input: dict[str, Any] | None = None):
         """Show the configuration form again to reconfigure."""
         self._errors = {}
 
         if user_input is not None:
-            valid = await self._test_credentials(
+            if not _valid_departure_windows(user_input):
+                self._errors[CONF_DEPARTURE_WINDOWS] = "departure_windows"
+            elif not await self._test_secondary_credentials(user_input):
+                self._errors[CONF_SECONDARY_API_TOKEN] = "secondary_auth"
+            elif await self._test_credentials(
                 user_input[CONF_API_TOKEN], user_input[CONF_SELECTED_API]
-            )
-            if valid:
+            ):
+                # Replace rather than update the data, so optional fields can
+                # be cleared
                 return self.async_update_reload_and_abort(
                     self._get_reconfigure_entry(),
-                    data_updates=user_input,
+                    data=user_input,
                 )
             else:
                 self._errors["base"] = "auth"
 
-            return await self._show_config_form(user_input, step_id="reconfigure")
+            return await self._show_config_form(
+                user_input,
+                step_id="reconfigure",
+                fan_out=CONF_DESTINATIONS in self._get_reconfigure_entry().data,
+            )
 
         return await self._show_config_form(
-            self._get_reconfigure_entry().data, step_id="reconfigure"
+            self._get_reconfigure_entry().data,
+            step_id="reconfigure",
+            fan_out=CONF_DESTINATIONS in self._get_reconfigure_entry().data,
         )
 
-    async def _show_config_form(self, user_input, step_id="user"):  # pylint: disable=unused-argument
+    async def _show_config_form(self, user_input, step_id="journey", fan_out=None):  # pylint: disable=unused-argument
         """Show the configuration form to edit location data."""
+        if fan_out is None:
+            fan_out = step_id == "fan_out"
+
+        destination_field = (
+            {
+                vol.Required(CONF_DESTINATIONS): selector.TextSelector(
+                    selector.TextSelectorConfig(multiple=True)
+                )
+            }
+            if fan_out
+            else {vol.Required(CONF_DESTINATION): str}
+        )
+
         return self.async_show_form(
             step_id=step_id,
             data_schema=self.add_suggested_values_to_schema(
@@ -79,16 +130,25 @@ class JourneyFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
                     {
                         vol.Required(CONF_NAME): str,
                         vol.Required(CONF_ORIGIN): str,
-                        vol.Required(CONF_DESTINATION): str,
+                        **destination_field,
                         vol.Required(CONF_API_TOKEN): str,
                         vol.Optional(
                             CONF_SELECTED_API, default=CONF_SELECTED_API_GOOGLE
-                        ): vol.In(
-                            [
-                                CONF_SELECTED_API_GOOGLE,
-                                CONF_SELECTED_API_HERE,
-                            ]
+                        ): vol.In(list(PROVIDERS)),
+                        vol.Optional(
+                            CONF_MOVEMENT_THRESHOLD, default=DEFAULT_MOVEMENT_THRESHOLD
+                        ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                        vol.Optional(CONF_SECONDARY_API): vol.In(list(PROVIDERS)),
+                        vol.Optional(CONF_SECONDARY_API_TOKEN): str,
+                        vol.Optional(CONF_DEPARTURE_WINDOWS): selector.TextSelector(
+                            selector.TextSelectorConfig(multiple=True)
                         ),
+                        vol.Optional(CONF_DEPARTURE_CALENDAR): selector.EntitySelector(
+                            selector.EntitySelectorConfig(domain="calendar")
+                        ),
+                        vol.Optional(CONF_SKIP_UNCHANGED, default=False): bool,
+                        vol.Optional(CONF_ETA_UNRECORDED, default=False): bool,
+                        vol.Optional(CONF_ROUTE_GEOMETRY, default=False): bool,
                     }
                 ),
                 user_input,
@@ -96,17 +156,42 @@ class JourneyFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):  # type: ign
             errors=self._errors,
         )
 
+    async def _test_secondary_credentials(self, user_input):
+        """Return true if there is no secondary provider, or its token is valid."""
+        if CONF_SECONDARY_API not in user_input:
+            return True
+
+        if not user_input.get(CONF_SECONDARY_API_TOKEN):
+            return False
+
+        return await self._test_credentials(
+            user_input[CONF_SECONDARY_API_TOKEN], user_input[CONF_SECONDARY_API]
+        )
+
     async def _test_credentials(self, api_token, selected_api):
         """Return true if credentials is valid."""
+        registry = async_get_registry(self.hass)
         try:
-            if selected_api == CONF_SELECTED_API_GOOGLE:
-                gmaps_client = GoogleMapsApiClient(api_token)
-                await gmaps_client.test_credentials()
-            else:
-                here_client = HereMapsApiClient(api_token)
-                await here_client.test_credentials()
+            shared = await registry.async_acquire(selected_api, api_token)
+        except Exception:  # pylint: disable=broad-except
+            # e.g. the provider could not be imported
+            return False
 
+        try:
+            await shared.client.test_credentials()
             return True
         except Exception:  # pylint: disable=broad-except
             pass
+        finally:
+            await registry.async_release(selected_api, api_token)
+        return False
+
+
+def _valid_departure_windows(user_input) -> bool:
+    """Return true if every departure window can be parsed."""
+    try:
+        for window in user_input.get(CONF_DEPARTURE_WINDOWS, []):
+            DepartureWindow.parse(window)
+    except ValueError:
         return False
+    return True
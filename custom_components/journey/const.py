@@ -21,10 +21,46 @@ CONF_NAME = "name"
 CONF_API_TOKEN = "api_token"
 CONF_ORIGIN = "origin"
 CONF_DESTINATION = "destination"
+CONF_DESTINATIONS = "destinations"
 CONF_SELECTED_API = "selected_api"
+CONF_SECONDARY_API = "secondary_api"
+CONF_SECONDARY_API_TOKEN = "secondary_api_token"
+CONF_MOVEMENT_THRESHOLD = "movement_threshold"
+CONF_DEPARTURE_WINDOWS = "departure_windows"
+CONF_DEPARTURE_CALENDAR = "departure_calendar"
+CONF_ETA_UNRECORDED = "eta_unrecorded"
+CONF_SKIP_UNCHANGED = "skip_unchanged"
+CONF_ROUTE_GEOMETRY = "route_geometry"
 
 CONF_SELECTED_API_HERE = "HERE"
 CONF_SELECTED_API_GOOGLE = "Google"
+CONF_SELECTED_API_OFFLINE = "Offline"
+
+# Keys for shared objects in hass.data[DOMAIN]
+DATA_CLIENTS = "clients"
+DATA_RESOLVER = "resolver"
+DATA_HUB = "hub"
+DATA_STORE = "store"
+DATA_HISTORY = "history"
 
 # Defaults
 DEFAULT_NAME = DOMAIN
+DEFAULT_CACHE_PRECISION = 4  # decimal places, roughly 10 m
+DEFAULT_CACHE_SIZE = 256
+DEFAULT_CACHE_MIN_TTL = 60  # seconds, in heavy traffic
+DEFAULT_CACHE_MAX_TTL = 900  # seconds, in free-flowing traffic
+DEFAULT_GEOCODE_TTL = 30 * 86400  # seconds
+DEFAULT_GEOCODE_NOT_FOUND_TTL = 3600  # seconds
+DEFAULT_DAILY_REQUEST_BUDGET = 1000  # requests per token per day
+DEFAULT_RATE_LIMIT = 5  # requests per second per token
+DEFAULT_RATE_LIMIT_BURST = 10
+DEFAULT_MOVEMENT_THRESHOLD = 500  # metres
+DEFAULT_ROUTE_CORRIDOR = 150  # metres
+DEFAULT_ROUTE_MAX_AGE = 900  # seconds
+DEFAULT_PREDICTION_MAX_AGE = 900  # seconds
+DEFAULT_RESTORE_MAX_AGE = 6 * 3600  # seconds
+DEFAULT_STARTUP_STAGGER = 60  # seconds
+DEFAULT_HISTORY_MAX_AGE = 8 * 7 * 86400  # seconds
+DEFAULT_PROFILE_MIN_SAMPLES = 4  # per 15 minute slot
+DEFAULT_PROFILE_TOLERANCE = 0.1  # relative to the typical duration
+DEFAULT_PROFILE_MAX_AGE = 1800  # seconds since the last live result
@@ -1,24 +1,64 @@
 """Data update coordinator for routing APIs."""
 
+import asyncio
 import logging
-from dataclasses import dataclass
-from datetime import timedelta
+import time
+import weakref
+from collections.abc import Callable
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import ClassVar
 
-from homeassistant.core import Event, HomeAssistant
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers.debounce import Debouncer
 from homeassistant.helpers.event import (
     EventStateChangedData,
     async_track_state_change_event,
 )
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.util import dt as dt_util
 
-from .api import ApiClient, TravelTimeData
+from .api import ApiClient, Geocoder, LocationNotFoundError, Router, TravelTimeData
+from .backoff import Backoff, ErrorClass, classify
+from .cache import REQUEST_MAX_AGE
 from .const import (
+    DEFAULT_MOVEMENT_THRESHOLD,
+    DEFAULT_PREDICTION_MAX_AGE,
+    DEFAULT_ROUTE_CORRIDOR,
+    DEFAULT_ROUTE_MAX_AGE,
+    DEFAULT_STARTUP_STAGGER,
     DOMAIN,
 )
-from .helpers import FindCoordinatesError, LocationData, find_coordinates
+from .geometry import RouteGeometry
+from .helpers import (
+    FindCoordinatesError,
+    LocationData,
+    LocationResolver,
+    UnroutableLocationError,
+    check_routable,
+    find_coordinates,
+    haversine_m,
+    parse_coords,
+)
+from .hub import OriginHub
+from .metrics import JourneyMetrics
+from .ratelimit import (
+    PRIORITY_FORCED,
+    PRIORITY_ROUTINE,
+    REQUEST_KEY,
+    REQUEST_METRICS,
+    REQUEST_PRIORITY,
+)
+from .scheduler import (
+    SCAN_INTERVAL,
+    DepartureWindow,
+    RequestBudget,
+    compute_update_interval,
+    departure_interval,
+)
 
-SCAN_INTERVAL = timedelta(minutes=5)
+# Shortest wait for the first refresh after restoring saved journeys
+MIN_STARTUP_DELAY = timedelta(seconds=1)
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -32,31 +72,123 @@ class JourneyData:
     travel_time: TravelTimeData
 
 
-class JourneyDataUpdateCoordinator(DataUpdateCoordinator[JourneyData]):
-    """Class to manage fetching data from the API."""
+@dataclass
+class _Route:
+    """The shape of a leg's route, and where the last routed result began on it."""
+
+    geometry: RouteGeometry
+    destination: str
+    fetched: float
+    elapsed: float = 0.0
+    distance: float = 0.0
+
+
+class JourneyDataUpdateCoordinator(DataUpdateCoordinator[dict[str, JourneyData]]):
+    """Class to manage fetching data from the API.
+
+    A coordinator tracks one origin against one or more destinations. The
+    origin is resolved once per refresh and every leg is requested together, so
+    a batching client can answer them all with a single matrix call. Data is
+    keyed by destination.
+    """
+
+    # Every coordinator still in memory, shut down or not, to spot leaks
+    instances: ClassVar[weakref.WeakSet["JourneyDataUpdateCoordinator"]] = (
+        weakref.WeakSet()
+    )
+
+    # None while waiting for a departure window, with no polls until then
+    update_interval: timedelta | None
 
     def __init__(
         self,
         hass: HomeAssistant,
         client: ApiClient,
         origin: str,
-        destination: str,
+        destinations: list[str],
+        budget: RequestBudget | None = None,
+        movement_threshold: float = DEFAULT_MOVEMENT_THRESHOLD,
+        resolver: LocationResolver | None = None,
+        hub: OriginHub | None = None,
+        phase: float | None = None,
+        departure_windows: list[DepartureWindow] | None = None,
+        departure_calendar: str | None = None,
+        geocoder: Geocoder | None = None,
+        router: Router | None = None,
     ) -> None:
-        """Initialize."""
+        """Initialize.
+
+        With a hub, origin updates are shared with other coordinators following
+        the same entity; otherwise the coordinator listens for them itself.
+        The phase (0-1) sets where in each interval polls land, so coordinators
+        given different phases don't poll together.
+
+        With departure windows, or a calendar whose events are departures,
+        polling is concentrated ahead of and during them (see
+        departure_interval).
+
+        Locations are checked before routing; with a geocoder, addresses are
+        turned into coordinates first.
+
+        With a router, the shape of each route is fetched too, when there is
+        none yet or it is out of date, so that the time left can be worked out
+        locally as the origin moves along it (see _predict_from_movement).
+        """
 
         self.api = client
+        self.resolver = resolver
+        self.metrics = JourneyMetrics()
+        self.backoff = Backoff()
+        self.budget = budget
+        self.movement_threshold = movement_threshold
+        self.phase = phase
+        self.departure_windows = departure_windows or []
+        self.departure_calendar = departure_calendar
+        self.geocoder = geocoder
+        self.router = router
+        self._last_update_time: datetime | None = None
+        self._base_interval = SCAN_INTERVAL
+        self._priority = PRIORITY_ROUTINE
+
+        # The last results that came from the API, rather than being predicted,
+        # when they came (monotonic), and the shape of each route
+        self._routed: dict[str, JourneyData] = {}
+        self._routed_at = 0.0
+        self._routes: dict[str, _Route] = {}
 
         self._origin_entity_id = origin
-        self._destination_entity_id = destination
+        self._destination_entity_ids = destinations
 
-        async_track_state_change_event(
-            hass, self._origin_entity_id, self._handle_origin_state_change
-        )
+        # Every subscription is undone by async_shutdown
+        self._unsubs: list[Callable[[], None]] = []
+        self._shut_down = False
 
-        async_track_state_change_event(
-            hass, self._destination_entity_id, self._handle_destination_state_change
+        if hub is not None:
+            self._unsubs.append(hub.async_subscribe(self._origin_entity_id, self))
+        else:
+            self._unsubs.append(
+                async_track_state_change_event(
+                    hass, self._origin_entity_id, self._handle_origin_state_change
+                )
+            )
+
+        self._unsubs.append(
+            async_track_state_change_event(
+                hass,
+                self._destination_entity_ids,
+                self._handle_destination_state_change,
+            )
         )
 
+        if departure_calendar is not None:
+            self._unsubs.append(
+                async_track_state_change_event(
+                    hass, departure_calendar, self._handle_calendar_state_change
+                )
+            )
+
+        JourneyDataUpdateCoordinator.instances.add(self)
+
         super().__init__(
             hass,
             _LOGGER,
@@ -68,54 +200,475 @@ class JourneyDataUpdateCoordinator(DataUpdateCoordinator[JourneyData]):
             ),
         )
 
+    @property
+    def destinations(self) -> list[str]:
+        """Get the destinations tracked by this coordinator."""
+        return self._destination_entity_ids
+
     async def _handle_origin_state_change(self, event: Event[EventStateChangedData]):
+        self._invalidate(event)
+        if self.async_origin_changed(event) and not self._shut_down:
+            await self.async_refresh()
+
+    @callback
+    def _invalidate(self, event: Event[EventStateChangedData]) -> None:
+        """Drop resolved locations the change affects, ahead of the resolver."""
+        if self.resolver is not None:
+            self.resolver.async_invalidate(event)
+
+    @callback
+    def async_origin_changed(self, event: Event[EventStateChangedData]) -> bool:
+        """Handle an origin update, returning True if the journeys need a refresh."""
+        if self._shut_down:
+            return False
+
         if (
             event.data["old_state"] is not None
             and event.data["new_state"] is not None
             and event.data["old_state"].state == event.data["new_state"].state
         ):
-            _LOGGER.debug("Origin updated without state change, requesting refresh")
-            await self.async_request_refresh()
+            if self._predict_from_movement():
+                return False
+
+            _LOGGER.debug("Origin moved beyond threshold, forcing refresh")
         else:
             _LOGGER.debug("Origin updated *with* state change, forcing refresh")
-            await self.async_refresh()
+
+        if self._backing_off():
+            return False
+
+        self._priority = PRIORITY_FORCED
+        return True
+
+    def _predict_from_movement(self) -> bool:
+        """Update the journeys locally if the origin has only moved a little.
+
+        While the origin stays within DEFAULT_ROUTE_CORRIDOR of a leg's route,
+        and the route is no older than DEFAULT_ROUTE_MAX_AGE, the time left is
+        read from the route at the nearest point along it.
+        Otherwise the remaining time of the leg is scaled by how much closer
+        (in a straight line) the origin now is to its destination than when
+        the route was last fetched, if it has moved less than the threshold.
+        Returns False if any leg needs a new route, the routed results are
+        older than DEFAULT_PREDICTION_MAX_AGE, or a prediction is not possible.
+
+        Predictions are published without rescheduling the next poll, so an
+        origin that keeps moving a little doesn't put polling off.
+        """
+        if not self._routed or self._routed.keys() != set(self.destinations):
+            return False
+
+        if time.monotonic() - self._routed_at > DEFAULT_PREDICTION_MAX_AGE:
+            _LOGGER.debug("Routed travel times are out of date, forcing refresh")
+            return False
+
+        try:
+            origin = self._find_coordinates(self._origin_entity_id)
+        except FindCoordinatesError:
+            return False
+
+        if (new_coords := parse_coords(origin.coords)) is None:
+            return False
+
+        predicted: dict[str, JourneyData] = {}
+        for destination, routed in self._routed.items():
+            if destination in self._routes:
+                ratios = self._follow_route(destination, new_coords)
+            else:
+                ratios = self._straight_line_ratio(routed, new_coords)
+
+            if ratios is None:
+                return False
+
+            time_ratio, distance_ratio = ratios
+            travel_time = routed.travel_time
+            predicted[destination] = JourneyData(
+                origin,
+                routed.destination,
+                TravelTimeData(
+                    travel_time.travel_time_secs * time_ratio,
+                    travel_time.travel_time_traffic_secs * time_ratio,
+                    travel_time.distance_m * distance_ratio,
+                ),
+            )
+
+        _LOGGER.debug("Origin moved, predicting travel time locally")
+        self.metrics.predictions += 1
+        self.data = predicted
+        self.async_update_listeners()
+        return True
+
+    def _follow_route(
+        self, destination: str, coords: tuple[float, float]
+    ) -> tuple[float, float] | None:
+        """Get the share of the routed time and distance left from a point.
+
+        The shares are of what was left where the last routed result began.
+        """
+        route = self._routes[destination]
+        if time.monotonic() - route.fetched > DEFAULT_ROUTE_MAX_AGE:
+            return None
+
+        offset, elapsed, distance = route.geometry.locate(coords)
+        if offset > DEFAULT_ROUTE_CORRIDOR:
+            _LOGGER.debug("Origin is %.0f m off the route", offset)
+            return None
+
+        geometry = route.geometry
+        total = geometry.elapsed[-1] - route.elapsed
+        length = geometry.distances[-1] - route.distance
+        return (
+            1 - (elapsed - route.elapsed) / total if total > 0 else 0,
+            1 - (distance - route.distance) / length if length > 0 else 0,
+        )
+
+    def _straight_line_ratio(
+        self, routed: JourneyData, coords: tuple[float, float]
+    ) -> tuple[float, float] | None:
+        """Get how much closer a point is to a leg's destination than its origin."""
+        routed_coords = parse_coords(routed.origin.coords)
+        destination_coords = parse_coords(routed.destination.coords)
+        if routed_coords is None or destination_coords is None:
+            return None
+
+        if haversine_m(routed_coords, coords) >= self.movement_threshold:
+            return None
+
+        routed_remaining = haversine_m(routed_coords, destination_coords)
+        remaining = haversine_m(coords, destination_coords)
+        ratio = min(remaining / routed_remaining, 2) if routed_remaining > 0 else 1
+        return ratio, ratio
 
     async def _handle_destination_state_change(
         self, event: Event[EventStateChangedData]
     ):
+        if self._shut_down or self._backing_off():
+            return
+
+        self._invalidate(event)
+        self._priority = PRIORITY_FORCED
         await self.async_refresh()
 
-    async def update(self) -> JourneyData:
+    def _backing_off(self) -> bool:
+        """Return True if state changes should not force a refresh yet.
+
+        Backing off from an unresolvable location doesn't count, as the state
+        change may be what makes it resolvable.
+        """
+        if (
+            self.backoff.remaining > 0
+            and self.backoff.error_class != ErrorClass.LOCATION
+        ):
+            _LOGGER.debug(
+                "Not refreshing for %.0f s after %s errors",
+                self.backoff.remaining,
+                self.backoff.error_class,
+            )
+            return True
+
+        return False
+
+    @callback
+    def async_restore(
+        self, data: dict[str, JourneyData], delay: timedelta, age: float = 0.0
+    ) -> None:
+        """Start from saved journeys, age seconds old, putting off the first refresh.
+
+        Must be called before any listeners are added. Saved journeys for
+        destinations no longer tracked are ignored. A zero delay would turn
+        polling off, so the first refresh is at least MIN_STARTUP_DELAY away.
+        Movement is only predicted from the saved journeys while they are
+        recent enough (see _predict_from_movement).
+        """
+        if data := {
+            key: journey for key, journey in data.items() if key in self.destinations
+        }:
+            self.data = data
+            self._routed = dict(data)
+            self._routed_at = time.monotonic() - age
+
+        self.update_interval = max(delay, MIN_STARTUP_DELAY)
+
+    @property
+    def subscriptions(self) -> int:
+        """Get the number of state subscriptions this coordinator holds."""
+        return len(self._unsubs)
+
+    @property
+    def is_shut_down(self) -> bool:
+        """Return True once the coordinator has been shut down."""
+        return self._shut_down
+
+    async def async_shutdown(self) -> None:
+        """Drop every subscription and cancel any scheduled refresh.
+
+        State changes already queued when this is called are ignored, so a
+        coordinator being replaced by a reload never refreshes again.
+        """
+        self._shut_down = True
+        unsubs, self._unsubs = self._unsubs, []
+        for unsub in unsubs:
+            unsub()
+
+        await super().async_shutdown()
+
+    @callback
+    def _handle_calendar_state_change(
+        self, event: Event[EventStateChangedData]
+    ) -> None:
+        if self._shut_down:
+            return
+
+        # The next departure may have moved, so reschedule without refreshing
+        self.update_interval = self._fit_departures(self._base_interval, dt_util.now())
+        self._schedule_refresh()
+
+    def _departures(self, now: datetime) -> list[tuple[datetime, datetime]]:
+        """Get the current or next occurrence of each departure window."""
+        departures = [window.next_occurrence(now) for window in self.departure_windows]
+
+        if (
+            self.departure_calendar is not None
+            and (state := self.hass.states.get(self.departure_calendar)) is not None
+            and (start := state.attributes.get("start_time")) is not None
+            and (start_time := dt_util.parse_datetime(start)) is not None
+        ):
+            if start_time.tzinfo is None:
+                start_time = start_time.replace(tzinfo=dt_util.get_default_time_zone())
+            departures.append((start_time, start_time))
+
+        return departures
+
+    def _fit_departures(self, interval: timedelta, now: datetime) -> timedelta | None:
+        """Fit an interval around the departure windows, if there are any."""
+        if not self.departure_windows and self.departure_calendar is None:
+            return interval
+
+        return departure_interval(
+            interval,
+            self._departures(now),
+            now,
+            spread=timedelta(seconds=(self.phase or 0) * DEFAULT_STARTUP_STAGGER),
+        )
+
+    def _find_coordinates(self, name: str) -> LocationData:
+        """Resolve a location, through the shared resolver if there is one."""
+        start = time.perf_counter()
+        try:
+            if self.resolver is not None:
+                return self.resolver.resolve(name)
+
+            return find_coordinates(self.hass, name)
+        finally:
+            self.metrics.find_coordinates.record(time.perf_counter() - start)
+
+    async def update(self) -> dict[str, JourneyData]:
         """Update data via library."""
+        self.metrics.refreshes += 1
         try:
-            origin = find_coordinates(self.hass, self._origin_entity_id)
-        except FindCoordinatesError as ex:
-            raise UpdateFailed(f"Could not find origin coords: {ex!r}")
+            data = await self._async_update_journeys()
+        except UpdateFailed as ex:
+            self.metrics.failures += 1
+
+            # Wait according to what went wrong, rather than the poll interval
+            cause = ex.__cause__ or ex
+            error_class = classify(cause)
+            delay = self.backoff.record_failure(
+                error_class, getattr(cause, "retry_after", None)
+            )
+            self.update_interval = timedelta(seconds=delay)
+            _LOGGER.debug(
+                "Retrying %s in %.0f s after %s error",
+                self._origin_entity_id,
+                delay,
+                error_class,
+            )
+            raise
 
+        self.backoff.record_success()
+        return data
+
+    async def _async_update_journeys(self) -> dict[str, JourneyData]:
         try:
-            destination = find_coordinates(self.hass, self._destination_entity_id)
+            origin = await self._async_routable(
+                self._find_coordinates(self._origin_entity_id)
+            )
         except FindCoordinatesError as ex:
-            raise UpdateFailed(f"Could not find destination coords: {ex!r}")
+            raise UpdateFailed(f"Could not find origin coords: {ex!r}") from ex
 
-        try:
-            if origin.coords == destination.coords:
-                _LOGGER.info("origin is equal to destination")
-                return JourneyData(
-                    origin,
-                    destination,
-                    TravelTimeData(
-                        0,
-                        0,
-                        0,
-                    ),
-                )
-            else:
-                return JourneyData(
-                    origin,
-                    destination,
-                    await self.api.async_get_traveltime(
-                        origin.coords, destination.coords
-                    ),
+        # A destination that can't be found only fails its own leg
+        destinations: dict[str, LocationData] = {}
+        outcomes: dict[str, TravelTimeData | BaseException] = {}
+        for destination_entity_id in self.destinations:
+            try:
+                destinations[destination_entity_id] = await self._async_routable(
+                    self._find_coordinates(destination_entity_id)
                 )
-        except Exception as exception:
-            raise UpdateFailed(repr(exception)) from exception
+            except FindCoordinatesError as ex:
+                outcomes[destination_entity_id] = ex
+
+        # Refreshes caused by a state change go ahead of routine polls
+        priority_token = REQUEST_PRIORITY.set(self._priority)
+        self._priority = PRIORITY_ROUTINE
+
+        try:
+            results = await asyncio.gather(
+                *(
+                    self._async_get_traveltime(key, origin, destination)
+                    for key, destination in destinations.items()
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            REQUEST_PRIORITY.reset(priority_token)
+
+        outcomes.update(zip(destinations, results, strict=True))
+
+        data: dict[str, JourneyData] = {}
+        errors: list[BaseException] = []
+        for key in self.destinations:
+            result = outcomes[key]
+            if isinstance(result, BaseException):
+                _LOGGER.warning("Failed to update journey to %s: %r", key, result)
+                errors.append(result)
+                # Keep showing the last result for a leg that failed
+                if self.data and key in self.data:
+                    data[key] = self.data[key]
+                continue
+
+            data[key] = JourneyData(origin, destinations[key], result)
+
+        if len(errors) == len(outcomes):
+            raise UpdateFailed(repr(errors[0])) from errors[0]
+
+        self._schedule_next_update(data)
+
+        self._routed = {
+            key: journey for key, journey in data.items() if journey.origin is origin
+        }
+        self._routed_at = time.monotonic()
+        return data
+
+    async def _async_routable(self, location: LocationData) -> LocationData:
+        """Check a location can be routed to, geocoding it if it is an address.
+
+        Known non-location states are rejected without a request, and
+        addresses are geocoded through a long-lived cache, so the provider is
+        only ever asked to route between coordinates.
+        """
+        check_routable(location)
+
+        if parse_coords(location.coords) is not None or self.geocoder is None:
+            return location
+
+        try:
+            coords = await self.geocoder.async_geocode(location.coords)
+        except LocationNotFoundError as ex:
+            raise UnroutableLocationError(str(ex)) from ex
+        except Exception as ex:  # pylint: disable=broad-except
+            raise UpdateFailed(f"Could not geocode {location.name}: {ex!r}") from ex
+
+        return LocationData(location.name, coords)
+
+    async def _async_get_traveltime(
+        self, key: str, origin: LocationData, destination: LocationData
+    ) -> TravelTimeData:
+        if origin.coords == destination.coords:
+            _LOGGER.info("origin is equal to destination")
+            return TravelTimeData(0, 0, 0)
+
+        # Repeated requests for the same leg are collapsed while queued, and
+        # only those reaching the provider count as API calls
+        REQUEST_KEY.set((self, key))
+        REQUEST_METRICS.set(self.metrics)
+
+        # Cached results older than the poll interval would hide the changes
+        # that faster polls (e.g. ahead of a departure) are meant to catch
+        REQUEST_MAX_AGE.set(
+            self.update_interval.total_seconds() if self.update_interval else None
+        )
+
+        start = time.perf_counter()
+
+        # The travel time always comes through the client; a route's shape is
+        # only fetched, alongside it, when the last one can't be followed
+        route = self._place_on_route(self._routes.pop(key, None), origin, destination)
+        if route is None and self.router is not None:
+            result, fetched = await asyncio.gather(
+                self.api.async_get_traveltime(origin.coords, destination.coords),
+                self._async_get_route(self.router, origin, destination),
+            )
+            route = self._place_on_route(fetched, origin, destination)
+        else:
+            result = await self.api.async_get_traveltime(
+                origin.coords, destination.coords
+            )
+
+        if route is not None:
+            self._routes[key] = route
+
+        self.metrics.api_latency.record(time.perf_counter() - start)
+        return result
+
+    async def _async_get_route(
+        self, router: Router, origin: LocationData, destination: LocationData
+    ) -> _Route | None:
+        """Fetch the shape of a leg's route, or None if it can't be had."""
+        try:
+            _, geometry = await router.async_get_route(
+                origin.coords, destination.coords
+            )
+        except Exception as ex:  # pylint: disable=broad-except
+            _LOGGER.debug("Could not get route to %s: %r", destination.name, ex)
+            return None
+
+        return _Route(geometry, destination.coords, time.monotonic())
+
+    @staticmethod
+    def _place_on_route(
+        route: _Route | None, origin: LocationData, destination: LocationData
+    ) -> _Route | None:
+        """Get a route starting from where the origin is on it.
+
+        Returns None if the route is for another destination, out of date, or
+        the origin is not on it.
+        """
+        if (
+            route is None
+            or route.destination != destination.coords
+            or time.monotonic() - route.fetched > DEFAULT_ROUTE_MAX_AGE
+            or (coords := parse_coords(origin.coords)) is None
+        ):
+            return None
+
+        offset, elapsed, distance = route.geometry.locate(coords)
+        if offset > DEFAULT_ROUTE_CORRIDOR:
+            return None
+
+        return replace(route, elapsed=elapsed, distance=distance)
+
+    def _schedule_next_update(self, data: dict[str, JourneyData]) -> None:
+        """Adapt the polling interval to how quickly the journeys are changing."""
+        now = dt_util.now()
+        elapsed = (
+            now - self._last_update_time if self._last_update_time else SCAN_INTERVAL
+        )
+
+        # The fastest changing leg sets the pace for all of them
+        self._base_interval = min(
+            compute_update_interval(
+                self._routed[key].travel_time if key in self._routed else None,
+                journey.travel_time,
+                elapsed,
+                now,
+                self.budget,
+                self.phase,
+            )
+            for key, journey in data.items()
+        )
+        self.update_interval = self._fit_departures(self._base_interval, now)
+        self._last_update_time = now
+
+        _LOGGER.debug(
+            "Next update for %s in %s", self._origin_entity_id, self.update_interval
+        )
@@ -0,0 +1,70 @@
+"""Diagnostics support for Journey."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_API_TOKEN, CONF_SECONDARY_API, CONF_SECONDARY_API_TOKEN, DOMAIN
+from .coordinator import JourneyDataUpdateCoordinator
+from .helpers import async_get_resolver
+from .history import async_get_history
+from .hub import async_get_hub
+from .registry import async_get_registry, get_entry_provider
+
+TO_REDACT = {CONF_API_TOKEN, CONF_SECONDARY_API_TOKEN}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    coordinator: JourneyDataUpdateCoordinator = hass.data[DOMAIN][entry.entry_id]
+    resolver = async_get_resolver(hass)
+    hub = async_get_hub(hass)
+    coordinators = [
+        value
+        for value in hass.data[DOMAIN].values()
+        if isinstance(value, JourneyDataUpdateCoordinator)
+    ]
+
+    return {
+        "entry": async_redact_data(entry.as_dict(), TO_REDACT),
+        "journey": {
+            "update_interval": coordinator.update_interval.total_seconds()
+            if coordinator.update_interval
+            else None,
+            "last_update_success": coordinator.last_update_success,
+            **coordinator.metrics.as_dict(),
+        },
+        "token": async_get_registry(hass).stats(
+            get_entry_provider(entry), entry.data[CONF_API_TOKEN]
+        ),
+        "secondary_token": async_get_registry(hass).stats(
+            entry.data[CONF_SECONDARY_API], entry.data[CONF_SECONDARY_API_TOKEN]
+        )
+        if CONF_SECONDARY_API in entry.data
+        else None,
+        "resolver": {
+            "size": len(resolver),
+            "hits": resolver.hits,
+            "misses": resolver.misses,
+        },
+        "providers": {
+            "import_times": async_get_registry(hass).loader.import_times,
+        },
+        "history": (await async_get_history(hass)).stats,
+        "origins": {
+            "tracked": len(hub),
+            "refresh_batches": hub.batches,
+        },
+        # More coordinators alive than active, or subscriptions growing with
+        # each reload, means something is still holding on to old setups
+        "lifecycle": {
+            "subscriptions": coordinator.subscriptions,
+            "total_subscriptions": sum(c.subscriptions for c in coordinators),
+            "active_coordinators": len(coordinators),
+            "alive_coordinators": len(JourneyDataUpdateCoordinator.instances),
+        },
+    }
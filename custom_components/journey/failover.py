@@ -0,0 +1,269 @@
+"""Failover and hedging between two routing providers."""
+
+import asyncio
+import logging
+import math
+import time
+from dataclasses import dataclass, field
+from typing import Any
+
+from .api import ApiClient, TravelTimeApiError, TravelTimeData
+from .metrics import LatencyHistogram
+
+# Consecutive failures that open a circuit, and how long it then stays open
+BREAKER_THRESHOLD = 3
+BREAKER_COOLDOWN = 60.0  # seconds
+BREAKER_MAX_COOLDOWN = 900.0  # seconds
+
+# The secondary is asked too once the primary is slower than this percentile
+# of its own recent requests
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = 3.0  # seconds, until there are enough samples
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class CircuitBreaker:
+    """Stops requests to a provider after repeated failures.
+
+    Once open, a single request is let through after the cooldown. If it fails
+    the circuit opens again with double the cooldown, up to a maximum.
+    """
+
+    def __init__(
+        self,
+        threshold: int = BREAKER_THRESHOLD,
+        cooldown: float = BREAKER_COOLDOWN,
+        max_cooldown: float = BREAKER_MAX_COOLDOWN,
+    ) -> None:
+        """Initialise the breaker, closed."""
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.trips = 0
+        self._opened: float | None = None
+
+    @property
+    def state(self) -> str:
+        """Get whether the circuit is closed, open or half open."""
+        if self._opened is None:
+            return "closed"
+
+        if time.monotonic() - self._opened < self.cooldown:
+            return "open"
+
+        return "half_open"
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent."""
+        if (state := self.state) == "half_open":
+            # Let one trial through, holding the rest until it reports back
+            self._opened = time.monotonic()
+            return True
+
+        return state == "closed"
+
+    def record_success(self) -> None:
+        """Close the circuit."""
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self._opened = None
+
+    def record_failure(self) -> None:
+        """Count a failure, opening the circuit if there have been enough."""
+        self.failures += 1
+
+        if self._opened is not None:
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+            self._opened = time.monotonic()
+        elif self.failures >= self.threshold:
+            self.trips += 1
+            self._opened = time.monotonic()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the breaker."""
+        return {
+            "state": self.state,
+            "failures": self.failures,
+            "trips": self.trips,
+            "cooldown": self.cooldown,
+        }
+
+
+@dataclass
+class ProviderHealth:
+    """Breaker and end-to-end latency of one provider and token."""
+
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+
+    def hedge_delay(self) -> float:
+        """Get how long to wait for this provider before asking another."""
+        if self.latency.count < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+
+        return self.latency.percentile(HEDGE_PERCENTILE) or HEDGE_DEFAULT_DELAY
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the provider's health."""
+        return {
+            "breaker": self.breaker.as_dict(),
+            "hedge_delay": self.hedge_delay(),
+        }
+
+
+class HealthApiClient(ApiClient):
+    """Wraps a client, recording the outcome and latency of its requests.
+
+    It goes below any cache, so that only requests reaching the provider
+    count towards its circuit breaker and hedge delay.
+    """
+
+    def __init__(self, client: ApiClient, health: ProviderHealth) -> None:
+        """Initialise the client."""
+        self._client = client
+        self.health = health
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination, timing the request."""
+        start = time.perf_counter()
+        try:
+            result = await self._client.async_get_traveltime(origin, destination)
+        except Exception:
+            self.health.breaker.record_failure()
+            raise
+
+        self.health.latency.record(time.perf_counter() - start)
+        self.health.breaker.record_success()
+        return result
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
+
+
+def normalise_traveltime(data: TravelTimeData) -> TravelTimeData:
+    """Put results from either provider in the same form.
+
+    Durations and distances are whole seconds and metres, and a missing nominal
+    duration is filled from the traffic one. A missing traffic duration is
+    left for ProfileApiClient to estimate.
+    """
+    nominal, traffic = data.travel_time_secs, data.travel_time_traffic_secs
+    if math.isnan(nominal):
+        nominal = traffic
+    if math.isnan(nominal) or math.isnan(data.distance_m):
+        return TravelTimeData(nominal, traffic, data.distance_m)
+
+    return TravelTimeData(
+        round(nominal),
+        traffic if math.isnan(traffic) else round(traffic),
+        round(data.distance_m),
+    )
+
+
+class FailoverApiClient(ApiClient):
+    """Sends requests to a primary client, falling back to a secondary.
+
+    The secondary is used when the primary fails, when the primary's circuit
+    is open, and, as a hedge, when the primary takes longer than its usual
+    worst case. The first successful answer wins.
+
+    The health of each provider is kept up by a HealthApiClient below its
+    cache, so answers from the cache neither shorten the hedge delay nor
+    close a breaker.
+    """
+
+    def __init__(
+        self,
+        primary: ApiClient,
+        secondary: ApiClient,
+        primary_health: ProviderHealth,
+        secondary_health: ProviderHealth,
+    ) -> None:
+        """Initialise the client."""
+        self.primary = primary
+        self.secondary = secondary
+        self.primary_health = primary_health
+        self.secondary_health = secondary_health
+        self.hedges = 0
+        self.failovers = 0
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination from whichever answers first."""
+        if not self.primary_health.breaker.allow():
+            if not self.secondary_health.breaker.allow():
+                raise TravelTimeApiError("Both providers are unavailable")
+
+            self.failovers += 1
+            return await self._async_call(self.secondary, origin, destination)
+
+        primary = asyncio.ensure_future(
+            self._async_call(self.primary, origin, destination)
+        )
+
+        tasks = {primary}
+        try:
+            done, _ = await asyncio.wait(
+                tasks, timeout=self.primary_health.hedge_delay()
+            )
+            if done and primary.exception() is None:
+                return primary.result()
+
+            if not self.secondary_health.breaker.allow():
+                return await primary
+
+            if done:
+                _LOGGER.debug("Primary provider failed, failing over")
+                self.failovers += 1
+            else:
+                _LOGGER.debug("Primary provider is slow, hedging")
+                self.hedges += 1
+
+            tasks.add(
+                asyncio.ensure_future(
+                    self._async_call(self.secondary, origin, destination)
+                )
+            )
+
+            pending = {task for task in tasks if not task.done()}
+            while pending:
+                _, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in tasks:
+                    if task.done() and task.exception() is None:
+                        return task.result()
+
+            # Both failed, report the primary's error
+            return primary.result()
+        finally:
+            for task in tasks:
+                if not task.done():
+                    # Let the loser finish, so its result still reaches the caches
+                    task.add_done_callback(_consume)
+
+    @staticmethod
+    async def _async_call(
+        client: ApiClient, origin: str, destination: str
+    ) -> TravelTimeData:
+        return normalise_traveltime(
+            await client.async_get_traveltime(origin, destination)
+        )
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self.primary.test_credentials()
+
+
+def _consume(task: asyncio.Future) -> None:
+    """Retrieve the outcome of a task nobody is waiting for."""
+    if not task.cancelled():
+        task.exception()
@@ -0,0 +1,164 @@
+"""Route shapes, and where along them a position lies."""
+
+import math
+from array import array
+from collections.abc import Iterable, Sequence
+
+from .helpers import EARTH_RADIUS_M, haversine_m
+
+Point = tuple[float, float]
+
+_FLEXIBLE_POLYLINE_CHARS = {
+    char: value
+    for value, char in enumerate(
+        "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_"
+    )
+}
+
+
+class RouteGeometry:
+    """The shape of a route, with the time and distance to each of its points.
+
+    Points are held in typed arrays, so a route of a few thousand points takes
+    tens of kilobytes and can be scanned in one pass.
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty route."""
+        self.lats = array("d")
+        self.longs = array("d")
+        self.elapsed = array("d")
+        self.distances = array("d")
+
+    def __len__(self) -> int:
+        """Return the number of points."""
+        return len(self.lats)
+
+    @classmethod
+    def from_sections(
+        cls, sections: Iterable[tuple[Sequence[Point], float]]
+    ) -> "RouteGeometry":
+        """Build a route from consecutive sections and their durations.
+
+        Each section's duration is spread over its points by distance. A
+        section starting where the last one ended shares that point.
+        """
+        route = cls()
+        for points, duration in sections:
+            if not points:
+                continue
+
+            if len(route) and (route.lats[-1], route.longs[-1]) == tuple(points[0]):
+                points = points[1:]
+            elif not len(route):
+                route._append(points[0], 0, 0)
+                points = points[1:]
+
+            start = (route.lats[-1], route.longs[-1])
+            steps = [haversine_m(a, b) for a, b in zip((start, *points), points)]
+            length = sum(steps)
+            for point, step in zip(points, steps):
+                share = step / length if length > 0 else 1 / len(steps)
+                route._append(
+                    point,
+                    route.elapsed[-1] + duration * share,
+                    route.distances[-1] + step,
+                )
+
+        return route
+
+    def _append(self, point: Point, elapsed: float, distance: float) -> None:
+        self.lats.append(point[0])
+        self.longs.append(point[1])
+        self.elapsed.append(elapsed)
+        self.distances.append(distance)
+
+    def scale_to(self, duration: float) -> None:
+        """Scale the times so the whole route takes duration seconds."""
+        if len(self) and (total := self.elapsed[-1]) > 0:
+            factor = duration / total
+            self.elapsed = array("d", (elapsed * factor for elapsed in self.elapsed))
+
+    def locate(self, point: Point) -> tuple[float, float, float]:
+        """Find the nearest position on the route to a point.
+
+        Returns how far the point is from the route (m), and the time (s) and
+        distance (m) from the start of the route to the nearest position.
+        Uses a flat projection around the point, which is accurate over the
+        few hundred metres that matter.
+        """
+        lat0, long0 = point
+        scale = math.cos(math.radians(lat0))
+        lats, longs = self.lats, self.longs
+
+        if len(self) == 1:
+            return haversine_m(point, (lats[0], longs[0])), 0.0, 0.0
+
+        best = (math.inf, 0, 0.0)
+        x1, y1 = (longs[0] - long0) * scale, lats[0] - lat0
+        for index in range(len(self) - 1):
+            x2, y2 = (longs[index + 1] - long0) * scale, lats[index + 1] - lat0
+            dx, dy = x2 - x1, y2 - y1
+            if (length_sq := dx * dx + dy * dy) > 0:
+                fraction = min(max(-(x1 * dx + y1 * dy) / length_sq, 0.0), 1.0)
+            else:
+                fraction = 0.0
+
+            x, y = x1 + fraction * dx, y1 + fraction * dy
+            if (offset_sq := x * x + y * y) < best[0]:
+                best = (offset_sq, index, fraction)
+
+            x1, y1 = x2, y2
+
+        offset_sq, index, fraction = best
+        offset = math.radians(math.sqrt(offset_sq)) * EARTH_RADIUS_M
+
+        def interpolate(values: array) -> float:
+            return values[index] + fraction * (values[index + 1] - values[index])
+
+        return offset, interpolate(self.elapsed), interpolate(self.distances)
+
+
+def decode_polyline(encoded: str, precision: int = 5) -> list[Point]:
+    """Decode a route in Google's encoded polyline format."""
+    values = []
+    value = shift = 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if not chunk & 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+
+    return _accumulate(values, 2, 10**precision)
+
+
+def decode_flexible_polyline(encoded: str) -> list[Point]:
+    """Decode a route in HERE's flexible polyline format."""
+    values = []
+    value = shift = 0
+    for char in encoded:
+        chunk = _FLEXIBLE_POLYLINE_CHARS[char]
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if not chunk & 0x20:
+            values.append(value)
+            value = shift = 0
+
+    # A format version, then the precision and any third dimension
+    _, header, *values = values
+    dimensions = 3 if (header >> 4) & 7 else 2
+    values = [~(value >> 1) if value & 1 else value >> 1 for value in values]
+    return _accumulate(values, dimensions, 10 ** (header & 15))
+
+
+def _accumulate(deltas: list[int], dimensions: int, factor: float) -> list[Point]:
+    """Turn a flat list of coordinate deltas into points, dropping any height."""
+    lat = long = 0
+    points = []
+    for index in range(0, len(deltas) - dimensions + 1, dimensions):
+        lat += deltas[index]
+        long += deltas[index + 1]
+        points.append((lat / factor, long / factor))
+    return points
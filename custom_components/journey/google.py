@@ -0,0 +1,231 @@
+"""Google Distance Matrix and Geocoding API clients."""
+
+import logging
+import time
+from datetime import datetime, timedelta
+from datetime import time as dt_time
+from zoneinfo import ZoneInfo
+
+import aiohttp
+
+from .api import (
+    TEST_DESTINATION,
+    TEST_ORIGIN,
+    TIMEOUT,
+    AuthenticationError,
+    LocationNotFoundError,
+    MatrixApiClient,
+    QuotaExceededError,
+    TransientApiError,
+    TravelTimeApiError,
+    TravelTimeData,
+    http_error,
+    join_coords,
+)
+from .geometry import RouteGeometry, decode_polyline
+from .metrics import ProviderMetrics
+
+GOOGLE_DISTANCE_MATRIX_URL = "https://maps.googleapis.com/maps/api/distancematrix/json"
+GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+GOOGLE_DIRECTIONS_URL = "https://maps.googleapis.com/maps/api/directions/json"
+
+# Google's daily quotas reset at midnight in this time zone
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def _seconds_until_pacific_midnight() -> float:
+    """Get the time until Google's daily quotas reset, at midnight Pacific time."""
+    now = datetime.now(PACIFIC)
+    midnight = datetime.combine(now.date() + timedelta(days=1), dt_time(), PACIFIC)
+    return (midnight - now).total_seconds()
+
+
+def _google_error(status: str, message: str | None) -> TravelTimeApiError:
+    """Get the error for a non-OK top level Google status."""
+    text = f"Google returned status {status}: {message}"
+    if status == "OVER_DAILY_LIMIT":
+        return QuotaExceededError(text, _seconds_until_pacific_midnight())
+    if status == "OVER_QUERY_LIMIT":
+        return QuotaExceededError(text)
+    if status == "REQUEST_DENIED":
+        return AuthenticationError(text)
+    if status == "UNKNOWN_ERROR":
+        return TransientApiError(text)
+    if status == "ZERO_RESULTS":
+        # Returned at the top level by the Geocoding and Directions APIs
+        return LocationNotFoundError(text)
+    return TravelTimeApiError(text)
+
+
+def _parse_google_element(element: dict) -> TravelTimeData | TravelTimeApiError:
+    """Convert one element of a Distance Matrix response."""
+    status = element["status"]
+    if status != "OK":
+        return TravelTimeApiError(f"Google returned status {status}")
+
+    return TravelTimeData(
+        element["duration"]["value"],
+        element["duration_in_traffic"]["value"],
+        element["distance"]["value"],
+    )
+
+
+class GoogleMapsAsyncApiClient(MatrixApiClient):
+    """Asyncio API client for the Google Distance Matrix and Directions APIs.
+
+    Requests go through a shared aiohttp session, so no executor thread is held
+    while waiting on the network.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        gmaps_token: str,
+        url: str = GOOGLE_DISTANCE_MATRIX_URL,
+        metrics: ProviderMetrics | None = None,
+        geocode_url: str = GOOGLE_GEOCODE_URL,
+        directions_url: str = GOOGLE_DIRECTIONS_URL,
+    ) -> None:
+        """Initialise the API client."""
+        self._session = session
+        self._gmaps_token = gmaps_token
+        self._url = url
+        self._geocode_url = geocode_url
+        self._directions_url = directions_url
+        self.metrics = metrics or ProviderMetrics()
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get the travel time from origin to destination using Google Maps."""
+        results = await self.async_get_traveltime_matrix([origin], [destination])
+        result = results[0][0]
+
+        if isinstance(result, TravelTimeApiError):
+            raise result
+
+        return result
+
+    async def async_get_traveltime_matrix(
+        self, origins: list[str], destinations: list[str]
+    ) -> list[list[TravelTimeData | TravelTimeApiError]]:
+        """Get the travel times between every origin and destination."""
+        result = await self._async_request(
+            {
+                "origins": "|".join(origins),
+                "destinations": "|".join(destinations),
+                "mode": "driving",
+                "departure_time": "now",
+            }
+        )
+
+        return [
+            [_parse_google_element(element) for element in row["elements"]]
+            for row in result["rows"]
+        ]
+
+    async def test_credentials(self) -> bool:
+        """Check the Google Maps API credentials."""
+        try:
+            await self._async_request(
+                {
+                    "origins": join_coords(TEST_ORIGIN),
+                    "destinations": join_coords(TEST_DESTINATION),
+                    "mode": "driving",
+                }
+            )
+            return True
+        except Exception as ex:
+            _LOGGER.error("Failed to validate credentials - %s", ex)
+            raise
+
+    async def async_geocode(self, address: str) -> str:
+        """Get the coordinates of an address using the Google Geocoding API."""
+        result = await self._async_request({"address": address}, self._geocode_url)
+        location = result["results"][0]["geometry"]["location"]
+        return join_coords((location["lat"], location["lng"]))
+
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get the travel time and route using the Google Directions API.
+
+        Each step's duration is spread over its part of the route, then all
+        are scaled to the duration in traffic, which is only given in total.
+        """
+        try:
+            result = await self._async_request(
+                {
+                    "origin": origin,
+                    "destination": destination,
+                    "mode": "driving",
+                    "departure_time": "now",
+                },
+                self._directions_url,
+            )
+        except LocationNotFoundError as ex:
+            # No route between the two points
+            raise TravelTimeApiError(str(ex)) from ex
+
+        leg = result["routes"][0]["legs"][0]
+        data = TravelTimeData(
+            leg["duration"]["value"],
+            leg.get("duration_in_traffic", leg["duration"])["value"],
+            leg["distance"]["value"],
+        )
+
+        geometry = RouteGeometry.from_sections(
+            (decode_polyline(step["polyline"]["points"]), step["duration"]["value"])
+            for step in leg["steps"]
+        )
+        geometry.scale_to(data.travel_time_traffic_secs)
+        return data, geometry
+
+    async def _async_request(
+        self, params: dict[str, str], url: str | None = None
+    ) -> dict:
+        start = time.monotonic()
+        status = "exception"
+
+        try:
+            async with self._session.get(
+                url or self._url,
+                params={**params, "key": self._gmaps_token},
+                timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            ) as response:
+                status = str(response.status)
+                if response.status != 200:
+                    raise http_error(
+                        "Google",
+                        response.status,
+                        response.reason,
+                        response.headers.get("Retry-After"),
+                    )
+                result = await response.json()
+
+            _LOGGER.debug("Raw Google response: %s", result)
+
+            if (status := result.get("status")) != "OK":
+                raise _google_error(status, result.get("error_message"))
+
+            return result
+        except TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            self.metrics.record(time.monotonic() - start, status)
+
+
+def create_client(
+    session: aiohttp.ClientSession,
+    token: str,
+    url: str | None = None,
+    metrics: ProviderMetrics | None = None,
+) -> GoogleMapsAsyncApiClient:
+    """Create a client sending its requests through a shared session."""
+    if url is None:
+        return GoogleMapsAsyncApiClient(session, token, metrics=metrics)
+
+    return GoogleMapsAsyncApiClient(session, token, url, metrics)
@@ -1,10 +1,28 @@
 """Helpers for handling location entities."""
 
 import logging
+import math
+from collections.abc import Callable
 from dataclasses import dataclass
 
-from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import (
+    EVENT_STATE_CHANGED,
+    STATE_HOME,
+    STATE_NOT_HOME,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+)
+from homeassistant.core import Event, HomeAssistant, callback
 from homeassistant.helpers import location
+from homeassistant.helpers.event import EventStateChangedData
+
+from .const import CONF_DESTINATION, CONF_DESTINATIONS, DATA_RESOLVER, DOMAIN
+
+EARTH_RADIUS_M = 6_371_000
+
+# Dependency recorded when a result relies on scanning all zones
+ZONE_DEPENDENCY = "zone"
 
 _LOGGER: logging.Logger = logging.getLogger(__package__)
 
@@ -17,22 +35,58 @@ class LocationData:
     coords: str
 
 
+# Raw states that can never be routed to, e.g. a tracker away from every zone
+NON_LOCATION_STATES = {
+    "",
+    "none",
+    STATE_HOME,
+    STATE_NOT_HOME,
+    STATE_UNAVAILABLE,
+    STATE_UNKNOWN,
+}
+
+
 class FindCoordinatesError(Exception):
     """Error raised when no coordinates can be found for a target."""
 
 
+class UnroutableLocationError(FindCoordinatesError):
+    """Error raised when a location resolved to something that isn't a place."""
+
+
+def check_routable(location: "LocationData") -> None:
+    """Raise UnroutableLocationError if a location is a known non-location state.
+
+    Anything else is either coordinates or, presumably, an address.
+    """
+    if location.coords.strip().lower() in NON_LOCATION_STATES:
+        raise UnroutableLocationError(
+            f"{location.name} is {location.coords!r}, which is not a location"
+        )
+
+
 def find_coordinates(
-    hass: HomeAssistant, name: str, recursion_history: list | None = None
+    hass: HomeAssistant,
+    name: str,
+    recursion_history: list | None = None,
+    dependencies: set[str] | None = None,
 ) -> LocationData:
     """Try to resolve the a location from a supplied name or entity_id.
 
     Will recursively resolve an entity if pointed to by the state of the supplied
     entity.
 
+    If dependencies is supplied, the entity_ids whose state was read are added to
+    it, along with ZONE_DEPENDENCY if the result depends on the set of zones.
+
     Returns coordinates in the form of '90.000,180.000', an address or
     the state of the last resolved entity.
     """
+    if dependencies is None:
+        dependencies = set()
+
     # Check if a friendly name of a zone was supplied
+    dependencies.add(ZONE_DEPENDENCY)
     if (zone_coords := location.resolve_zone(hass, name)) is not None:
         _LOGGER.debug(
             "%s, getting zone location",
@@ -41,6 +95,7 @@ def find_coordinates(
         return LocationData(name, zone_coords)
 
     # Check if an entity_id was supplied.
+    dependencies.add(name)
     if (entity_state := hass.states.get(name)) is None:
         _LOGGER.error("Unable to find entity %s", name)
         raise FindCoordinatesError(f"Unable to find entity {name}")
@@ -92,9 +147,155 @@ def find_coordinates(
     nested_entity = hass.states.get(entity_state.state)
     if nested_entity is not None:
         _LOGGER.debug("Resolving nested entity_id: %s", entity_state.state)
-        return find_coordinates(hass, entity_state.state, recursion_history)
+        return find_coordinates(
+            hass, entity_state.state, recursion_history, dependencies
+        )
 
     # Might be an address, coordinates or anything else.
     # This has to be checked by the caller.
     _LOGGER.debug("%s is in (raw state) '%s'", name, entity_state.state)
     return LocationData(name, entity_state.state)
+
+
+class LocationResolver:
+    """Memoises find_coordinates until an entity it depends on changes.
+
+    Each result is stored with the entity_ids read while resolving it. A state
+    change to any of those entities drops the result, and a change to any zone
+    drops everything, since zones are looked up by scanning them all.
+
+    Whether the resolver's own listener sees a state change before the
+    handlers tracking that entity depends on how Home Assistant dispatches
+    them, so handlers that resolve locations call async_invalidate first
+    rather than risk reading the result from before the change.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the resolver."""
+        self.hass = hass
+        self.hits = 0
+        self.misses = 0
+
+        self._results: dict[str, LocationData] = {}
+        self._dependents: dict[str, set[str]] = {}
+        self._users: set[str] = set()
+        self._unsub: Callable[[], None] | None = None
+        self._last_event: Event[EventStateChangedData] | None = None
+
+    def __len__(self) -> int:
+        """Return the number of cached results."""
+        return len(self._results)
+
+    @callback
+    def resolve(self, name: str) -> LocationData:
+        """Resolve a location, using the cached result if there is one."""
+        if (result := self._results.get(name)) is not None:
+            self.hits += 1
+            return result
+
+        self.misses += 1
+        dependencies: set[str] = set()
+        result = find_coordinates(self.hass, name, dependencies=dependencies)
+
+        self._results[name] = result
+        for entity_id in dependencies:
+            self._dependents.setdefault(entity_id, set()).add(name)
+
+        return result
+
+    @callback
+    def async_add_user(self, user: str) -> Callable[[], None]:
+        """Register a user, listening for changes while there are any."""
+        self._users.add(user)
+
+        if self._unsub is None:
+            self._unsub = self.hass.bus.async_listen(
+                EVENT_STATE_CHANGED, self._handle_state_change
+            )
+
+        @callback
+        def remove_user() -> None:
+            self._users.discard(user)
+            if not self._users and self._unsub is not None:
+                self._unsub()
+                self._unsub = None
+                self.clear()
+
+        return remove_user
+
+    @callback
+    def clear(self) -> None:
+        """Drop all cached results."""
+        self._results.clear()
+        self._dependents.clear()
+
+    @callback
+    def async_invalidate(self, event: Event[EventStateChangedData]) -> None:
+        """Drop the results that depend on the entity a state change is for.
+
+        Each event is only handled once, so results resolved after a handler
+        has invalidated them are not dropped again by the resolver's listener.
+        """
+        if event is self._last_event:
+            return
+        self._last_event = event
+
+        entity_id = event.data["entity_id"]
+        if entity_id.startswith(f"{ZONE_DEPENDENCY}."):
+            self.clear()
+            return
+
+        for name in self._dependents.pop(entity_id, ()):
+            self._results.pop(name, None)
+
+    @callback
+    def _handle_state_change(self, event: Event[EventStateChangedData]) -> None:
+        self.async_invalidate(event)
+
+
+@callback
+def async_get_resolver(hass: HomeAssistant) -> LocationResolver:
+    """Get the shared location resolver, creating it if required."""
+    data = hass.data.setdefault(DOMAIN, {})
+
+    if (resolver := data.get(DATA_RESOLVER)) is None:
+        resolver = data[DATA_RESOLVER] = LocationResolver(hass)
+
+    return resolver
+
+
+def parse_coords(coords: str) -> tuple[float, float] | None:
+    """Parse a 'lat,long' string, returning None if it is not coordinates."""
+    try:
+        lat, long = (float(x) for x in coords.split(","))
+    except ValueError:
+        return None
+
+    if not (-90 <= lat <= 90 and -180 <= long <= 180):
+        return None
+
+    return lat, long
+
+
+def haversine_m(a: tuple[float, float], b: tuple[float, float]) -> float:
+    """Get the great-circle distance in metres between two (lat, long) points."""
+    lat1, long1, lat2, long2 = map(math.radians, (*a, *b))
+
+    h = (
+        math.sin((lat2 - lat1) / 2) ** 2
+        + math.cos(lat1) * math.cos(lat2) * math.sin((long2 - long1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(h))
+
+
+def round_or_none(value: float) -> int | None:
+    """Round a duration or distance to a whole number, or None if it is unknown."""
+    return round(value) if not math.isnan(value) else None
+
+
+def get_entry_destinations(entry: ConfigEntry) -> list[str]:
+    """Get the destinations of an entry, which may have one or a list."""
+    if destinations := entry.data.get(CONF_DESTINATIONS):
+        return list(destinations)
+
+    return [entry.data[CONF_DESTINATION]]
@@ -0,0 +1,179 @@
+"""HERE Routing and Geocoding API clients."""
+
+import logging
+import time
+
+import aiohttp
+
+from .api import (
+    TEST_DESTINATION,
+    TEST_ORIGIN,
+    TIMEOUT,
+    ApiClient,
+    LocationNotFoundError,
+    TravelTimeApiError,
+    TravelTimeData,
+    http_error,
+    join_coords,
+    split_coords,
+)
+from .geometry import RouteGeometry, decode_flexible_polyline
+from .metrics import ProviderMetrics
+
+HERE_ROUTES_URL = "https://router.hereapi.com/v8/routes"
+HERE_GEOCODE_URL = "https://geocode.search.hereapi.com/v1/geocode"
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def _parse_here_route(route: dict) -> TravelTimeData:
+    """Convert one route of a HERE Routing response."""
+    summary = route["sections"][0]["summary"]
+
+    return TravelTimeData(
+        summary["typicalDuration"],
+        summary["duration"],
+        summary["length"],
+    )
+
+
+class HereMapsAsyncApiClient(ApiClient):
+    """Asyncio API client for the HERE Routing API.
+
+    Requests go through a shared aiohttp session, so no executor thread is held
+    while waiting on the network.
+    """
+
+    def __init__(
+        self,
+        session: aiohttp.ClientSession,
+        here_token: str,
+        url: str = HERE_ROUTES_URL,
+        metrics: ProviderMetrics | None = None,
+        geocode_url: str = HERE_GEOCODE_URL,
+    ) -> None:
+        """Initialise the API client."""
+        self._session = session
+        self._here_token = here_token
+        self._url = url
+        self._geocode_url = geocode_url
+        self.metrics = metrics or ProviderMetrics()
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get the travel time from origin to destination using HERE."""
+        result = await self._async_request(
+            {
+                "origin": join_coords(split_coords(origin)),
+                "destination": join_coords(split_coords(destination)),
+                "transportMode": "car",
+                "return": "summary,typicalDuration",
+            }
+        )
+
+        return _parse_here_route(result["routes"][0])
+
+    async def test_credentials(self) -> bool:
+        """Check the HERE API credentials."""
+        try:
+            await self._async_request(
+                {
+                    "origin": join_coords(TEST_ORIGIN),
+                    "destination": join_coords(TEST_DESTINATION),
+                    "transportMode": "car",
+                    "return": "summary",
+                }
+            )
+            return True
+        except Exception as ex:
+            _LOGGER.error("Failed to validate credentials - %s", ex)
+            raise
+
+    async def async_geocode(self, address: str) -> str:
+        """Get the coordinates of an address using the HERE Geocoding API."""
+        result = await self._async_request({"q": address}, self._geocode_url)
+        if not (items := result.get("items")):
+            raise LocationNotFoundError(f"HERE could not find {address!r}")
+
+        position = items[0]["position"]
+        return join_coords((position["lat"], position["lng"]))
+
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get the travel time and route using HERE, with durations per span."""
+        result = await self._async_request(
+            {
+                "origin": join_coords(split_coords(origin)),
+                "destination": join_coords(split_coords(destination)),
+                "transportMode": "car",
+                "return": "polyline,summary,typicalDuration",
+                "spans": "duration",
+            }
+        )
+
+        route = result["routes"][0]
+        data = _parse_here_route(route)
+
+        # Each span runs from its offset in the polyline to the next span's
+        section = route["sections"][0]
+        points = decode_flexible_polyline(section["polyline"])
+        spans = section.get("spans") or [{"offset": 0, "duration": 1}]
+        offsets = [span["offset"] for span in spans] + [len(points) - 1]
+        geometry = RouteGeometry.from_sections(
+            (points[start : end + 1], span["duration"])
+            for span, start, end in zip(spans, offsets, offsets[1:])
+        )
+        geometry.scale_to(data.travel_time_traffic_secs)
+        return data, geometry
+
+    async def _async_request(
+        self, params: dict[str, str], url: str | None = None
+    ) -> dict:
+        start = time.monotonic()
+        status = "exception"
+
+        try:
+            async with self._session.get(
+                url or self._url,
+                params={**params, "apiKey": self._here_token},
+                timeout=aiohttp.ClientTimeout(total=TIMEOUT),
+            ) as response:
+                status = str(response.status)
+                result = await response.json(content_type=None)
+
+                if response.status != 200:
+                    raise http_error(
+                        "HERE",
+                        response.status,
+                        result.get("title"),
+                        response.headers.get("Retry-After"),
+                    )
+
+            if url is None and not result.get("routes"):
+                status = "NO_ROUTE"
+                raise TravelTimeApiError(
+                    f"HERE returned no routes: {result.get('notices')}"
+                )
+
+            status = "OK"
+            return result
+        except TimeoutError:
+            status = "timeout"
+            raise
+        finally:
+            self.metrics.record(time.monotonic() - start, status)
+
+
+def create_client(
+    session: aiohttp.ClientSession,
+    token: str,
+    url: str | None = None,
+    metrics: ProviderMetrics | None = None,
+) -> HereMapsAsyncApiClient:
+    """Create a client sending its requests through a shared session."""
+    if url is None:
+        return HereMapsAsyncApiClient(session, token, metrics=metrics)
+
+    return HereMapsAsyncApiClient(session, token, url, metrics)
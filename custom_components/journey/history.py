@@ -0,0 +1,364 @@
+"""Travel time history and typical weekly profiles per route."""
+
+import asyncio
+import base64
+import bisect
+import logging
+import math
+import time
+from array import array
+from collections import deque
+from datetime import datetime
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .api import ApiClient, TravelTimeData
+from .cache import quantise
+from .const import (
+    DATA_HISTORY,
+    DEFAULT_CACHE_MAX_TTL,
+    DEFAULT_HISTORY_MAX_AGE,
+    DEFAULT_PROFILE_MAX_AGE,
+    DEFAULT_PROFILE_MIN_SAMPLES,
+    DEFAULT_PROFILE_TOLERANCE,
+    DOMAIN,
+)
+
+STORAGE_KEY = f"{DOMAIN}.history"
+STORAGE_VERSION = 1
+
+# Seconds to wait for further observations before writing to disk
+SAVE_DELAY = 300
+
+SLOT_MINUTES = 15
+SLOTS_PER_WEEK = 7 * 24 * 60 // SLOT_MINUTES
+
+# Routes are grouped to roughly 100 m, so small differences in origin still
+# build one profile
+ROUTE_PRECISION = 3
+
+# Number of recent live results that must match the profile
+MATCHES_REQUIRED = 3
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+def week_slot(when: datetime) -> int:
+    """Get the 15 minute slot of the week (local time) a moment falls in."""
+    when = dt_util.as_local(when)
+    return (when.weekday() * 24 * 60 + when.hour * 60 + when.minute) // SLOT_MINUTES
+
+
+class RouteHistory:
+    """Recent travel times of one route, with running totals per weekly slot.
+
+    Observations are held in typed arrays (4 bytes per time and duration, 2
+    per slot), oldest first. The per-slot totals are updated as observations
+    are added and dropped, so a profile lookup is O(1).
+    """
+
+    def __init__(self) -> None:
+        """Initialise an empty history."""
+        self.times = array("I")
+        self.slots = array("H")
+        self.durations = array("f")
+        self.travel_time_secs = math.nan
+        self.distance_m = math.nan
+        self.last_observed = 0.0
+
+        self._count = array("I", [0]) * SLOTS_PER_WEEK
+        self._sum = array("d", [0]) * SLOTS_PER_WEEK
+        self._sum_sq = array("d", [0]) * SLOTS_PER_WEEK
+        self._errors: deque[float] = deque(maxlen=MATCHES_REQUIRED)
+        self._last: TravelTimeData | None = None
+
+    def __len__(self) -> int:
+        """Return the number of observations held."""
+        return len(self.times)
+
+    def record(self, when: datetime, data: TravelTimeData) -> None:
+        """Add a live result, noting how far it was from the profile.
+
+        A result equal to the last one, within the longest time a result is
+        cached, is taken to be that result again from a cache further down.
+        Results passing through failover are copies, so are compared by value.
+        """
+        if (
+            data == self._last
+            and when.timestamp() - self.last_observed < DEFAULT_CACHE_MAX_TTL
+        ):
+            return
+
+        self._last = data
+        slot = week_slot(when)
+        if (typical := self.typical(slot)) is not None:
+            self._errors.append(
+                abs(data.travel_time_traffic_secs - typical[0]) / max(typical[0], 1)
+            )
+
+        self._add(int(when.timestamp()), slot, data.travel_time_traffic_secs)
+        self.travel_time_secs = data.travel_time_secs
+        self.distance_m = data.distance_m
+        self.last_observed = when.timestamp()
+
+    def prune(self, before: float) -> None:
+        """Drop observations made before a timestamp."""
+        cut = bisect.bisect_left(self.times, before)
+        for slot, duration in zip(self.slots[:cut], self.durations[:cut]):
+            self._count[slot] -= 1
+            self._sum[slot] -= duration
+            self._sum_sq[slot] -= duration * duration
+
+        del self.times[:cut]
+        del self.slots[:cut]
+        del self.durations[:cut]
+
+    def typical(
+        self, slot: int, min_samples: int = DEFAULT_PROFILE_MIN_SAMPLES
+    ) -> tuple[float, float] | None:
+        """Get the mean and standard deviation of the duration in a slot."""
+        if (count := self._count[slot]) < min_samples:
+            return None
+
+        mean = self._sum[slot] / count
+        variance = max(self._sum_sq[slot] / count - mean * mean, 0)
+        return mean, math.sqrt(variance)
+
+    def predict(
+        self,
+        when: datetime,
+        tolerance: float = DEFAULT_PROFILE_TOLERANCE,
+        max_age: float = DEFAULT_PROFILE_MAX_AGE,
+    ) -> TravelTimeData | None:
+        """Predict the travel time from the profile, if it can be trusted.
+
+        That requires the slot to be quiet (its durations vary by less than the
+        tolerance), the last few live results to have matched the profile
+        within the tolerance, and a live result within max_age seconds.
+        """
+        if when.timestamp() - self.last_observed > max_age:
+            return None
+
+        if len(self._errors) < MATCHES_REQUIRED or max(self._errors) > tolerance:
+            return None
+
+        if (typical := self.typical(week_slot(when))) is None:
+            return None
+
+        mean, deviation = typical
+        if deviation > tolerance * mean:
+            return None
+
+        return TravelTimeData(self.travel_time_secs, mean, self.distance_m)
+
+    def _add(self, timestamp: int, slot: int, duration: float) -> None:
+        self.times.append(timestamp)
+        self.slots.append(slot)
+        self.durations.append(duration)
+        self._count[slot] += 1
+        self._sum[slot] += duration
+        self._sum_sq[slot] += duration * duration
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get the history in a form that can be stored as JSON."""
+        return {
+            "times": _encode(self.times),
+            "slots": _encode(self.slots),
+            "durations": _encode(self.durations),
+            "travel_time_secs": self.travel_time_secs,
+            "distance_m": self.distance_m,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RouteHistory":
+        """Rebuild a history, and its totals, from stored data."""
+        history = cls()
+        for timestamp, slot, duration in zip(
+            _decode("I", data["times"]),
+            _decode("H", data["slots"]),
+            _decode("f", data["durations"]),
+            strict=True,
+        ):
+            history._add(timestamp, slot, duration)
+
+        history.travel_time_secs = data["travel_time_secs"]
+        history.distance_m = data["distance_m"]
+        return history
+
+
+def _encode(values: array) -> str:
+    return base64.b64encode(values.tobytes()).decode()
+
+
+def _decode(typecode: str, data: str) -> array:
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    return values
+
+
+class TravelTimeHistory:
+    """Histories of every route, kept on disk.
+
+    Observations older than DEFAULT_HISTORY_MAX_AGE are dropped, so profiles
+    follow changes in traffic over the weeks.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the history."""
+        self.hass = hass
+        self.predictions = 0
+
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._routes: dict[str, RouteHistory] = {}
+        self._load_task: asyncio.Task | None = None
+
+    def __len__(self) -> int:
+        """Return the number of routes with a history."""
+        return len(self._routes)
+
+    async def async_load(self) -> None:
+        """Load the saved histories, once."""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+
+        await self._load_task
+
+    async def _async_load(self) -> None:
+        if (data := await self._store.async_load()) is None:
+            return
+
+        before = time.time() - DEFAULT_HISTORY_MAX_AGE
+        for key, route in data.get("routes", {}).items():
+            history = RouteHistory.from_dict(route)
+            history.prune(before)
+            if len(history):
+                self._routes[key] = history
+
+        _LOGGER.debug("Loaded travel time history of %d routes", len(self._routes))
+
+    @staticmethod
+    def key(provider: str, origin: str, destination: str) -> str:
+        """Get the key of the history of a route."""
+        return "|".join(
+            (
+                provider,
+                quantise(origin, ROUTE_PRECISION),
+                quantise(destination, ROUTE_PRECISION),
+            )
+        )
+
+    @callback
+    def async_predict(
+        self, provider: str, origin: str, destination: str
+    ) -> TravelTimeData | None:
+        """Predict the travel time of a route from its profile, if trusted."""
+        if (
+            history := self._routes.get(self.key(provider, origin, destination))
+        ) is None:
+            return None
+
+        if (result := history.predict(dt_util.now())) is not None:
+            self.predictions += 1
+
+        return result
+
+    @callback
+    def async_record(
+        self, provider: str, origin: str, destination: str, data: TravelTimeData
+    ) -> None:
+        """Record a live result."""
+        if math.isnan(data.travel_time_traffic_secs):
+            return
+
+        history = self._routes.setdefault(
+            self.key(provider, origin, destination), RouteHistory()
+        )
+        history.prune(time.time() - DEFAULT_HISTORY_MAX_AGE)
+        history.record(dt_util.now(), data)
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_add_traffic(self, data: TravelTimeData) -> TravelTimeData:
+        """Estimate the duration in traffic of a free-flow result.
+
+        The nominal duration is scaled by how much slower than nominal the
+        routes with a profile typically are at this time of week.
+        """
+        slot = week_slot(dt_util.now())
+        factors = [
+            typical[0] / history.travel_time_secs
+            for history in self._routes.values()
+            if history.travel_time_secs > 0
+            and (typical := history.typical(slot)) is not None
+        ]
+        factor = sum(factors) / len(factors) if factors else 1.0
+
+        return TravelTimeData(
+            data.travel_time_secs, data.travel_time_secs * factor, data.distance_m
+        )
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Get the history counters."""
+        return {
+            "routes": len(self._routes),
+            "observations": sum(map(len, self._routes.values())),
+            "predictions": self.predictions,
+        }
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {"routes": {key: route.as_dict() for key, route in self._routes.items()}}
+
+
+class ProfileApiClient(ApiClient):
+    """Wraps a client, recording its results and answering from the profiles.
+
+    Live requests are skipped while a route's recent results match its profile
+    and the time of week is a quiet one, typically off-peak. Results without a
+    duration in traffic get one from the typical traffic of the time of week.
+    """
+
+    def __init__(
+        self, client: ApiClient, history: TravelTimeHistory, provider: str
+    ) -> None:
+        """Initialise the client."""
+        self._client = client
+        self.history = history
+        self.provider = provider
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination, from the profile if trusted."""
+        if (
+            result := self.history.async_predict(self.provider, origin, destination)
+        ) is not None:
+            _LOGGER.debug("Using typical travel time for %s -> %s", origin, destination)
+            return result
+
+        result = await self._client.async_get_traveltime(origin, destination)
+        if math.isnan(result.travel_time_traffic_secs):
+            # A free-flow estimate, e.g. from a road graph
+            return self.history.async_add_traffic(result)
+
+        self.history.async_record(self.provider, origin, destination, result)
+        return result
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
+
+
+async def async_get_history(hass: HomeAssistant) -> TravelTimeHistory:
+    """Get the shared travel time history, loaded, creating it if required."""
+    data = hass.data.setdefault(DOMAIN, {})
+
+    if (history := data.get(DATA_HISTORY)) is None:
+        history = data[DATA_HISTORY] = TravelTimeHistory(hass)
+
+    await history.async_load()
+    return history
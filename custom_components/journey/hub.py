@@ -0,0 +1,128 @@
+"""Shared subscriptions to origin entities."""
+
+import asyncio
+import logging
+from collections.abc import Callable
+from typing import Protocol
+
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.event import (
+    EventStateChangedData,
+    async_track_state_change_event,
+)
+
+from .const import DATA_HUB, DOMAIN
+from .helpers import FindCoordinatesError, LocationResolver, async_get_resolver
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class OriginSubscriber(Protocol):
+    """Something that follows an origin entity, e.g. a coordinator."""
+
+    def async_origin_changed(self, event: Event[EventStateChangedData]) -> bool:
+        """Handle an origin update, returning True if a refresh is needed."""
+
+    async def async_refresh(self) -> None:
+        """Refresh the subscriber's data."""
+
+
+class OriginHub:
+    """One state listener per origin entity, shared by every subscriber.
+
+    Each update is resolved once, through the shared resolver, before the
+    subscribers are told about it. Subscribers needing a refresh are refreshed
+    together, so their requests reach the API client at the same time and can
+    be batched. Updates arriving while a batch is running are collected into
+    the next one.
+    """
+
+    def __init__(self, hass: HomeAssistant, resolver: LocationResolver) -> None:
+        """Initialise the hub."""
+        self.hass = hass
+        self.resolver = resolver
+        self.batches = 0
+
+        self._subscribers: dict[str, list[OriginSubscriber]] = {}
+        self._unsubs: dict[str, Callable[[], None]] = {}
+        self._pending: dict[str, set[OriginSubscriber]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        """Return the number of tracked origins."""
+        return len(self._subscribers)
+
+    @callback
+    def async_subscribe(
+        self, entity_id: str, subscriber: OriginSubscriber
+    ) -> Callable[[], None]:
+        """Follow an origin, returning a function to unsubscribe."""
+        subscribers = self._subscribers.setdefault(entity_id, [])
+        subscribers.append(subscriber)
+
+        if entity_id not in self._unsubs:
+            self._unsubs[entity_id] = async_track_state_change_event(
+                self.hass, entity_id, self._handle_state_change
+            )
+
+        @callback
+        def unsubscribe() -> None:
+            if subscriber in subscribers:
+                subscribers.remove(subscriber)
+            if (pending := self._pending.get(entity_id)) is not None:
+                pending.discard(subscriber)
+            if not subscribers and self._subscribers.get(entity_id) is subscribers:
+                del self._subscribers[entity_id]
+                self._unsubs.pop(entity_id)()
+
+        return unsubscribe
+
+    @callback
+    def _handle_state_change(self, event: Event[EventStateChangedData]) -> None:
+        entity_id = event.data["entity_id"]
+
+        # The resolver's own listener may not have seen this change yet.
+        # Subscribers resolving the origin then read the memoised new result
+        self.resolver.async_invalidate(event)
+        try:
+            self.resolver.resolve(entity_id)
+        except FindCoordinatesError as ex:
+            _LOGGER.debug("Could not resolve %s: %r", entity_id, ex)
+
+        stale = {
+            subscriber
+            for subscriber in self._subscribers.get(entity_id, ())
+            if subscriber.async_origin_changed(event)
+        }
+        if not stale:
+            return
+
+        self._pending.setdefault(entity_id, set()).update(stale)
+        if entity_id not in self._tasks:
+            self._tasks[entity_id] = self.hass.async_create_task(
+                self._async_refresh(entity_id)
+            )
+
+    async def _async_refresh(self, entity_id: str) -> None:
+        try:
+            while subscribers := self._pending.pop(entity_id, None):
+                _LOGGER.debug(
+                    "Refreshing %d journeys from %s", len(subscribers), entity_id
+                )
+                self.batches += 1
+                await asyncio.gather(
+                    *(subscriber.async_refresh() for subscriber in subscribers)
+                )
+        finally:
+            del self._tasks[entity_id]
+
+
+@callback
+def async_get_hub(hass: HomeAssistant) -> OriginHub:
+    """Get the shared origin hub, creating it if required."""
+    data = hass.data.setdefault(DOMAIN, {})
+
+    if (hub := data.get(DATA_HUB)) is None:
+        hub = data[DATA_HUB] = OriginHub(hass, async_get_resolver(hass))
+
+    return hub
@@ -0,0 +1,118 @@
+"""Lightweight metrics for API clients and coordinators."""
+
+import bisect
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+# Upper bounds of the histogram buckets, in seconds
+LATENCY_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Fixed-bucket histogram of durations.
+
+    Recording is a bisect and an increment, so it is cheap enough to leave on
+    in the hot path.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialise an empty histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float) -> None:
+        """Add a duration to the histogram."""
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float | None:
+        """Estimate a percentile (0-100) as the upper bound of its bucket."""
+        if not self.count:
+            return None
+
+        target = q / 100 * self.count
+        seen = 0
+        for bound, count in zip((*self.buckets, self.max), self.counts):
+            seen += count
+            if seen >= target:
+                return min(bound, self.max)
+
+        return self.max
+
+    @property
+    def mean(self) -> float | None:
+        """Get the mean duration."""
+        return self.total / self.count if self.count else None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the histogram."""
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "buckets": dict(
+                zip([*map(str, self.buckets), "inf"], self.counts, strict=True)
+            ),
+        }
+
+
+@dataclass
+class ProviderMetrics:
+    """Metrics for the requests made on one provider and token."""
+
+    latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    requests: int = 0
+    statuses: Counter[str] = field(default_factory=Counter)
+
+    def record(self, seconds: float, status: str) -> None:
+        """Record a completed request and the status it returned."""
+        self.requests += 1
+        self.latency.record(seconds)
+        self.statuses[status] += 1
+
+    @property
+    def errors(self) -> int:
+        """Get the number of requests that did not succeed."""
+        return self.requests - self.statuses["OK"]
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the metrics."""
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "statuses": dict(self.statuses),
+            "latency": self.latency.as_dict(),
+        }
+
+
+@dataclass
+class JourneyMetrics:
+    """Metrics for the refreshes of one journey."""
+
+    refreshes: int = 0
+    failures: int = 0
+    api_calls: int = 0
+    predictions: int = 0
+    api_latency: LatencyHistogram = field(default_factory=LatencyHistogram)
+    find_coordinates: LatencyHistogram = field(default_factory=LatencyHistogram)
+    setup_time: float | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        """Get a summary of the metrics."""
+        return {
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "api_calls": self.api_calls,
+            "predictions": self.predictions,
+            "api_latency": self.api_latency.as_dict(),
+            "find_coordinates": self.find_coordinates.as_dict(),
+            "setup_time": self.setup_time,
+        }
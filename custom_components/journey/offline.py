@@ -0,0 +1,441 @@
+"""Offline travel time estimates from a local road graph.
+
+The graph is a file compiled ahead of time (see write_graph, and
+scripts/build_road_graph.py for building one from an OpenStreetMap extract)
+and memory-mapped, so only the parts a query touches are read from disk.
+Journeys are routed by travel time with bidirectional A*, needing no network
+and no API quota.
+"""
+
+import asyncio
+import bisect
+import heapq
+import logging
+import math
+import mmap
+import struct
+import sys
+import time
+from array import array
+from collections.abc import Iterable
+
+import aiohttp
+
+from .api import (
+    ApiClient,
+    LocationNotFoundError,
+    TravelTimeApiError,
+    TravelTimeData,
+    split_coords,
+)
+from .geometry import RouteGeometry
+from .helpers import haversine_m
+from .metrics import ProviderMetrics
+
+MAGIC = b"JRNYGRF1"
+
+# Magic, node count, edge count, cell count, fastest speed (m/s), cells per degree
+HEADER = struct.Struct("<8sIIIfI")
+
+# Nodes are grouped in cells of 1/100 degree, roughly 1 km, to find the
+# nearest one
+CELLS_PER_DEGREE = 100
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+# Offsets, targets, times (s) and lengths (m) of the edges, by source or target
+type _Edges = tuple[
+    memoryview[int], memoryview[int], memoryview[float], memoryview[float]
+]
+
+# Distances, parents, heap, settled nodes, edges and potential sign of a search
+type _Search = tuple[
+    dict[int, float],
+    dict[int, tuple[int, int]],
+    list[tuple[float, int]],
+    set[int],
+    _Edges,
+    int,
+]
+
+
+def _cell(lat: float, long: float, per_degree: int) -> tuple[int, int]:
+    return math.floor((lat + 90) * per_degree), math.floor((long + 180) * per_degree)
+
+
+def _cell_key(row: int, col: int, per_degree: int) -> int:
+    return row * 360 * per_degree + col
+
+
+class RoadGraph:
+    """A directed road graph, memory-mapped from a compiled file.
+
+    Nodes are stored sorted by grid cell, with the start of each cell indexed,
+    so the nearest node to a point is found by looking at the cells around
+    it. Edges are held twice in compressed sparse row form, once by source
+    and once by target, for the two directions of the search.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Map a compiled graph file into memory."""
+        if sys.byteorder != "little":
+            raise TravelTimeApiError(
+                "Road graphs can only be read on little-endian hosts"
+            )
+
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, nodes, edges, cells, max_speed, per_degree = HEADER.unpack_from(
+            self._map
+        )
+        if magic != MAGIC:
+            raise TravelTimeApiError(f"{path} is not a compiled road graph")
+
+        self.max_speed = max_speed
+        self.cells_per_degree = per_degree
+        self.nodes = nodes
+        self.edges = edges
+
+        view = memoryview(self._map)
+        offset = HEADER.size
+
+        def section(count: int) -> memoryview:
+            nonlocal offset
+            start, offset = offset, offset + 4 * count
+            return view[start:offset]
+
+        self.lat = section(nodes).cast("f")
+        self.long = section(nodes).cast("f")
+        self.cell_keys = section(cells).cast("I")
+        self.cell_starts = section(cells + 1).cast("I")
+        self.forward: _Edges = (
+            section(nodes + 1).cast("I"),
+            section(edges).cast("I"),
+            section(edges).cast("f"),
+            section(edges).cast("f"),
+        )
+        self.reverse: _Edges = (
+            section(nodes + 1).cast("I"),
+            section(edges).cast("I"),
+            section(edges).cast("f"),
+            section(edges).cast("f"),
+        )
+
+    def nearest(self, lat: float, long: float) -> int | None:
+        """Get the node nearest a point, searching the surrounding cells."""
+        row, col = _cell(lat, long, self.cells_per_degree)
+        best, best_distance = None, math.inf
+
+        for r in (row - 1, row, row + 1):
+            for c in (col - 1, col, col + 1):
+                key = _cell_key(r, c, self.cells_per_degree)
+                index = bisect.bisect_left(self.cell_keys, key)
+                if index == len(self.cell_keys) or self.cell_keys[index] != key:
+                    continue
+
+                for node in range(self.cell_starts[index], self.cell_starts[index + 1]):
+                    distance = haversine_m(
+                        (lat, long), (self.lat[node], self.long[node])
+                    )
+                    if distance < best_distance:
+                        best, best_distance = node, distance
+
+        return best
+
+    def route(self, source: int, target: int) -> list[tuple[int, float, float]] | None:
+        """Get the quickest route, or None if there is no route.
+
+        The route is a list of nodes from source to target, each with the
+        time (s) and length (m) of the road leading to it.
+
+        Both searches use the average of the two straight-line potentials,
+        which keeps them consistent with each other, so the search can stop
+        once the two frontiers together are no shorter than the best route.
+        """
+        if source == target:
+            return [(source, 0.0, 0.0)]
+
+        s = (self.lat[source], self.long[source])
+        t = (self.lat[target], self.long[target])
+        speed = 2 * self.max_speed
+        potentials: dict[int, float] = {}
+
+        def potential(node: int) -> float:
+            if (value := potentials.get(node)) is None:
+                point = (self.lat[node], self.long[node])
+                value = potentials[node] = (
+                    haversine_m(point, t) - haversine_m(s, point)
+                ) / speed
+            return value
+
+        searches: tuple[_Search, _Search] = (
+            ({source: 0.0}, {}, [(potential(source), source)], set(), self.forward, 1),
+            (
+                {target: 0.0},
+                {},
+                [(-potential(target), target)],
+                set(),
+                self.reverse,
+                -1,
+            ),
+        )
+        best, meeting = math.inf, None
+
+        while searches[0][2] and searches[1][2]:
+            if searches[0][2][0][0] + searches[1][2][0][0] >= best:
+                break
+
+            # Grow the smaller frontier
+            side = 0 if len(searches[0][2]) <= len(searches[1][2]) else 1
+            distances, parents, heap, settled, graph, sign = searches[side]
+            other = searches[1 - side][0]
+
+            _, node = heapq.heappop(heap)
+            if node in settled:
+                continue
+            settled.add(node)
+
+            offsets, targets, times, _ = graph
+            distance = distances[node]
+            for edge in range(offsets[node], offsets[node + 1]):
+                neighbour = targets[edge]
+                candidate = distance + times[edge]
+                if candidate >= distances.get(neighbour, math.inf):
+                    continue
+
+                distances[neighbour] = candidate
+                parents[neighbour] = (node, edge)
+                heapq.heappush(
+                    heap, (candidate + sign * potential(neighbour), neighbour)
+                )
+
+                if (remaining := other.get(neighbour)) is not None and (
+                    candidate + remaining < best
+                ):
+                    best, meeting = candidate + remaining, neighbour
+
+        if meeting is None:
+            return None
+
+        # Walk back from where the searches met to the source, then on to the
+        # target
+        path = [(meeting, 0.0, 0.0)]
+        node = meeting
+        _, _, times, lengths = self.forward
+        while (parent := searches[0][1].get(node)) is not None:
+            previous, edge = parent
+            path[-1] = (node, times[edge], lengths[edge])
+            path.append((previous, 0.0, 0.0))
+            node = previous
+        path.reverse()
+
+        node = meeting
+        _, _, times, lengths = self.reverse
+        while (parent := searches[1][1].get(node)) is not None:
+            node, edge = parent
+            path.append((node, times[edge], lengths[edge]))
+
+        return path
+
+
+def write_graph(
+    path: str,
+    points: list[tuple[float, float]],
+    edges: Iterable[tuple[int, int, float, float]],
+    cells_per_degree: int = CELLS_PER_DEGREE,
+) -> None:
+    """Compile a road graph to a file that RoadGraph can map.
+
+    points holds the (lat, long) of each node, and edges are (source, target,
+    seconds, metres). One-way roads have one edge; others need one each way.
+    """
+    # Renumber the nodes in order of their cell
+    keys = [
+        _cell_key(*_cell(lat, long, cells_per_degree), cells_per_degree)
+        for lat, long in points
+    ]
+    order = sorted(range(len(points)), key=keys.__getitem__)
+    renumber = array("I", [0]) * len(points)
+    for new, old in enumerate(order):
+        renumber[old] = new
+
+    cell_keys = array("I")
+    cell_starts = array("I")
+    for new, old in enumerate(order):
+        if not cell_keys or cell_keys[-1] != keys[old]:
+            cell_keys.append(keys[old])
+            cell_starts.append(new)
+    cell_starts.append(len(points))
+
+    renumbered = [
+        (renumber[source], renumber[target], seconds, metres)
+        for source, target, seconds, metres in edges
+    ]
+    # Rounded up a little, so the potentials stay below the true time left
+    max_speed = 1.01 * max(
+        (metres / seconds for *_, seconds, metres in renumbered if seconds > 0),
+        default=1.0,
+    )
+
+    with open(path, "wb") as file:
+        file.write(
+            HEADER.pack(
+                MAGIC,
+                len(points),
+                len(renumbered),
+                len(cell_keys),
+                max_speed,
+                cells_per_degree,
+            )
+        )
+        array("f", (points[old][0] for old in order)).tofile(file)
+        array("f", (points[old][1] for old in order)).tofile(file)
+        cell_keys.tofile(file)
+        cell_starts.tofile(file)
+
+        # Edges by source for the forward search, then by target, reversed,
+        # for the reverse one
+        reverse = [
+            (target, source, seconds, metres)
+            for source, target, seconds, metres in renumbered
+        ]
+        for ordered in (renumbered, reverse):
+            ordered.sort(key=lambda edge: edge[0])
+            offsets = array("I", [0]) * (len(points) + 1)
+            for edge in ordered:
+                offsets[edge[0] + 1] += 1
+            for node in range(len(points)):
+                offsets[node + 1] += offsets[node]
+
+            offsets.tofile(file)
+            array("I", (edge[1] for edge in ordered)).tofile(file)
+            array("f", (edge[2] for edge in ordered)).tofile(file)
+            array("f", (edge[3] for edge in ordered)).tofile(file)
+
+
+class OfflineApiClient(ApiClient):
+    """Travel times from a local road graph, with no network requests.
+
+    Results are free-flow times, so the duration in traffic is NaN. The
+    typical traffic of the time of week is applied by ProfileApiClient.
+    The graph is mapped on the first request, in the executor, as are the
+    searches.
+    """
+
+    def __init__(self, path: str, metrics: ProviderMetrics | None = None) -> None:
+        """Initialise the client."""
+        self.path = path
+        self.metrics = metrics or ProviderMetrics()
+        self._graph: RoadGraph | None = None
+        self._lock = asyncio.Lock()
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get the travel time from origin to destination on the road graph."""
+        graph = await self._async_get_graph()
+        start = time.monotonic()
+        status = "exception"
+
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(
+                None, self._route, graph, origin, destination
+            )
+            status = "OK"
+            return result
+        except TravelTimeApiError:
+            status = "NO_ROUTE"
+            raise
+        finally:
+            self.metrics.record(time.monotonic() - start, status)
+
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get the travel time from origin to destination, and the route."""
+        graph = await self._async_get_graph()
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self._route_geometry, graph, origin, destination
+        )
+
+    @staticmethod
+    def _path(
+        graph: RoadGraph, origin: str, destination: str
+    ) -> list[tuple[int, float, float]]:
+        nodes = []
+        for location in (origin, destination):
+            if (node := graph.nearest(*split_coords(location))) is None:
+                # Says nothing about the graph as a whole, like a missing route
+                raise TravelTimeApiError(f"{location} is not near the road graph")
+            nodes.append(node)
+
+        if (path := graph.route(*nodes)) is None:
+            raise TravelTimeApiError(f"No route from {origin} to {destination}")
+
+        return path
+
+    @classmethod
+    def _route(cls, graph: RoadGraph, origin: str, destination: str) -> TravelTimeData:
+        path = cls._path(graph, origin, destination)
+        return TravelTimeData(
+            sum(seconds for _, seconds, _ in path),
+            math.nan,
+            sum(metres for *_, metres in path),
+        )
+
+    @classmethod
+    def _route_geometry(
+        cls, graph: RoadGraph, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        path = cls._path(graph, origin, destination)
+        points = [(graph.lat[node], graph.long[node]) for node, _, _ in path]
+        geometry = RouteGeometry.from_sections(
+            [
+                ((start, end), seconds)
+                for start, end, (_, seconds, _) in zip(points, points[1:], path[1:])
+            ]
+            or [(points, 0.0)]
+        )
+        return TravelTimeData(
+            geometry.elapsed[-1], math.nan, sum(metres for *_, metres in path)
+        ), geometry
+
+    async def async_geocode(self, address: str) -> str:
+        """Fail, as the road graph has no addresses."""
+        raise LocationNotFoundError(
+            f"Cannot find {address!r} without an online provider"
+        )
+
+    async def test_credentials(self) -> bool:
+        """Check the road graph can be loaded."""
+        try:
+            await self._async_get_graph()
+            return True
+        except Exception as ex:
+            _LOGGER.error("Failed to load road graph - %s", ex)
+            raise
+
+    async def _async_get_graph(self) -> RoadGraph:
+        async with self._lock:
+            if self._graph is None:
+                self._graph = await asyncio.get_running_loop().run_in_executor(
+                    None, RoadGraph, self.path
+                )
+                _LOGGER.debug(
+                    "Loaded road graph of %d nodes and %d edges",
+                    self._graph.nodes,
+                    self._graph.edges,
+                )
+
+        return self._graph
+
+
+def create_client(
+    session: aiohttp.ClientSession,
+    token: str,
+    url: str | None = None,
+    metrics: ProviderMetrics | None = None,
+) -> OfflineApiClient:
+    """Create a client for the road graph whose path is given as the token."""
+    return OfflineApiClient(token, metrics)
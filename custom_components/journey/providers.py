@@ -0,0 +1,107 @@
+"""Travel time providers, imported only when an entry first uses them."""
+
+import asyncio
+import importlib
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from types import ModuleType
+
+import aiohttp
+from homeassistant.core import HomeAssistant, callback
+
+from .api import ApiClient
+from .const import (
+    CONF_SELECTED_API_GOOGLE,
+    CONF_SELECTED_API_HERE,
+    CONF_SELECTED_API_OFFLINE,
+)
+from .metrics import ProviderMetrics
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+ClientFactory = Callable[
+    [aiohttp.ClientSession, str, str | None, ProviderMetrics | None], ApiClient
+]
+
+
+@dataclass(frozen=True)
+class Provider:
+    """Where a provider's implementation lives and what it can do.
+
+    module is the name of a module with a create_client function (see
+    ClientFactory), either absolute or, with a leading dot, relative to this
+    package. Providers answering many pairs in one request set matrix, so
+    that requests on the same token are batched.
+    """
+
+    module: str
+    matrix: bool = False
+
+
+PROVIDERS: dict[str, Provider] = {
+    CONF_SELECTED_API_GOOGLE: Provider(".google", matrix=True),
+    CONF_SELECTED_API_HERE: Provider(".here"),
+    # The token is the path of a compiled road graph
+    CONF_SELECTED_API_OFFLINE: Provider(".offline"),
+}
+
+
+def register_provider(name: str, provider: Provider) -> None:
+    """Make another provider available to entries and config flows."""
+    PROVIDERS[name] = provider
+
+
+class ProviderLoader:
+    """Imports providers on first use, in the import executor.
+
+    Each provider's module and its dependencies are then only loaded by
+    installations using it, and never block the event loop. Concurrent
+    requests for the same provider share one import.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the loader."""
+        self.hass = hass
+        self.import_times: dict[str, float] = {}
+        self._modules: dict[str, ModuleType] = {}
+        self._loading: dict[str, asyncio.Future[ModuleType]] = {}
+
+    async def async_get_factory(self, name: str) -> ClientFactory:
+        """Get the client factory of a provider, importing it if required."""
+        if (module := self._modules.get(name)) is None:
+            module = await self._async_load(name)
+
+        return module.create_client
+
+    @callback
+    def async_loaded(self, name: str) -> bool:
+        """Return True if a provider has been imported."""
+        return name in self._modules
+
+    async def _async_load(self, name: str) -> ModuleType:
+        if (loading := self._loading.get(name)) is None:
+            loading = self._loading[name] = self.hass.async_create_task(
+                self._async_import(name)
+            )
+
+        try:
+            return await asyncio.shield(loading)
+        finally:
+            if loading.done():
+                self._loading.pop(name, None)
+
+    async def _async_import(self, name: str) -> ModuleType:
+        if (provider := PROVIDERS.get(name)) is None:
+            raise ValueError(f"Unknown provider {name!r}")
+
+        start = time.perf_counter()
+        module = await self.hass.async_add_import_executor_job(
+            importlib.import_module, provider.module, __package__
+        )
+        self.import_times[name] = time.perf_counter() - start
+        _LOGGER.debug("Imported %s provider in %.3f s", name, self.import_times[name])
+
+        self._modules[name] = module
+        return module
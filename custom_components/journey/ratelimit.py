@@ -0,0 +1,274 @@
+"""Rate limiting and prioritisation of requests to routing providers."""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from collections.abc import Awaitable, Callable, Hashable
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any
+
+from .api import (
+    ApiClient,
+    Geocoder,
+    MatrixApiClient,
+    Router,
+    TravelTimeApiError,
+    TravelTimeData,
+)
+from .const import DEFAULT_RATE_LIMIT, DEFAULT_RATE_LIMIT_BURST
+from .geometry import RouteGeometry
+from .metrics import JourneyMetrics
+
+# Lower values are sent first
+PRIORITY_FORCED = 0
+PRIORITY_ROUTINE = 1
+
+# Set by the caller to control how its requests are queued
+REQUEST_PRIORITY: ContextVar[int] = ContextVar(
+    "journey_request_priority", default=PRIORITY_ROUTINE
+)
+REQUEST_KEY: ContextVar[Hashable | None] = ContextVar(
+    "journey_request_key", default=None
+)
+
+# Set by the caller to count the requests actually sent on its behalf, i.e.
+# those not answered from a cache or collapsed into another request
+REQUEST_METRICS: ContextVar[JourneyMetrics | None] = ContextVar(
+    "journey_request_metrics", default=None
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class TokenBucket:
+    """Token bucket allowing short bursts above a sustained rate."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """Initialise the bucket, full."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    def delay(self) -> float:
+        """Get the number of seconds until a token is available."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    def take(self) -> None:
+        """Consume a token."""
+        self._refill()
+        self._tokens -= 1
+
+
+@dataclass
+class _QueuedRequest:
+    priority: int
+    factory: Callable[[], Awaitable[Any]]
+    future: asyncio.Future = field(
+        default_factory=lambda: asyncio.get_running_loop().create_future()
+    )
+
+
+class RequestQueue:
+    """Queue of requests released in priority order as the rate limit allows.
+
+    Requests submitted under a key that is already waiting are collapsed into
+    the waiting request, which takes the newest factory and highest priority.
+    """
+
+    def __init__(self, bucket: TokenBucket) -> None:
+        """Initialise the queue."""
+        self._bucket = bucket
+        self._heap: list[tuple[int, int, Hashable]] = []
+        self._waiting: dict[Hashable, _QueuedRequest] = {}
+        self._counter = itertools.count()
+        self._worker: asyncio.Task | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        """Return the number of waiting requests."""
+        return len(self._waiting)
+
+    async def async_submit(
+        self,
+        key: Hashable,
+        priority: int,
+        factory: Callable[[], Awaitable[Any]],
+    ) -> Any:
+        """Wait for a slot, run the request and return its result."""
+        if (request := self._waiting.get(key)) is not None:
+            _LOGGER.debug("Collapsing duplicate request for %s", key)
+            request.factory = factory
+            if priority < request.priority:
+                request.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._counter), key))
+        else:
+            request = self._waiting[key] = _QueuedRequest(priority, factory)
+            heapq.heappush(self._heap, (priority, next(self._counter), key))
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.get_running_loop().create_task(self._async_run())
+
+        return await asyncio.shield(request.future)
+
+    def shutdown(self) -> None:
+        """Stop the queue, failing anything still waiting."""
+        if self._worker is not None:
+            self._worker.cancel()
+
+        for request in self._waiting.values():
+            request.future.cancel()
+
+        self._waiting.clear()
+        self._heap.clear()
+
+    async def _async_run(self) -> None:
+        while self._heap:
+            # Re-check the head after sleeping, as a higher priority request
+            # may have arrived in the meantime
+            if (delay := self._bucket.delay()) > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            priority, _, key = heapq.heappop(self._heap)
+            request = self._waiting.get(key)
+            if request is None or request.priority != priority:
+                # Stale entry left behind by a reprioritised request
+                continue
+
+            del self._waiting[key]
+            self._bucket.take()
+
+            task = asyncio.get_running_loop().create_task(self._async_call(request))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    async def _async_call(request: _QueuedRequest) -> None:
+        try:
+            result = await request.factory()
+        except Exception as ex:  # pylint: disable=broad-except
+            if not request.future.done():
+                request.future.set_exception(ex)
+        else:
+            if not request.future.done():
+                request.future.set_result(result)
+
+
+def _counted[T](factory: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[T]]:
+    """Wrap a request so it counts towards the caller's REQUEST_METRICS when sent.
+
+    The metrics are taken when the request is made, not when it is sent, which
+    may be from another context.
+    """
+    if (metrics := REQUEST_METRICS.get()) is None:
+        return factory
+
+    def send() -> Awaitable[T]:
+        metrics.api_calls += 1
+        return factory()
+
+    return send
+
+
+class RateLimitedApiClient(MatrixApiClient):
+    """Wraps a client, passing every request through a RequestQueue.
+
+    The priority and de-duplication key of a request are taken from the
+    REQUEST_PRIORITY and REQUEST_KEY context variables, so callers do not need
+    to know whether they are talking to a rate limited client.
+
+    Matrix calls, for a client that can make them, take one slot each however
+    many pairs they hold, so the limit is on requests actually sent. They are
+    never collapsed, as a batcher above has already merged their requests.
+    Geocoding and route requests share the limit, collapsed by address and by
+    request key respectively.
+    """
+
+    def __init__(
+        self,
+        client: ApiClient,
+        rate: float = DEFAULT_RATE_LIMIT,
+        burst: float = DEFAULT_RATE_LIMIT_BURST,
+        matrix: MatrixApiClient | None = None,
+        geocoder: Geocoder | None = None,
+        router: Router | None = None,
+    ) -> None:
+        """Initialise the client.
+
+        matrix, geocoder and router are the same client, given when it can
+        answer matrix calls, geocode addresses or return routes.
+        """
+        self._client = client
+        self._matrix = matrix
+        self._geocoder = geocoder
+        self._router = router
+        self.queue = RequestQueue(TokenBucket(rate, burst))
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        """Get travel time from origin to destination once the rate limit allows."""
+        key = REQUEST_KEY.get()
+        if key is None:
+            key = object()
+
+        return await self.queue.async_submit(
+            key,
+            REQUEST_PRIORITY.get(),
+            _counted(lambda: self._client.async_get_traveltime(origin, destination)),
+        )
+
+    async def async_get_traveltime_matrix(
+        self, origins: list[str], destinations: list[str]
+    ) -> list[list[TravelTimeData | TravelTimeApiError]]:
+        """Get travel times between every origin and destination once allowed."""
+        if (matrix := self._matrix) is None:
+            raise TravelTimeApiError("Provider does not answer matrix requests")
+
+        return await self.queue.async_submit(
+            object(),
+            REQUEST_PRIORITY.get(),
+            lambda: matrix.async_get_traveltime_matrix(origins, destinations),
+        )
+
+    async def async_geocode(self, address: str) -> str:
+        """Get the coordinates of an address once the rate limit allows."""
+        if (geocoder := self._geocoder) is None:
+            raise TravelTimeApiError("Provider does not geocode addresses")
+
+        return await self.queue.async_submit(
+            ("geocode", address),
+            REQUEST_PRIORITY.get(),
+            _counted(lambda: geocoder.async_geocode(address)),
+        )
+
+    async def async_get_route(
+        self, origin: str, destination: str
+    ) -> tuple[TravelTimeData, RouteGeometry]:
+        """Get travel time and route from origin to destination once allowed."""
+        if (router := self._router) is None:
+            raise TravelTimeApiError("Provider does not return routes")
+
+        # Kept apart from the travel time request made under the same key
+        key = REQUEST_KEY.get()
+        return await self.queue.async_submit(
+            object() if key is None else ("route", key),
+            REQUEST_PRIORITY.get(),
+            _counted(lambda: router.async_get_route(origin, destination)),
+        )
+
+    async def test_credentials(self) -> bool:
+        """Test API connection is functioning."""
+        return await self._client.test_credentials()
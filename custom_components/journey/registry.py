@@ -0,0 +1,261 @@
+"""Shared API clients for config entries using the same provider and token."""
+
+import logging
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+import aiohttp
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EVENT_HOMEASSISTANT_CLOSE
+from homeassistant.core import Event, HomeAssistant, callback
+from homeassistant.helpers.aiohttp_client import async_create_clientsession
+
+from .api import ApiClient, Geocoder, MatrixApiClient, Router
+from .backoff import BackoffApiClient
+from .batcher import BatchingApiClient
+from .cache import CachingApiClient, CachingGeocoder, RouteCache
+from .const import CONF_SELECTED_API, CONF_SELECTED_API_HERE, DATA_CLIENTS, DOMAIN
+from .failover import HealthApiClient, ProviderHealth
+from .metrics import ProviderMetrics
+from .providers import PROVIDERS, ProviderLoader
+from .ratelimit import RateLimitedApiClient
+from .scheduler import PhaseAllocator, RequestBudget
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@dataclass
+class SharedClient:
+    """A client along with the session, cache, limits and metrics it owns."""
+
+    client: ApiClient
+    session: aiohttp.ClientSession
+    cache: RouteCache
+    limiter: RateLimitedApiClient
+    gate: BackoffApiClient
+    geocoder: CachingGeocoder
+    budget: RequestBudget
+    metrics: ProviderMetrics
+    phases: PhaseAllocator = field(default_factory=PhaseAllocator)
+    health: ProviderHealth = field(default_factory=ProviderHealth)
+    owns_session: bool = True
+    refs: int = 0
+
+    async def async_close(self) -> None:
+        """Close the client's queue and session."""
+        self.limiter.queue.shutdown()
+        if self.owns_session:
+            await self.session.close()
+        else:
+            # Home Assistant's sessions share its connector, so only let go
+            self.session.detach()
+
+
+class ApiClientRegistry:
+    """Reference-counted API clients, one per (provider, token).
+
+    Every entry and config flow using the same token gets the same client, so
+    they share one session, route cache, rate limiter and request batcher and
+    error backoff, and their polls are spread over the interval by one phase
+    allocator. Geocoding and route shapes share the rate limit and backoff.
+    Cache hits are answered without using the rate limit, even while the token
+    is backing off, and don't count towards the token's health.
+    The client and its session are closed when the last user releases it.
+
+    A provider's implementation is imported when a client for it is first
+    acquired (see ProviderLoader).
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        urls: dict[str, str] | None = None,
+        create_session: Callable[[], aiohttp.ClientSession] | None = None,
+    ) -> None:
+        """Initialise the registry.
+
+        urls optionally overrides the endpoint used for each provider, e.g. to
+        point clients at a stand-in server. create_session optionally replaces
+        Home Assistant's session, e.g. on a bare core without its network
+        integration.
+        """
+        self.hass = hass
+        self._urls = urls or {}
+        self._create_session = create_session
+        self.loader = ProviderLoader(hass)
+        self._clients: dict[tuple[str, str], SharedClient] = {}
+
+    def __len__(self) -> int:
+        """Return the number of live clients."""
+        return len(self._clients)
+
+    async def async_acquire(self, provider: str, token: str) -> SharedClient:
+        """Get the shared client for a token, and its state, creating it if required."""
+        key = (provider, token)
+
+        # Only waits the first time a provider is used
+        create_client = await self.loader.async_get_factory(provider)
+
+        if (shared := self._clients.get(key)) is None:
+            if self._create_session is not None:
+                session = self._create_session()
+            else:
+                session = async_create_clientsession(self.hass, auto_cleanup=False)
+            cache = RouteCache()
+            metrics = ProviderMetrics()
+            client = create_client(session, token, self._urls.get(provider), metrics)
+            # Every provider can geocode
+            geocoder = cast(Geocoder, client)
+            router = client if isinstance(client, Router) else None
+            requests: ApiClient
+            if PROVIDERS[provider].matrix:
+                # Requests on the same token are combined into Distance Matrix
+                # calls, and it is those calls that are rate limited
+                limiter = RateLimitedApiClient(
+                    client,
+                    matrix=cast(MatrixApiClient, client),
+                    geocoder=geocoder,
+                    router=router,
+                )
+                requests = BatchingApiClient(limiter)
+            else:
+                limiter = requests = RateLimitedApiClient(
+                    client, geocoder=geocoder, router=router
+                )
+            gate = BackoffApiClient(
+                requests, limiter if router is not None else None, limiter
+            )
+            health = ProviderHealth()
+            shared = SharedClient(
+                CachingApiClient(HealthApiClient(gate, health), cache),
+                session,
+                cache,
+                limiter,
+                gate,
+                CachingGeocoder(gate),
+                RequestBudget(),
+                metrics,
+                health=health,
+                owns_session=self._create_session is not None,
+            )
+            self._clients[key] = shared
+            _LOGGER.debug("Created shared %s client", provider)
+
+        shared.refs += 1
+        shared.budget.users = shared.refs
+        return shared
+
+    def client(self, provider: str, token: str) -> ApiClient | None:
+        """Get the shared client for a token without acquiring it."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.client
+
+    def budget(self, provider: str, token: str) -> RequestBudget | None:
+        """Get the request budget shared by users of a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.budget
+
+    def phases(self, provider: str, token: str) -> PhaseAllocator | None:
+        """Get the allocator spreading the polls of users of a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.phases
+
+    def health(self, provider: str, token: str) -> ProviderHealth | None:
+        """Get the circuit breaker and latency used to fail over from a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.health
+
+    def geocoder(self, provider: str, token: str) -> CachingGeocoder | None:
+        """Get the geocoder, and its cache, for a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.geocoder
+
+    def router(self, provider: str, token: str) -> Router | None:
+        """Get the client for routes with their shape, if the provider has one."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.gate if shared.gate.router is not None else None
+
+    def provider_metrics(self, provider: str, token: str) -> ProviderMetrics | None:
+        """Get the request metrics for a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.metrics
+
+    def stats(self, provider: str, token: str) -> dict[str, Any]:
+        """Get a summary of the shared state for a token, for diagnostics."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return {}
+
+        return {
+            "users": shared.refs,
+            "daily_budget": shared.budget.daily_limit,
+            "min_interval": shared.budget.min_interval.total_seconds(),
+            "queued": len(shared.limiter.queue),
+            "cache": shared.cache.stats,
+            "geocode_cache": shared.geocoder.stats,
+            "requests": shared.metrics.as_dict(),
+            "health": shared.health.as_dict(),
+            "backoff": shared.gate.backoff.as_dict(),
+        }
+
+    def cache(self, provider: str, token: str) -> RouteCache | None:
+        """Get the route cache for a token."""
+        if (shared := self._clients.get((provider, token))) is None:
+            return None
+
+        return shared.cache
+
+    def caches(self) -> dict[tuple[str, str], RouteCache]:
+        """Get the route cache of each live client."""
+        return {key: shared.cache for key, shared in self._clients.items()}
+
+    async def async_release(self, provider: str, token: str) -> None:
+        """Release a client, closing it if it is no longer used."""
+        key = (provider, token)
+
+        if (shared := self._clients.get(key)) is None:
+            return
+
+        shared.refs -= 1
+        shared.budget.users = shared.refs
+        if shared.refs <= 0:
+            del self._clients[key]
+            await shared.async_close()
+            _LOGGER.debug("Closed shared %s client", provider)
+
+    async def async_close(self, event: Event | None = None) -> None:
+        """Close all clients."""
+        clients, self._clients = self._clients, {}
+        for shared in clients.values():
+            await shared.async_close()
+
+
+@callback
+def async_get_registry(hass: HomeAssistant) -> ApiClientRegistry:
+    """Get the client registry, creating it if required."""
+    data = hass.data.setdefault(DOMAIN, {})
+
+    if (registry := data.get(DATA_CLIENTS)) is None:
+        registry = data[DATA_CLIENTS] = ApiClientRegistry(hass)
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_CLOSE, registry.async_close)
+
+    return registry
+
+
+def get_entry_provider(entry: ConfigEntry) -> str:
+    """Get the API provider selected for an entry."""
+    return entry.data.get(CONF_SELECTED_API, CONF_SELECTED_API_HERE)
@@ -0,0 +1,207 @@
+"""Adaptive polling intervals for journeys."""
+
+import heapq
+import itertools
+from collections.abc import Hashable
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+
+from .api import TravelTimeData
+from .const import DEFAULT_DAILY_REQUEST_BUDGET
+
+SCAN_INTERVAL = timedelta(minutes=5)
+MIN_INTERVAL = timedelta(minutes=1)
+MAX_INTERVAL = timedelta(minutes=30)
+
+# Hours during which traffic is assumed to be flat
+NIGHT_START = 23
+NIGHT_END = 5
+
+# Relative change in journey time per minute considered volatile or stable
+VOLATILE_CHANGE_RATE = 0.02
+STABLE_CHANGE_RATE = 0.002
+
+# Change in delay factor (percentage points) considered volatile or stable
+VOLATILE_DELAY_CHANGE = 10
+STABLE_DELAY_CHANGE = 2
+
+# Journeys longer than this are polled proportionally less often
+LONG_JOURNEY_M = 50_000
+
+# Polling ahead of and during a departure window
+DEPARTURE_LEAD = timedelta(minutes=30)
+DEPARTURE_INTERVAL = timedelta(minutes=2)
+
+# Fractional part of the golden ratio, which spaces successive phases evenly
+GOLDEN_FRACTION = 0.6180339887498949
+
+
+@dataclass
+class RequestBudget:
+    """Daily request allowance shared by every entry using one token."""
+
+    daily_limit: int = DEFAULT_DAILY_REQUEST_BUDGET
+    users: int = 0
+
+    @property
+    def min_interval(self) -> timedelta:
+        """Get the shortest interval each user can poll at within the budget."""
+        return timedelta(days=1) * max(self.users, 1) / max(self.daily_limit, 1)
+
+
+class PhaseAllocator:
+    """Hands out poll phases, as fractions of an interval, spread evenly.
+
+    Phases follow the golden ratio sequence, so however many users there are,
+    no two are close together and each new one lands in the largest gap. Freed
+    slots are reused, lowest first. The sequence starts one step in, so no
+    phase is zero.
+    """
+
+    def __init__(self) -> None:
+        """Initialise the allocator."""
+        self._slots: dict[Hashable, int] = {}
+        self._free: list[int] = []
+        self._next = itertools.count()
+
+    def __len__(self) -> int:
+        """Return the number of allocated phases."""
+        return len(self._slots)
+
+    def acquire(self, key: Hashable) -> float:
+        """Get the phase of a user, allocating one if required."""
+        if (slot := self._slots.get(key)) is None:
+            slot = heapq.heappop(self._free) if self._free else next(self._next)
+            self._slots[key] = slot
+
+        return (slot + 1) * GOLDEN_FRACTION % 1
+
+    def release(self, key: Hashable) -> None:
+        """Free the phase of a user."""
+        if (slot := self._slots.pop(key, None)) is not None:
+            heapq.heappush(self._free, slot)
+
+
+def align_to_phase(interval: timedelta, phase: float, now: datetime) -> timedelta:
+    """Adjust an interval so the poll lands at its phase of the interval.
+
+    Users sharing an interval but with different phases then poll at different
+    times, rather than all together. The result is between half and one and a
+    half times the interval.
+    """
+    seconds = interval.total_seconds()
+    if seconds <= 0:
+        return interval
+
+    offset = (phase * seconds - (now.timestamp() + seconds)) % seconds
+    if offset > seconds / 2:
+        offset -= seconds
+
+    return timedelta(seconds=seconds + offset)
+
+
+def compute_update_interval(
+    previous: TravelTimeData | None,
+    current: TravelTimeData,
+    elapsed: timedelta,
+    now: datetime,
+    budget: RequestBudget | None = None,
+    phase: float | None = None,
+) -> timedelta:
+    """Choose the next polling interval for a journey.
+
+    Polls faster while the journey time or delay is changing quickly and slower
+    when it is stable, at night, or for long journeys where a few minutes
+    either way matter less. Journeys of zero length (origin at the destination)
+    fall back to the maximum, since a state change will trigger a refresh.
+    With a phase, the interval is adjusted to land on it (see align_to_phase).
+    """
+    if current.distance_m == 0:
+        return MAX_INTERVAL
+
+    interval = SCAN_INTERVAL
+
+    if previous is not None and elapsed > timedelta(0):
+        minutes = elapsed / timedelta(minutes=1)
+        change_rate = (
+            abs(current.travel_time_traffic_secs - previous.travel_time_traffic_secs)
+            / max(current.travel_time_traffic_secs, 1)
+            / minutes
+        )
+        delay_change = abs(current.delay_factor - previous.delay_factor)
+
+        if change_rate > VOLATILE_CHANGE_RATE or delay_change > VOLATILE_DELAY_CHANGE:
+            interval /= 2
+        elif change_rate < STABLE_CHANGE_RATE and delay_change < STABLE_DELAY_CHANGE:
+            interval *= 2
+
+    if now.hour >= NIGHT_START or now.hour < NIGHT_END:
+        interval *= 3
+
+    if current.distance_m > LONG_JOURNEY_M:
+        interval *= min(current.distance_m / LONG_JOURNEY_M, 2)
+
+    if phase is not None:
+        interval = align_to_phase(interval, phase, now)
+
+    lower = MIN_INTERVAL if budget is None else max(MIN_INTERVAL, budget.min_interval)
+
+    return max(lower, min(interval, MAX_INTERVAL))
+
+
+@dataclass(frozen=True)
+class DepartureWindow:
+    """A daily period during which the user may set off, e.g. 07:30-08:30."""
+
+    start: time
+    end: time
+
+    @classmethod
+    def parse(cls, text: str) -> "DepartureWindow":
+        """Parse a window written as HH:MM-HH:MM, raising ValueError if invalid."""
+        start, sep, end = text.partition("-")
+        if not sep:
+            raise ValueError(f"Departure window {text!r} is not HH:MM-HH:MM")
+
+        return cls(time.fromisoformat(start.strip()), time.fromisoformat(end.strip()))
+
+    def next_occurrence(self, now: datetime) -> tuple[datetime, datetime]:
+        """Get the start and end of the current or next occurrence of the window.
+
+        Windows ending before they start are taken to run past midnight.
+        """
+        for days in (-1, 0, 1):
+            day = (now + timedelta(days=days)).date()
+            start = datetime.combine(day, self.start, now.tzinfo)
+            end = datetime.combine(day, self.end, now.tzinfo)
+            if end <= start:
+                end += timedelta(days=1)
+            if end > now:
+                return start, end
+
+        raise AssertionError("unreachable")
+
+
+def departure_interval(
+    interval: timedelta,
+    departures: list[tuple[datetime, datetime]],
+    now: datetime,
+    lead: timedelta = DEPARTURE_LEAD,
+    spread: timedelta = timedelta(0),
+) -> timedelta | None:
+    """Fit a polling interval around departure windows.
+
+    From lead before a window until it ends, polls are at least every
+    DEPARTURE_INTERVAL, so the first poll warms the cache and the data is fresh
+    when the user leaves. Otherwise there are no polls until the next window's
+    lead time, plus spread to keep users of the same window apart, or none at
+    all (None) if no window is coming up.
+    """
+    upcoming = [(start - lead, end) for start, end in departures if end > now]
+    if not upcoming:
+        return None
+
+    if any(start <= now for start, _ in upcoming):
+        return min(interval, DEPARTURE_INTERVAL)
+
+    return min(start for start, _ in upcoming) - now + spread
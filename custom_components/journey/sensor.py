@@ -1,73 +1,246 @@
 """Sensor platform for Journey."""
 
-from datetime import datetime, timedelta
+from datetime import timedelta
 from typing import Any
 
-from homeassistant.const import UnitOfTime
+from homeassistant.const import EntityCategory, UnitOfTime
+from homeassistant.core import callback
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
+from homeassistant.util import dt as dt_util
 
-from .const import CONF_DESTINATION, CONF_NAME, DOMAIN
-from .coordinator import JourneyDataUpdateCoordinator
+from .const import (
+    CONF_DESTINATIONS,
+    CONF_ETA_UNRECORDED,
+    CONF_NAME,
+    CONF_SKIP_UNCHANGED,
+    DOMAIN,
+)
+from .coordinator import JourneyData, JourneyDataUpdateCoordinator
+from .helpers import round_or_none
+
+# Attributes that change on every update whether or not the journey has
+VOLATILE_ATTRIBUTES = frozenset({"eta"})
 
 
 async def async_setup_entry(hass, entry, async_add_devices):
     """Set up sensor platform."""
     coordinator = hass.data[DOMAIN][entry.entry_id]
+    time_sensor = (
+        UnrecordedEtaJourneyTimeSensor
+        if entry.data.get(CONF_ETA_UNRECORDED)
+        else JourneyTimeSensor
+    )
     async_add_devices(
         [
-            JourneyTimeSensor(coordinator, entry),
+            *(
+                time_sensor(coordinator, entry, destination)
+                for destination in coordinator.destinations
+            ),
+            JourneyApiCallsSensor(coordinator, entry),
+            JourneyApiLatencySensor(coordinator, entry),
         ]
     )
 
 
 class JourneyTimeSensor(CoordinatorEntity[JourneyDataUpdateCoordinator]):
-    """Journey Travel Time Sensor Class."""
+    """Journey Travel Time Sensor Class.
+
+    The state and attributes are built once for each new journey result and
+    reused until the next one. With the skip unchanged option, coordinator
+    updates that leave them the same (apart from the eta) aren't written.
+    """
 
     _attr_unit_of_measurement = UnitOfTime.MINUTES
     _attr_icon = "mdi:timer"
 
-    def __init__(self, coordinator, config_entry) -> None:
+    def __init__(self, coordinator, config_entry, destination: str) -> None:
         """Create journey time sensor."""
         super().__init__(coordinator)
         self.config_entry = config_entry
-        self.destination = self.config_entry.data.get(CONF_DESTINATION)
+        self.destination = destination
 
-        self._attr_unique_id = self.config_entry.entry_id + "-time"
+        # Entries with a list of destinations get one sensor per destination
+        self._fan_out = CONF_DESTINATIONS in self.config_entry.data
+        self._attr_unique_id = (
+            f"{self.config_entry.entry_id}-time-{destination}"
+            if self._fan_out
+            else f"{self.config_entry.entry_id}-time"
+        )
+
+        self._skip_unchanged = bool(self.config_entry.data.get(CONF_SKIP_UNCHANGED))
+        self._journey: JourneyData | None = None
+        self._state: int | None = None
+        self._attributes: dict[str, Any] = {}
+        self._written: tuple | None = None
 
     @property
-    def extra_state_attributes(self) -> dict[str, Any]:
-        """Return the state attributes."""
+    def journey(self) -> JourneyData | None:
+        """Get the data for this sensor's destination."""
         if not self.coordinator.data:
-            return {}
+            return None
 
-        return {
-            "duration": self.coordinator.data.travel_time.travel_time_secs,
-            "duration_in_traffic": self.coordinator.data.travel_time.travel_time_traffic_secs,
-            "delay_minutes": self.coordinator.data.travel_time.delay_min,
-            "delay_factor": self.coordinator.data.travel_time.delay_factor,
-            "destination": self.coordinator.data.destination.name,
+        return self.coordinator.data.get(self.destination)
+
+    def _update_snapshot(self) -> None:
+        """Rebuild the state and attributes if the journey has changed."""
+        if (journey := self.journey) is self._journey:
+            return
+
+        self._journey = journey
+        if journey is None:
+            self._state = None
+            self._attributes = {}
+            return
+
+        travel_time = journey.travel_time
+        self._state = travel_time.travel_time_traffic_min
+        self._attributes = {
+            "duration": round_or_none(travel_time.travel_time_secs),
+            "duration_in_traffic": round_or_none(travel_time.travel_time_traffic_secs),
+            "delay_minutes": travel_time.delay_min,
+            "delay_factor": travel_time.delay_factor,
+            "destination": journey.destination.name,
             "eta": (
                 (
-                    datetime.now().astimezone()
-                    + timedelta(
-                        seconds=self.coordinator.data.travel_time.travel_time_traffic_secs
-                    )
+                    dt_util.now()
+                    + timedelta(seconds=travel_time.travel_time_traffic_secs)
                 ).isoformat()
-                if self.coordinator.data.travel_time.travel_time_traffic_secs
+                if travel_time.travel_time_traffic_secs
                 else None
             ),
         }
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state, unless skipping writes that would change nothing."""
+        self._update_snapshot()
+
+        written = (
+            self.available,
+            self._state,
+            *(
+                value
+                for key, value in self._attributes.items()
+                if key not in VOLATILE_ATTRIBUTES
+            ),
+        )
+        if self._skip_unchanged and written == self._written:
+            return
+
+        self._written = written
+        self.async_write_ha_state()
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the state attributes."""
+        self._update_snapshot()
+        return self._attributes
+
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
         name = self.config_entry.data.get(CONF_NAME)
+        if self._fan_out:
+            return f"{name} {self._destination_name} Travel Time"
         return f"{name} Travel Time"
 
+    @property
+    def _destination_name(self) -> str:
+        """Get the friendly name of the destination entity, or the address."""
+        if (
+            self.hass is not None
+            and (state := self.hass.states.get(self.destination)) is not None
+        ):
+            return state.name
+
+        return self.destination
+
     @property
     def state(self) -> int | None:
         """Return the state of the sensor."""
-        if self.coordinator.data:
-            return self.coordinator.data.travel_time.travel_time_traffic_min
-        else:
-            return None
+        self._update_snapshot()
+        return self._state
+
+
+class UnrecordedEtaJourneyTimeSensor(JourneyTimeSensor):
+    """Journey Travel Time Sensor whose eta is left out of the recorder."""
+
+    _unrecorded_attributes = VOLATILE_ATTRIBUTES
+
+
+class JourneyApiCallsSensor(CoordinatorEntity[JourneyDataUpdateCoordinator]):
+    """Diagnostic sensor counting the API calls made for a journey."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_icon = "mdi:counter"
+
+    def __init__(self, coordinator, config_entry) -> None:
+        """Create API calls sensor."""
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+
+        self._attr_unique_id = self.config_entry.entry_id + "-api-calls"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the state attributes."""
+        metrics = self.coordinator.metrics
+        return {
+            "refreshes": metrics.refreshes,
+            "failures": metrics.failures,
+            "predictions": metrics.predictions,
+        }
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        name = self.config_entry.data.get(CONF_NAME)
+        return f"{name} API Calls"
+
+    @property
+    def state(self) -> int:
+        """Return the state of the sensor."""
+        return self.coordinator.metrics.api_calls
+
+
+class JourneyApiLatencySensor(CoordinatorEntity[JourneyDataUpdateCoordinator]):
+    """Diagnostic sensor for the 95th percentile API latency of a journey."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_unit_of_measurement = UnitOfTime.MILLISECONDS
+    _attr_icon = "mdi:timer-sand"
+
+    def __init__(self, coordinator, config_entry) -> None:
+        """Create API latency sensor."""
+        super().__init__(coordinator)
+        self.config_entry = config_entry
+
+        self._attr_unique_id = self.config_entry.entry_id + "-api-latency"
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the state attributes."""
+        latency = self.coordinator.metrics.api_latency
+        return {
+            "p50": _to_ms(latency.percentile(50)),
+            "mean": _to_ms(latency.mean),
+            "max": _to_ms(latency.max),
+            "count": latency.count,
+        }
+
+    @property
+    def name(self) -> str:
+        """Return the name of the sensor."""
+        name = self.config_entry.data.get(CONF_NAME)
+        return f"{name} API Latency"
+
+    @property
+    def state(self) -> int | None:
+        """Return the state of the sensor."""
+        return _to_ms(self.coordinator.metrics.api_latency.percentile(95))
+
+
+def _to_ms(seconds: float | None) -> int | None:
+    return round(seconds * 1000) if seconds is not None else None
@@ -0,0 +1,212 @@
+"""Service actions for on-demand travel times."""
+
+import asyncio
+import logging
+import math
+from datetime import timedelta
+
+import voluptuous as vol
+from homeassistant.config_entries import ConfigEntry, ConfigEntryState
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import JsonValueType
+
+from .api import ApiClient, Geocoder, LocationNotFoundError, TravelTimeData
+from .const import CONF_API_TOKEN, DOMAIN
+from .helpers import (
+    FindCoordinatesError,
+    LocationData,
+    async_get_resolver,
+    check_routable,
+    parse_coords,
+    round_or_none,
+)
+from .history import async_get_history
+from .ratelimit import PRIORITY_FORCED, REQUEST_PRIORITY
+from .registry import async_get_registry, get_entry_provider
+
+SERVICE_GET_TRAVEL_TIMES = "get_travel_times"
+
+ATTR_ORIGINS = "origins"
+ATTR_DESTINATIONS = "destinations"
+ATTR_CONFIG_ENTRY_ID = "config_entry_id"
+
+GET_TRAVEL_TIMES_SCHEMA = vol.Schema(
+    {
+        vol.Required(ATTR_ORIGINS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Required(ATTR_DESTINATIONS): vol.All(cv.ensure_list, [cv.string]),
+        vol.Optional(ATTR_CONFIG_ENTRY_ID): cv.string,
+    }
+)
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+@callback
+def async_setup_services(hass: HomeAssistant) -> None:
+    """Register the integration's service actions."""
+
+    async def async_get_travel_times(call: ServiceCall) -> ServiceResponse:
+        """Get the travel time between every origin and destination.
+
+        Requests use the token of a configured entry, through its shared
+        client, so cached routes are answered without a request and the rest
+        are batched into matrix calls where the provider supports them.
+        """
+        entry = _get_entry(hass, call.data.get(ATTR_CONFIG_ENTRY_ID))
+        provider = get_entry_provider(entry)
+        token = entry.data[CONF_API_TOKEN]
+        registry = async_get_registry(hass)
+        if (client := registry.client(provider, token)) is None:
+            raise ServiceValidationError(f"{entry.title} has no API client")
+
+        geocoder = registry.geocoder(provider, token)
+        origins, destinations = call.data[ATTR_ORIGINS], call.data[ATTR_DESTINATIONS]
+        names = list(dict.fromkeys([*origins, *destinations]))
+        locations = dict(
+            zip(
+                names,
+                await asyncio.gather(
+                    *(_async_locate(hass, geocoder, name) for name in names)
+                ),
+                strict=True,
+            )
+        )
+
+        travel_times: dict[str, dict[str, JsonValueType]] = {
+            origin: {} for origin in origins
+        }
+        pairs = []
+        for origin in origins:
+            for destination in destinations:
+                failed = [
+                    location
+                    for location in (locations[origin], locations[destination])
+                    if isinstance(location, Exception)
+                ]
+                if failed:
+                    travel_times[origin][destination] = {"error": str(failed[0])}
+                else:
+                    pairs.append((origin, destination))
+
+        # Someone is waiting for the answer, so go ahead of routine polls
+        priority_token = REQUEST_PRIORITY.set(PRIORITY_FORCED)
+        try:
+            results = await asyncio.gather(
+                *(
+                    _async_get_traveltime(
+                        client, locations[origin], locations[destination]
+                    )
+                    for origin, destination in pairs
+                ),
+                return_exceptions=True,
+            )
+        finally:
+            REQUEST_PRIORITY.reset(priority_token)
+
+        history = await async_get_history(hass)
+        for (origin, destination), result in zip(pairs, results, strict=True):
+            if isinstance(result, BaseException):
+                travel_times[origin][destination] = {"error": str(result)}
+                continue
+
+            travel_times[origin][destination] = _as_dict(
+                history.async_add_traffic(result)
+                if math.isnan(result.travel_time_traffic_secs)
+                else result
+            )
+
+        return {
+            "locations": {
+                name: {"error": str(location)}
+                if isinstance(location, Exception)
+                else {"name": location.name, "coords": location.coords}
+                for name, location in locations.items()
+            },
+            "travel_times": dict(travel_times),
+        }
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TRAVEL_TIMES,
+        async_get_travel_times,
+        schema=GET_TRAVEL_TIMES_SCHEMA,
+        supports_response=SupportsResponse.ONLY,
+    )
+
+
+def _get_entry(hass: HomeAssistant, entry_id: str | None) -> ConfigEntry:
+    """Get the entry whose token to use, by default the first loaded one."""
+    entries = [
+        entry
+        for entry in hass.config_entries.async_entries(DOMAIN)
+        if entry.state is ConfigEntryState.LOADED
+        and (entry_id is None or entry.entry_id == entry_id)
+    ]
+    if not entries:
+        raise ServiceValidationError(
+            f"No loaded {DOMAIN} entry {entry_id}"
+            if entry_id
+            else f"No loaded {DOMAIN} entry to get travel times with"
+        )
+
+    return entries[0]
+
+
+async def _async_locate(
+    hass: HomeAssistant, geocoder: Geocoder | None, name: str
+) -> LocationData | Exception:
+    """Resolve coordinates, an entity, a zone or an address to coordinates.
+
+    Failures are returned rather than raised, so one bad location only
+    affects its own pairs.
+    """
+    if parse_coords(name) is not None:
+        return LocationData(name, name)
+
+    try:
+        location = async_get_resolver(hass).resolve(name)
+        check_routable(location)
+        if parse_coords(location.coords) is not None or geocoder is None:
+            return location
+
+        return LocationData(
+            location.name, await geocoder.async_geocode(location.coords)
+        )
+    except (FindCoordinatesError, LocationNotFoundError) as ex:
+        return ex
+    except Exception as ex:  # pylint: disable=broad-except
+        _LOGGER.warning("Could not locate %s: %r", name, ex)
+        return ex
+
+
+async def _async_get_traveltime(
+    client: ApiClient, origin: LocationData, destination: LocationData
+) -> TravelTimeData:
+    if origin.coords == destination.coords:
+        return TravelTimeData(0, 0, 0)
+
+    return await client.async_get_traveltime(origin.coords, destination.coords)
+
+
+def _as_dict(travel_time: TravelTimeData) -> dict[str, JsonValueType]:
+    """Get a travel time in the form of the sensor attributes."""
+    return {
+        "duration": round_or_none(travel_time.travel_time_secs),
+        "duration_in_traffic": round_or_none(travel_time.travel_time_traffic_secs),
+        "distance": round_or_none(travel_time.distance_m),
+        "delay_minutes": travel_time.delay_min,
+        "eta": (
+            dt_util.now() + timedelta(seconds=travel_time.travel_time_traffic_secs)
+        ).isoformat()
+        if not math.isnan(travel_time.travel_time_traffic_secs)
+        else None,
+    }
@@ -0,0 +1,147 @@
+"""Persistence of journeys and routes across restarts."""
+
+import asyncio
+import logging
+import time
+from dataclasses import asdict
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .api import TravelTimeData
+from .cache import RouteCache
+from .const import DATA_STORE, DEFAULT_RESTORE_MAX_AGE, DOMAIN
+from .coordinator import JourneyData
+from .helpers import LocationData
+
+STORAGE_KEY = f"{DOMAIN}.cache"
+STORAGE_VERSION = 1
+
+# Seconds to wait for further changes before writing to disk
+SAVE_DELAY = 30
+
+_LOGGER: logging.Logger = logging.getLogger(__package__)
+
+
+class JourneyStore:
+    """Last known journeys per entry and recent routes per provider, on disk.
+
+    Writes are debounced, so frequent updates cost one write per SAVE_DELAY.
+    Routes are read from the registered caches when the write happens.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialise the store."""
+        self.hass = hass
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._journeys: dict[str, dict[str, Any]] = {}
+        self._routes: dict[str, list] = {}
+        self._caches: dict[str, list[RouteCache]] = {}
+        self._load_task: asyncio.Task | None = None
+
+    async def async_load(self) -> None:
+        """Load the saved data, once, however many entries ask for it."""
+        if self._load_task is None:
+            self._load_task = self.hass.async_create_task(self._async_load())
+
+        await self._load_task
+
+    async def _async_load(self) -> None:
+        if (data := await self._store.async_load()) is None:
+            return
+
+        self._journeys = data.get("journeys", {})
+        self._routes = data.get("routes", {})
+        _LOGGER.debug("Loaded %d saved journeys", len(self._journeys))
+
+    @callback
+    def async_get_journeys(self, entry_id: str) -> tuple[dict[str, JourneyData], float]:
+        """Get the saved journeys of an entry and how old they are in seconds.
+
+        Journeys older than DEFAULT_RESTORE_MAX_AGE are not returned, as the
+        traffic they describe is no longer relevant.
+        """
+        if (saved := self._journeys.get(entry_id)) is None:
+            return {}, 0
+
+        age = time.time() - saved["updated"]
+        if age > DEFAULT_RESTORE_MAX_AGE:
+            return {}, age
+
+        return {
+            destination: JourneyData(
+                LocationData(**journey["origin"]),
+                LocationData(**journey["destination"]),
+                TravelTimeData(**journey["travel_time"]),
+            )
+            for destination, journey in saved["journeys"].items()
+        }, age
+
+    @callback
+    def async_set_journeys(
+        self, entry_id: str, journeys: dict[str, JourneyData]
+    ) -> None:
+        """Save the latest journeys of an entry."""
+        self._journeys[entry_id] = {
+            "updated": time.time(),
+            "journeys": {
+                destination: {
+                    "origin": asdict(journey.origin),
+                    "destination": asdict(journey.destination),
+                    "travel_time": asdict(journey.travel_time),
+                }
+                for destination, journey in journeys.items()
+            },
+        }
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_remove_journeys(self, entry_id: str) -> None:
+        """Forget the journeys of a removed entry."""
+        if self._journeys.pop(entry_id, None) is not None:
+            self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+
+    @callback
+    def async_add_cache(self, provider: str, cache: RouteCache) -> None:
+        """Fill a route cache with the saved routes, and save it from now on."""
+        caches = self._caches.setdefault(provider, [])
+        if cache in caches:
+            return
+
+        cache.restore(self._routes.get(provider, []))
+        caches.append(cache)
+
+    @callback
+    def async_remove_cache(self, provider: str, cache: RouteCache) -> None:
+        """Stop saving a route cache, keeping what it held at the time."""
+        self._routes[provider] = self._dump_routes(provider)
+        if cache in (caches := self._caches.get(provider, [])):
+            caches.remove(cache)
+
+    def _dump_routes(self, provider: str) -> list:
+        if not (caches := self._caches.get(provider)):
+            return self._routes.get(provider, [])
+
+        return [route for cache in caches for route in cache.dump()]
+
+    @callback
+    def _data_to_save(self) -> dict[str, Any]:
+        return {
+            "journeys": self._journeys,
+            "routes": {
+                provider: self._dump_routes(provider)
+                for provider in self._routes.keys() | self._caches.keys()
+            },
+        }
+
+
+async def async_get_store(hass: HomeAssistant) -> JourneyStore:
+    """Get the shared store, loaded, creating it if required."""
+    data = hass.data.setdefault(DOMAIN, {})
+
+    if (store := data.get(DATA_STORE)) is None:
+        store = data[DATA_STORE] = JourneyStore(hass)
+
+    await store.async_load()
+    return store
@@ -0,0 +1,401 @@
+"""Load test the Journey refresh path against a stand-in routing provider.
+
+Runs a number of coordinators on a bare Home Assistant core, with their origins
+moving around a set of zones, and reports API calls per hour, refresh latency,
+executor usage and event loop blocking. Requests go to a local aiohttp server
+that mimics the Google Distance Matrix and HERE Routing APIs, with configurable
+latency and error rate.
+
+Usage: python scripts/benchmark.py --coordinators 50 --duration 300
+"""
+
+import argparse
+import asyncio
+import logging
+import math
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from homeassistant.core import HomeAssistant  # noqa: E402
+
+# Time to import the integration itself, without any provider
+IMPORT_START = time.perf_counter()
+
+from custom_components.journey.const import (  # noqa: E402
+    CONF_DESTINATION,
+    CONF_NAME,
+    CONF_SELECTED_API_GOOGLE,
+    CONF_SELECTED_API_HERE,
+    DEFAULT_STARTUP_STAGGER,
+)
+from custom_components.journey.coordinator import (  # noqa: E402
+    JourneyDataUpdateCoordinator,
+)
+from custom_components.journey.helpers import async_get_resolver  # noqa: E402
+from custom_components.journey.hub import async_get_hub  # noqa: E402
+from custom_components.journey.registry import ApiClientRegistry  # noqa: E402
+from custom_components.journey.sensor import JourneyTimeSensor  # noqa: E402
+
+IMPORT_TIME = time.perf_counter() - IMPORT_START
+
+HOME = (51.5007, -0.1246)
+ZONES = {
+    "home": HOME,
+    "work": (51.5155, -0.0922),
+    "school": (51.4934, -0.1723),
+    "gym": (51.5226, -0.1571),
+}
+
+
+class FakeProvider:
+    """Stand-in for the Google and HERE routing endpoints."""
+
+    def __init__(self, latency: float, error_rate: float) -> None:
+        """Initialise the provider."""
+        self.latency = latency
+        self.error_rate = error_rate
+        self.requests = 0
+        self.elements = 0
+        self.errors = 0
+
+    @staticmethod
+    def _duration(origin: str, destination: str) -> tuple[int, int, int]:
+        (lat1, long1), (lat2, long2) = (
+            map(float, origin.split(",")),
+            map(float, destination.split(",")),
+        )
+        distance = int(math.hypot(lat2 - lat1, long2 - long1) * 111_000)
+        duration = distance // 10
+        return duration, int(duration * random.uniform(1.0, 1.6)), distance
+
+    async def _respond(self) -> bool:
+        self.requests += 1
+        await asyncio.sleep(random.expovariate(1 / self.latency))
+        if random.random() < self.error_rate:
+            self.errors += 1
+            return False
+        return True
+
+    async def google(self, request: web.Request) -> web.Response:
+        """Mimic the Distance Matrix API."""
+        origins = request.query["origins"].split("|")
+        destinations = request.query["destinations"].split("|")
+
+        if not await self._respond():
+            return web.json_response({"status": "OVER_QUERY_LIMIT", "rows": []})
+
+        self.elements += len(origins) * len(destinations)
+        rows = []
+        for origin in origins:
+            elements = []
+            for destination in destinations:
+                duration, traffic, distance = self._duration(origin, destination)
+                elements.append(
+                    {
+                        "status": "OK",
+                        "duration": {"value": duration},
+                        "duration_in_traffic": {"value": traffic},
+                        "distance": {"value": distance},
+                    }
+                )
+            rows.append({"elements": elements})
+
+        return web.json_response({"status": "OK", "rows": rows})
+
+    async def here(self, request: web.Request) -> web.Response:
+        """Mimic the HERE Routing API."""
+        if not await self._respond():
+            return web.json_response(
+                {"status": 429, "title": "Too Many Requests"}, status=429
+            )
+
+        self.elements += 1
+        duration, traffic, distance = self._duration(
+            request.query["origin"], request.query["destination"]
+        )
+        return web.json_response(
+            {
+                "routes": [
+                    {
+                        "sections": [
+                            {
+                                "summary": {
+                                    "typicalDuration": duration,
+                                    "duration": traffic,
+                                    "length": distance,
+                                }
+                            }
+                        ]
+                    }
+                ]
+            }
+        )
+
+
+class CountingExecutor(ThreadPoolExecutor):
+    """Executor recording how many jobs it runs and how many run at once."""
+
+    def __init__(self) -> None:
+        """Initialise the executor."""
+        super().__init__()
+        self.jobs = 0
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def submit(self, fn, /, *args, **kwargs):
+        """Submit a job, counting it while it runs."""
+
+        def run():
+            with self._lock:
+                self.active += 1
+                self.peak = max(self.peak, self.active)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.active -= 1
+
+        self.jobs += 1
+        return super().submit(run)
+
+
+async def monitor_loop(lags: list[float], interval: float = 0.01) -> None:
+    """Measure how late the event loop wakes up, i.e. how long it was blocked."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - start - interval))
+
+
+def timed(samples: list[float], func):
+    """Wrap a function, recording how long each call takes."""
+
+    if asyncio.iscoroutinefunction(func):
+
+        async def async_wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        return async_wrapper
+
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - start)
+
+    return wrapper
+
+
+def percentiles(samples: list[float]) -> str:
+    """Format p50/p95/p99/max of a list of durations in milliseconds."""
+    if len(samples) < 2:
+        return "n/a"
+
+    # Interpolate between samples only, so no cut is beyond the slowest one
+    cuts = [x * 1000 for x in statistics.quantiles(samples, n=100, method="inclusive")]
+    worst = max(samples) * 1000
+    return f"p50 {cuts[49]:.2f} ms, p95 {cuts[94]:.2f} ms, p99 {cuts[98]:.2f} ms, max {worst:.2f} ms"
+
+
+async def move_trackers(hass: HomeAssistant, trackers: list[str], period: float):
+    """Random-walk each tracker, occasionally jumping to a zone."""
+    positions = {tracker: list(HOME) for tracker in trackers}
+
+    while True:
+        await asyncio.sleep(period)
+        for tracker, position in positions.items():
+            state = "not_home"
+            if random.random() < 0.02:
+                state, position[:] = random.choice(list(ZONES.items()))
+            else:
+                position[0] += random.gauss(0, 0.002)
+                position[1] += random.gauss(0, 0.002)
+
+            hass.states.async_set(
+                tracker,
+                state,
+                {"latitude": position[0], "longitude": position[1]},
+            )
+
+
+async def run(args: argparse.Namespace) -> None:
+    """Run the benchmark."""
+    executor = CountingExecutor()
+    asyncio.get_running_loop().set_default_executor(executor)
+
+    provider = FakeProvider(args.latency, args.error_rate)
+    app = web.Application()
+    app.router.add_get("/distancematrix/json", provider.google)
+    app.router.add_get("/v8/routes", provider.here)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+
+    hass = HomeAssistant(tempfile.mkdtemp())
+    for zone, (lat, long) in ZONES.items():
+        hass.states.async_set(
+            f"zone.{zone}",
+            "0",
+            {"latitude": lat, "longitude": long, "friendly_name": zone.title()},
+        )
+
+    selected_api = (
+        CONF_SELECTED_API_GOOGLE
+        if args.provider == "google"
+        else CONF_SELECTED_API_HERE
+    )
+    registry = ApiClientRegistry(
+        hass,
+        urls={
+            CONF_SELECTED_API_GOOGLE: f"http://127.0.0.1:{port}/distancematrix/json",
+            CONF_SELECTED_API_HERE: f"http://127.0.0.1:{port}/v8/routes",
+        },
+        create_session=aiohttp.ClientSession,
+    )
+    resolver = async_get_resolver(hass)
+    resolver.async_add_user("benchmark")
+    hub = async_get_hub(hass)
+
+    refresh_times: list[float] = []
+    resolve_times: list[float] = []
+    render_times: list[float] = []
+    lags: list[float] = []
+
+    trackers = [f"device_tracker.person_{i}" for i in range(args.trackers)]
+    for tracker in trackers:
+        hass.states.async_set(
+            tracker, "home", {"latitude": HOME[0], "longitude": HOME[1]}
+        )
+
+    coordinators = []
+    setup_start = time.perf_counter()
+    for i in range(args.coordinators):
+        destination = random.choice(
+            [f"zone.{zone}" for zone in ZONES if zone != "home"]
+        )
+        shared = await registry.async_acquire(selected_api, args.token)
+        coordinator = JourneyDataUpdateCoordinator(
+            hass,
+            client=shared.client,
+            origin=trackers[i % len(trackers)],
+            destinations=[destination],
+            budget=shared.budget,
+            resolver=resolver,
+            hub=hub,
+            phase=None if args.aligned else shared.phases.acquire(i),
+        )
+        if coordinator.phase is not None:
+            coordinator.async_restore(
+                {}, timedelta(seconds=coordinator.phase * DEFAULT_STARTUP_STAGGER)
+            )
+        coordinator.update_method = timed(refresh_times, coordinator.update_method)
+        coordinator._find_coordinates = timed(  # type: ignore[method-assign]
+            resolve_times, coordinator._find_coordinates
+        )
+
+        sensor = JourneyTimeSensor(
+            coordinator,
+            SimpleNamespace(
+                entry_id=f"benchmark-{i}",
+                data={CONF_NAME: f"Journey {i}", CONF_DESTINATION: destination},
+            ),
+            destination,
+        )
+        render = timed(render_times, lambda s=sensor: s.extra_state_attributes)
+
+        # A listener makes the coordinator poll on its own schedule
+        coordinator.async_add_listener(render)
+        coordinators.append(coordinator)
+
+    setup_time = time.perf_counter() - setup_start
+
+    tasks = [
+        asyncio.create_task(monitor_loop(lags)),
+        asyncio.create_task(move_trackers(hass, trackers, args.move_period)),
+    ]
+
+    start = time.monotonic()
+    if args.aligned:
+        await asyncio.gather(*(c.async_refresh() for c in coordinators))
+    await asyncio.sleep(args.duration)
+    elapsed = time.monotonic() - start
+    cache_stats = [cache.stats for cache in registry.caches().values()]
+
+    for task in tasks:
+        task.cancel()
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
+    await registry.async_close()
+    await runner.cleanup()
+
+    per_hour = 3600 / elapsed
+    report = [
+        f"Coordinators:          {args.coordinators} ({args.provider})",
+        f"Elapsed:               {elapsed:.0f} s",
+        f"Integration import:    {IMPORT_TIME * 1000:.0f} ms",
+        f"Provider import:       "
+        f"{registry.loader.import_times.get(selected_api, 0) * 1000:.0f} ms",
+        f"Setup:                 {setup_time * 1000:.0f} ms",
+        f"API calls per hour:    {provider.requests * per_hour:.0f}",
+        f"Elements per hour:     {provider.elements * per_hour:.0f}",
+        f"Provider errors:       {provider.errors}",
+        f"Refreshes:             {len(refresh_times)}",
+        f"Refresh latency:       {percentiles(refresh_times)}",
+        f"Location resolution:   {percentiles(resolve_times)}",
+        f"Attribute rendering:   {percentiles(render_times)}",
+        f"Resolver hits/misses:  {resolver.hits}/{resolver.misses}",
+        f"Origin refresh batches: {hub.batches}",
+        *(f"Route cache:           {stats}" for stats in cache_stats),
+        f"Executor jobs:         {executor.jobs} (peak {executor.peak} threads)",
+        f"Event loop blocked:    {sum(lags) * 1000:.0f} ms total, "
+        f"{max(lags, default=0) * 1000:.1f} ms worst",
+    ]
+    sys.stdout.write("\n".join(report) + "\n")
+
+
+def main() -> None:
+    """Parse arguments and run the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--coordinators", type=int, default=50)
+    parser.add_argument("--trackers", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=300, help="seconds")
+    parser.add_argument("--move-period", type=float, default=10, help="seconds")
+    parser.add_argument("--latency", type=float, default=0.2, help="mean, seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--provider", choices=["google", "here"], default="google")
+    parser.add_argument("--token", default="benchmark")
+    parser.add_argument(
+        "--aligned",
+        action="store_true",
+        help="start every coordinator at once, without poll phases",
+    )
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Compile an OpenStreetMap extract into a road graph for the Offline provider.
+
+Reads an OSM XML file (optionally .bz2 or .gz compressed), keeps the roads
+cars can use, and writes the compact graph that the integration memory-maps.
+Speeds come from maxspeed tags where present, otherwise from the road type.
+
+Usage: python scripts/build_road_graph.py region.osm.bz2 /config/region.graph
+
+Then choose the Offline API with /config/region.graph as the token.
+"""
+
+import argparse
+import bz2
+import gzip
+import sys
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from custom_components.journey.helpers import haversine_m  # noqa: E402
+from custom_components.journey.offline import write_graph  # noqa: E402
+
+# Typical speed of each road type when untagged, km/h
+SPEEDS = {
+    "motorway": 110,
+    "motorway_link": 60,
+    "trunk": 90,
+    "trunk_link": 50,
+    "primary": 65,
+    "primary_link": 40,
+    "secondary": 55,
+    "secondary_link": 35,
+    "tertiary": 45,
+    "tertiary_link": 30,
+    "unclassified": 35,
+    "residential": 25,
+    "living_street": 10,
+    "service": 15,
+}
+
+
+def open_extract(path: str):
+    """Open an extract, decompressing it if required."""
+    if path.endswith(".bz2"):
+        return bz2.open(path, "rb")
+    if path.endswith(".gz"):
+        return gzip.open(path, "rb")
+    return open(path, "rb")  # noqa: SIM115
+
+
+def parse_speed(tags: dict[str, str]) -> float | None:
+    """Get a way's speed in m/s, or None if cars can't use it."""
+    if (default := SPEEDS.get(tags.get("highway", ""))) is None:
+        return None
+    if tags.get("access") in ("no", "private"):
+        return None
+
+    speed = float(default)
+    if maxspeed := tags.get("maxspeed"):
+        value, _, unit = maxspeed.partition(" ")
+        if value.isdigit():
+            speed = float(value) * (1.609 if unit == "mph" else 1)
+
+    return speed / 3.6
+
+
+def read_extract(path: str):
+    """Get the node positions and the edges of the car roads in an extract."""
+    positions: dict[int, tuple[float, float]] = {}
+    ways: list[tuple[list[int], float, str]] = []
+
+    with open_extract(path) as file:
+        for _, element in ET.iterparse(file):
+            if element.tag == "node":
+                positions[int(element.attrib["id"])] = (
+                    float(element.attrib["lat"]),
+                    float(element.attrib["lon"]),
+                )
+            elif element.tag == "way":
+                tags = {tag.attrib["k"]: tag.attrib["v"] for tag in element.iter("tag")}
+                if (speed := parse_speed(tags)) is not None:
+                    oneway = tags.get("oneway", "")
+                    if tags.get("highway") == "motorway" and not oneway:
+                        oneway = "yes"
+                    ways.append(
+                        (
+                            [int(nd.attrib["ref"]) for nd in element.iter("nd")],
+                            speed,
+                            oneway,
+                        )
+                    )
+            else:
+                continue
+
+            element.clear()
+
+    # Keep only the nodes on roads, numbered from zero
+    numbers: dict[int, int] = {}
+    points: list[tuple[float, float]] = []
+    edges: list[tuple[int, int, float, float]] = []
+
+    def number(node: int) -> int:
+        if (index := numbers.get(node)) is None:
+            index = numbers[node] = len(points)
+            points.append(positions[node])
+        return index
+
+    for nodes, speed, oneway in ways:
+        nodes = [node for node in nodes if node in positions]
+        if oneway == "-1":
+            nodes.reverse()
+
+        for a, b in zip(nodes, nodes[1:]):
+            metres = haversine_m(positions[a], positions[b])
+            source, target = number(a), number(b)
+            edges.append((source, target, metres / speed, metres))
+            if oneway not in ("yes", "true", "1", "-1"):
+                edges.append((target, source, metres / speed, metres))
+
+    return points, edges
+
+
+def main() -> None:
+    """Compile the extract named on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("extract", help="OSM XML file, optionally .bz2 or .gz")
+    parser.add_argument("graph", help="file to write the compiled graph to")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    points, edges = read_extract(args.extract)
+    write_graph(args.graph, points, edges)
+
+    sys.stdout.write(
+        f"Wrote {len(points)} nodes and {len(edges)} edges to {args.graph} "
+        f"in {time.perf_counter() - start:.1f} s\n"
+    )
+
+
+if __name__ == "__main__":
+    main()
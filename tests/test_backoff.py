@@ -0,0 +1,116 @@
+"""Tests for error classification and backoff."""
+
+import pytest
+
+from custom_components.journey.api import (
+    ApiClient,
+    LocationNotFoundError,
+    QuotaExceededError,
+    TransientApiError,
+    TravelTimeData,
+)
+from custom_components.journey.backoff import (
+    SCHEDULES,
+    TOKEN_THRESHOLDS,
+    Backoff,
+    BackoffApiClient,
+    ErrorClass,
+)
+
+
+def test_errors_below_the_threshold_do_not_back_off() -> None:
+    """A token only backs off once a class reaches its threshold."""
+    backoff = Backoff(TOKEN_THRESHOLDS)
+
+    for _ in range(TOKEN_THRESHOLDS[ErrorClass.TRANSIENT] - 1):
+        assert backoff.record_failure(ErrorClass.TRANSIENT) == 0
+    assert backoff.remaining == 0
+
+    assert backoff.record_failure(ErrorClass.TRANSIENT) > 0
+    assert backoff.error_class is ErrorClass.TRANSIENT
+
+
+def test_quota_errors_back_off_at_once() -> None:
+    """A single quota error is enough, waiting at least the provider's delay."""
+    backoff = Backoff(TOKEN_THRESHOLDS)
+
+    delay = backoff.record_failure(ErrorClass.QUOTA, retry_after=7200)
+
+    assert delay == pytest.approx(7200, abs=1)
+
+
+def test_delays_double_up_to_the_longest() -> None:
+    """Repeated failures double the delay until the schedule's maximum."""
+    backoff = Backoff()
+    first, longest = SCHEDULES[ErrorClass.TRANSIENT]
+
+    delays = [backoff.record_failure(ErrorClass.TRANSIENT) for _ in range(10)]
+
+    assert delays[0] == pytest.approx(first, rel=0.11)
+    assert delays[-1] == pytest.approx(longest, rel=0.11)
+
+
+def test_success_resets() -> None:
+    """Any success clears the backoff and the failure counts."""
+    backoff = Backoff(TOKEN_THRESHOLDS)
+    backoff.record_failure(ErrorClass.AUTH)
+
+    backoff.record_success()
+
+    assert backoff.remaining == 0
+    assert backoff.error_class is None
+    assert not backoff.failures
+
+
+class _FailingClient(ApiClient):
+    def __init__(self, error: Exception) -> None:
+        self.error = error
+        self.calls = 0
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        self.calls += 1
+        raise self.error
+
+    async def test_credentials(self) -> bool:
+        return True
+
+
+async def test_gate_stops_requests_while_backing_off() -> None:
+    """Once a token backs off, requests fail without reaching the client."""
+    client = _FailingClient(QuotaExceededError("over quota"))
+    gate = BackoffApiClient(client)
+
+    with pytest.raises(QuotaExceededError):
+        await gate.async_get_traveltime("a", "b")
+    with pytest.raises(QuotaExceededError) as raised:
+        await gate.async_get_traveltime("a", "b")
+
+    assert client.calls == 1
+    assert raised.value.retry_after is not None
+
+
+async def test_gate_ignores_location_errors() -> None:
+    """A location that can't be found says nothing about the token."""
+    client = _FailingClient(LocationNotFoundError("nowhere"))
+    gate = BackoffApiClient(client)
+
+    for _ in range(5):
+        with pytest.raises(LocationNotFoundError):
+            await gate.async_get_traveltime("a", "b")
+
+    assert client.calls == 5
+    assert gate.backoff.remaining == 0
+
+
+async def test_gate_counts_transient_errors() -> None:
+    """Transient errors only stop the token after several in a row."""
+    client = _FailingClient(TransientApiError("timeout"))
+    gate = BackoffApiClient(client)
+
+    for _ in range(TOKEN_THRESHOLDS[ErrorClass.TRANSIENT] + 1):
+        with pytest.raises(TransientApiError):
+            await gate.async_get_traveltime("a", "b")
+
+    assert client.calls == TOKEN_THRESHOLDS[ErrorClass.TRANSIENT]
@@ -0,0 +1,54 @@
+"""Tests for planning Distance Matrix batches."""
+
+from custom_components.journey.batcher import (
+    MAX_DESTINATIONS,
+    MAX_ORIGINS,
+    _Request,
+    plan_batches,
+)
+
+
+def _pairs(batches: list[list[_Request]]) -> list[list[tuple[str, str]]]:
+    return [[(r.origin, r.destination) for r in batch] for batch in batches]
+
+
+async def test_same_origin_is_one_row() -> None:
+    """Requests from one origin share a batch."""
+    requests = [_Request("o", f"d{i}", 1) for i in range(3)]
+
+    assert _pairs(plan_batches(requests)) == [[("o", "d0"), ("o", "d1"), ("o", "d2")]]
+
+
+async def test_same_destination_is_one_column() -> None:
+    """Requests to one destination from many origins share a batch."""
+    requests = [_Request(f"o{i}", "d", 1) for i in range(3)]
+
+    assert _pairs(plan_batches(requests)) == [[("o0", "d"), ("o1", "d"), ("o2", "d")]]
+
+
+async def test_unrelated_requests_are_not_crossed() -> None:
+    """Requests sharing neither end go in separate batches, never a full matrix."""
+    requests = [_Request("o1", "d1", 1), _Request("o2", "d2", 1)]
+
+    assert sorted(_pairs(plan_batches(requests))) == [
+        [("o1", "d1")],
+        [("o2", "d2")],
+    ]
+
+
+async def test_batches_are_split_at_the_api_limits() -> None:
+    """A row or column longer than the API allows is chunked."""
+    row = [_Request("o", f"d{i}", 1) for i in range(MAX_DESTINATIONS + 1)]
+    column = [_Request(f"o{i}", "d", 1) for i in range(MAX_ORIGINS + 1)]
+
+    assert [len(batch) for batch in plan_batches(row)] == [MAX_DESTINATIONS, 1]
+    assert [len(batch) for batch in plan_batches(column)] == [MAX_ORIGINS, 1]
+
+
+async def test_every_request_is_planned_once() -> None:
+    """No request is lost or duplicated."""
+    requests = [_Request(f"o{i % 4}", f"d{i % 7}", 1) for i in range(40)]
+
+    planned = [request for batch in plan_batches(requests) for request in batch]
+
+    assert sorted(map(id, planned)) == sorted(map(id, requests))
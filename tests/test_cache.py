@@ -0,0 +1,127 @@
+"""Tests for the route cache."""
+
+import time
+
+import pytest
+
+from custom_components.journey.api import ApiClient, TravelTimeData
+from custom_components.journey.cache import (
+    REQUEST_MAX_AGE,
+    CachingApiClient,
+    RouteCache,
+    quantise,
+)
+
+
+class _Client(ApiClient):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        self.calls += 1
+        return TravelTimeData(600, 600, 5000)
+
+    async def test_credentials(self) -> bool:
+        return True
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> list[float]:
+    """Control time.monotonic, returning the list holding the current time."""
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_quantise_coordinates() -> None:
+    """Coordinates are rounded to the precision."""
+    assert quantise("51.501234,-0.141987", 3) == "51.501,-0.142"
+    assert quantise("51.5, -0.14", 2) == "51.50,-0.14"
+
+
+def test_quantise_address() -> None:
+    """Anything else is normalised for case and whitespace."""
+    assert quantise("  10 Downing   Street ", 4) == "10 downing street"
+
+
+def test_nearby_points_share_an_entry(clock: list[float]) -> None:
+    """Points rounding to the same key hit the same entry."""
+    cache = RouteCache(precision=3)
+    data = TravelTimeData(600, 600, 5000)
+
+    cache.put("51.50012,-0.14001", "51.6,-0.2", data)
+
+    assert cache.get("51.50049,-0.14049", "51.6,-0.2") is data
+    assert cache.get("51.5006,-0.14", "51.6,-0.2") is None
+
+
+def test_entries_expire(clock: list[float]) -> None:
+    """An entry is dropped once its TTL has passed."""
+    cache = RouteCache(min_ttl=60, max_ttl=900)
+    data = TravelTimeData(600, 600, 5000)
+    cache.put("a", "b", data)
+
+    clock[0] += 899
+    assert cache.get("a", "b") is data
+
+    clock[0] += 2
+    assert cache.get("a", "b") is None
+    assert len(cache) == 0
+
+
+def test_ttl_shrinks_with_traffic() -> None:
+    """Heavier traffic gives a shorter TTL, down to the minimum."""
+    cache = RouteCache(min_ttl=60, max_ttl=900)
+
+    free = cache.ttl(TravelTimeData(600, 600, 5000))
+    slow = cache.ttl(TravelTimeData(600, 900, 5000))
+    jammed = cache.ttl(TravelTimeData(600, 60000, 5000))
+
+    assert free == 900
+    assert 60 < slow < free
+    assert jammed == 60
+
+
+def test_least_recently_used_is_evicted(clock: list[float]) -> None:
+    """The cache holds at most max_size entries."""
+    cache = RouteCache(max_size=2)
+    data = TravelTimeData(600, 600, 5000)
+    cache.put("a", "x", data)
+    cache.put("b", "x", data)
+    cache.get("a", "x")
+    cache.put("c", "x", data)
+
+    assert cache.get("b", "x") is None
+    assert cache.get("a", "x") is data
+    assert cache.evictions == 1
+
+
+def test_max_age_passes_over_older_results(clock: list[float]) -> None:
+    """A caller can ask for fresher results than the TTL allows."""
+    cache = RouteCache(min_ttl=60, max_ttl=900)
+    data = TravelTimeData(600, 600, 5000)
+    cache.put("a", "b", data)
+
+    clock[0] += 180
+    assert cache.get("a", "b", max_age=120) is None
+    assert cache.get("a", "b", max_age=300) is data
+    assert cache.get("a", "b") is data
+
+
+async def test_request_max_age(clock: list[float]) -> None:
+    """The caching client honours the max age set for the request."""
+    client = _Client()
+    caching = CachingApiClient(client, RouteCache())
+    await caching.async_get_traveltime("a", "b")
+
+    clock[0] += 180
+    await caching.async_get_traveltime("a", "b")
+    token = REQUEST_MAX_AGE.set(120)
+    try:
+        await caching.async_get_traveltime("a", "b")
+    finally:
+        REQUEST_MAX_AGE.reset(token)
+
+    assert client.calls == 2
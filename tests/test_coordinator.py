@@ -0,0 +1,157 @@
+"""Tests for the journey coordinator."""
+
+import time
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.journey.api import ApiClient, TravelTimeData
+from custom_components.journey.cache import CachingApiClient, RouteCache
+from custom_components.journey.const import DEFAULT_PREDICTION_MAX_AGE
+from custom_components.journey.coordinator import JourneyDataUpdateCoordinator
+
+
+class _Client(ApiClient):
+    def __init__(self) -> None:
+        self.calls = 0
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        self.calls += 1
+        return TravelTimeData(600, 660, 5000)
+
+    async def test_credentials(self) -> bool:
+        return True
+
+
+async def test_restore_always_schedules_a_refresh(hass: HomeAssistant) -> None:
+    """A zero startup delay would turn polling off."""
+    coordinator = JourneyDataUpdateCoordinator(
+        hass, client=_Client(), origin="device_tracker.a", destinations=["zone.b"]
+    )
+
+    coordinator.async_restore({}, timedelta(0))
+
+    assert coordinator.update_interval
+    assert coordinator.update_interval > timedelta(0)
+    await coordinator.async_shutdown()
+
+
+async def test_missing_destination_only_fails_its_leg(hass: HomeAssistant) -> None:
+    """Other destinations are still routed when one can't be found."""
+    hass.states.async_set(
+        "device_tracker.a", "not_home", {"latitude": 1.0, "longitude": 2.0}
+    )
+    hass.states.async_set(
+        "device_tracker.b", "not_home", {"latitude": 1.5, "longitude": 2.5}
+    )
+    coordinator = JourneyDataUpdateCoordinator(
+        hass,
+        client=_Client(),
+        origin="device_tracker.a",
+        destinations=["device_tracker.b", "device_tracker.missing"],
+    )
+
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert list(coordinator.data) == ["device_tracker.b"]
+    await coordinator.async_shutdown()
+
+
+async def test_prediction_keeps_the_next_poll(hass: HomeAssistant) -> None:
+    """Small moves are predicted without putting the next poll off."""
+    hass.states.async_set(
+        "device_tracker.a", "not_home", {"latitude": 1.0, "longitude": 2.0}
+    )
+    hass.states.async_set(
+        "device_tracker.b", "not_home", {"latitude": 1.5, "longitude": 2.5}
+    )
+    coordinator = JourneyDataUpdateCoordinator(
+        hass,
+        client=_Client(),
+        origin="device_tracker.a",
+        destinations=["device_tracker.b"],
+    )
+    coordinator.async_add_listener(lambda: None)
+    await coordinator.async_refresh()
+
+    with patch.object(coordinator, "_schedule_refresh") as schedule_refresh:
+        hass.states.async_set(
+            "device_tracker.a", "not_home", {"latitude": 1.001, "longitude": 2.0}
+        )
+        await hass.async_block_till_done()
+
+    assert coordinator.metrics.predictions == 1
+    assert coordinator.metrics.refreshes == 1
+    assert coordinator.data["device_tracker.b"].travel_time.travel_time_secs < 600
+    schedule_refresh.assert_not_called()
+    await coordinator.async_shutdown()
+
+
+async def test_old_journeys_are_not_predicted_from(hass: HomeAssistant) -> None:
+    """Moving from journeys restored from long ago needs a refresh."""
+    hass.states.async_set(
+        "device_tracker.a", "not_home", {"latitude": 1.0, "longitude": 2.0}
+    )
+    hass.states.async_set(
+        "device_tracker.b", "not_home", {"latitude": 1.5, "longitude": 2.5}
+    )
+    coordinators = [
+        JourneyDataUpdateCoordinator(
+            hass,
+            client=_Client(),
+            origin="device_tracker.a",
+            destinations=["device_tracker.b"],
+        )
+        for _ in range(2)
+    ]
+    await coordinators[0].async_refresh()
+    await coordinators[0].async_shutdown()
+
+    coordinator = coordinators[1]
+    coordinator.async_restore(
+        coordinators[0].data,
+        timedelta(minutes=1),
+        age=DEFAULT_PREDICTION_MAX_AGE + 1,
+    )
+    hass.states.async_set(
+        "device_tracker.a", "not_home", {"latitude": 1.001, "longitude": 2.0}
+    )
+    await hass.async_block_till_done()
+
+    assert coordinator.metrics.predictions == 0
+    assert coordinator.metrics.refreshes == 1
+    await coordinator.async_shutdown()
+
+
+@pytest.mark.parametrize(("interval", "calls"), [(1, 1), (5, 0)])
+async def test_cached_results_are_fresher_than_polls(
+    hass: HomeAssistant, interval: int, calls: int
+) -> None:
+    """A result cached before the last poll is only used by slower polls."""
+    hass.states.async_set(
+        "device_tracker.a", "not_home", {"latitude": 1.0, "longitude": 2.0}
+    )
+    hass.states.async_set(
+        "device_tracker.b", "not_home", {"latitude": 1.5, "longitude": 2.5}
+    )
+    client, cache = _Client(), RouteCache()
+    with patch.object(time, "monotonic", return_value=time.monotonic() - 90):
+        cache.put("1.0,2.0", "1.5,2.5", TravelTimeData(600, 660, 5000))
+    coordinator = JourneyDataUpdateCoordinator(
+        hass,
+        client=CachingApiClient(client, cache),
+        origin="device_tracker.a",
+        destinations=["device_tracker.b"],
+    )
+    coordinator.update_interval = timedelta(minutes=interval)
+
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success
+    assert client.calls == calls
+    await coordinator.async_shutdown()
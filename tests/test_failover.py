@@ -0,0 +1,101 @@
+"""Tests for failover between providers."""
+
+import pytest
+
+from custom_components.journey.api import (
+    ApiClient,
+    TravelTimeApiError,
+    TravelTimeData,
+)
+from custom_components.journey.cache import CachingApiClient, RouteCache
+from custom_components.journey.failover import (
+    BREAKER_THRESHOLD,
+    FailoverApiClient,
+    HealthApiClient,
+    ProviderHealth,
+)
+
+
+class _Client(ApiClient):
+    def __init__(self, result: TravelTimeData | None = None) -> None:
+        self.result = result
+        self.calls = 0
+
+    async def async_get_traveltime(
+        self, origin: str, destination: str
+    ) -> TravelTimeData:
+        self.calls += 1
+        if self.result is None:
+            raise TravelTimeApiError("Unavailable")
+
+        return self.result
+
+    async def test_credentials(self) -> bool:
+        return True
+
+
+def _stack(client: ApiClient, health: ProviderHealth) -> ApiClient:
+    """Put a client under a cache the way the registry does."""
+    return CachingApiClient(HealthApiClient(client, health), RouteCache())
+
+
+async def test_cache_hits_are_not_scored() -> None:
+    """Only requests reaching the provider count towards its latency."""
+    health = ProviderHealth()
+    client = _stack(_Client(TravelTimeData(600, 660, 5000)), health)
+
+    for _ in range(3):
+        await client.async_get_traveltime("a", "b")
+
+    assert health.latency.count == 1
+
+
+async def test_fails_over_to_the_secondary() -> None:
+    """A failing primary is answered for by the secondary."""
+    primary, secondary = _Client(), _Client(TravelTimeData(600.4, 660.6, 5000.2))
+    primary_health, secondary_health = ProviderHealth(), ProviderHealth()
+    client = FailoverApiClient(
+        _stack(primary, primary_health),
+        _stack(secondary, secondary_health),
+        primary_health,
+        secondary_health,
+    )
+
+    result = await client.async_get_traveltime("a", "b")
+
+    assert result == TravelTimeData(600, 661, 5000)
+    assert client.failovers == 1
+    assert primary_health.breaker.failures == 1
+    assert secondary_health.breaker.failures == 0
+
+
+async def test_open_breaker_skips_the_primary() -> None:
+    """Once the primary has failed enough, it isn't asked at all."""
+    primary, secondary = _Client(), _Client(TravelTimeData(600, 660, 5000))
+    primary_health, secondary_health = ProviderHealth(), ProviderHealth()
+    client = FailoverApiClient(
+        HealthApiClient(primary, primary_health),
+        HealthApiClient(secondary, secondary_health),
+        primary_health,
+        secondary_health,
+    )
+
+    for _ in range(BREAKER_THRESHOLD + 1):
+        await client.async_get_traveltime("a", "b")
+
+    assert primary.calls == BREAKER_THRESHOLD
+    assert primary_health.breaker.state == "open"
+
+
+async def test_both_failing_raises() -> None:
+    """The primary's error is reported when neither provider answers."""
+    primary_health, secondary_health = ProviderHealth(), ProviderHealth()
+    client = FailoverApiClient(
+        HealthApiClient(_Client(), primary_health),
+        HealthApiClient(_Client(), secondary_health),
+        primary_health,
+        secondary_health,
+    )
+
+    with pytest.raises(TravelTimeApiError):
+        await client.async_get_traveltime("a", "b")
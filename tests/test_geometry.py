@@ -0,0 +1,43 @@
+"""Tests for route shapes."""
+
+import pytest
+
+from custom_components.journey.geometry import (
+    RouteGeometry,
+    decode_flexible_polyline,
+    decode_polyline,
+)
+
+
+def test_decode_polyline() -> None:
+    """Google's documented example decodes to its three points."""
+    points = decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    assert points == pytest.approx(
+        [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    )
+
+
+def test_decode_flexible_polyline() -> None:
+    """HERE's documented example decodes to its four points."""
+    points = decode_flexible_polyline("BFoz5xJ67i1B1B7PzIhaxL7Y")
+
+    assert points == pytest.approx(
+        [
+            (50.10228, 8.69821),
+            (50.10201, 8.69567),
+            (50.10063, 8.69150),
+            (50.09878, 8.68752),
+        ]
+    )
+
+
+def test_locate_along_route() -> None:
+    """A point near the route is placed by time and distance from its start."""
+    route = RouteGeometry.from_sections([([(0.0, 0.0), (0.0, 0.01), (0.0, 0.02)], 100)])
+
+    offset, elapsed, distance = route.locate((0.0001, 0.015))
+
+    assert offset == pytest.approx(11, abs=1)
+    assert elapsed == pytest.approx(75)
+    assert distance == pytest.approx(0.75 * route.distances[-1])
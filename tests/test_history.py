@@ -0,0 +1,64 @@
+"""Tests for travel time history and profiles."""
+
+from datetime import datetime, timedelta
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.journey.api import TravelTimeData
+from custom_components.journey.const import (
+    DEFAULT_CACHE_MAX_TTL,
+    DEFAULT_PROFILE_MIN_SAMPLES,
+)
+from custom_components.journey.history import MATCHES_REQUIRED, RouteHistory
+
+START = datetime(2026, 1, 5, 3, 0, tzinfo=dt_util.UTC)
+
+
+def test_cached_repeats_are_recorded_once() -> None:
+    """An equal result soon after the last one is not a new observation."""
+    history = RouteHistory()
+
+    history.record(START, TravelTimeData(600, 660, 5000))
+    history.record(START + timedelta(minutes=1), TravelTimeData(600, 660, 5000))
+
+    assert len(history) == 1
+
+
+def test_equal_results_later_are_recorded() -> None:
+    """An equal result once any cached copy has expired is recorded."""
+    history = RouteHistory()
+    later = START + timedelta(seconds=DEFAULT_CACHE_MAX_TTL)
+
+    history.record(START, TravelTimeData(600, 660, 5000))
+    history.record(later, TravelTimeData(600, 660, 5000))
+
+    assert len(history) == 2
+
+
+def test_quiet_slot_is_predicted() -> None:
+    """A slot whose recent results match its profile is predicted."""
+    history = RouteHistory()
+    weeks = DEFAULT_PROFILE_MIN_SAMPLES + MATCHES_REQUIRED
+    for week in range(weeks):
+        history.record(START + timedelta(weeks=week), TravelTimeData(600, 660, 5000))
+
+    last = START + timedelta(weeks=weeks - 1)
+    prediction = history.predict(last + timedelta(minutes=5))
+
+    assert prediction == TravelTimeData(600, 660, 5000)
+    assert history.predict(last + timedelta(hours=1)) is None
+
+
+def test_round_trip() -> None:
+    """A stored history gives the same profile back."""
+    history = RouteHistory()
+    for week in range(DEFAULT_PROFILE_MIN_SAMPLES):
+        history.record(
+            START + timedelta(weeks=week), TravelTimeData(600, 600 + week, 5000)
+        )
+
+    restored = RouteHistory.from_dict(history.as_dict())
+
+    slot = history.slots[0]
+    assert len(restored) == len(history)
+    assert restored.typical(slot) == history.typical(slot)
@@ -0,0 +1,71 @@
+"""Tests for setting up and unloading entries."""
+
+from pathlib import Path
+
+import pytest
+from homeassistant.config_entries import ConfigEntryState
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.journey.const import (
+    CONF_API_TOKEN,
+    CONF_DEPARTURE_WINDOWS,
+    CONF_DESTINATION,
+    CONF_NAME,
+    CONF_ORIGIN,
+    CONF_SELECTED_API,
+    CONF_SELECTED_API_OFFLINE,
+    DOMAIN,
+)
+from custom_components.journey.offline import write_graph
+from custom_components.journey.registry import async_get_registry
+
+
+def _entry(tmp_path: Path, **data) -> MockConfigEntry:
+    path = str(tmp_path / "graph.bin")
+    write_graph(path, [(51.5, -0.2), (51.51, -0.19)], [(0, 1, 120.0, 1300.0)])
+    return MockConfigEntry(
+        domain=DOMAIN,
+        version=3,
+        data={
+            CONF_NAME: "Work",
+            CONF_API_TOKEN: path,
+            CONF_SELECTED_API: CONF_SELECTED_API_OFFLINE,
+            CONF_ORIGIN: "device_tracker.a",
+            CONF_DESTINATION: "zone.home",
+            **data,
+        },
+    )
+
+
+@pytest.mark.usefixtures("enable_custom_integrations")
+async def test_unload_releases_the_client(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, tmp_path: Path
+) -> None:
+    """The shared client is closed once its only entry unloads."""
+    entry = _entry(tmp_path)
+    entry.add_to_hass(hass)
+
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    assert len(async_get_registry(hass)) == 1
+
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert len(async_get_registry(hass)) == 0
+
+
+@pytest.mark.usefixtures("enable_custom_integrations")
+async def test_failed_setup_releases_the_client(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, tmp_path: Path
+) -> None:
+    """A setup failing after the client was acquired doesn't keep it."""
+    entry = _entry(tmp_path, **{CONF_DEPARTURE_WINDOWS: ["not a window"]})
+    entry.add_to_hass(hass)
+
+    assert not await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+
+    assert entry.state is ConfigEntryState.SETUP_ERROR
+    assert len(async_get_registry(hass)) == 0
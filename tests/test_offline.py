@@ -0,0 +1,118 @@
+"""Tests for routing over a compiled road graph."""
+
+import heapq
+import math
+import random
+from pathlib import Path
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+
+from custom_components.journey.const import CONF_SELECTED_API_OFFLINE
+from custom_components.journey.history import ProfileApiClient, async_get_history
+from custom_components.journey.offline import RoadGraph, write_graph
+from custom_components.journey.registry import ApiClientRegistry
+
+
+def _dijkstra(
+    edges: list[tuple[int, int, float, float]], source: int, target: int
+) -> float:
+    neighbours: dict[int, list[tuple[int, float]]] = {}
+    for a, b, seconds, _ in edges:
+        neighbours.setdefault(a, []).append((b, seconds))
+
+    distances = {source: 0.0}
+    heap = [(0.0, source)]
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if node == target:
+            return distance
+        if distance > distances[node]:
+            continue
+        for neighbour, seconds in neighbours.get(node, ()):
+            if distance + seconds < distances.get(neighbour, math.inf):
+                distances[neighbour] = distance + seconds
+                heapq.heappush(heap, (distance + seconds, neighbour))
+
+    return math.inf
+
+
+def _graph(tmp_path: Path, seed: int = 1):
+    rng = random.Random(seed)
+    points = [
+        (51.5 + rng.random() * 0.1, -0.2 + rng.random() * 0.1) for _ in range(300)
+    ]
+    edges = []
+    for _ in range(900):
+        a, b = rng.randrange(len(points)), rng.randrange(len(points))
+        if a == b:
+            continue
+        metres = math.dist(points[a], points[b]) * 111_000
+        edges.append((a, b, metres / rng.uniform(5, 30), metres))
+
+    path = str(tmp_path / "graph.bin")
+    write_graph(path, points, edges)
+    return points, edges, RoadGraph(path)
+
+
+def test_route_is_quickest(tmp_path: Path) -> None:
+    """Bidirectional A* finds the same times as a plain Dijkstra search."""
+    points, edges, graph = _graph(tmp_path)
+    nodes = [graph.nearest(*point) for point in points]
+    rng = random.Random(2)
+
+    for _ in range(100):
+        source, target = rng.randrange(len(points)), rng.randrange(len(points))
+        route = graph.route(nodes[source], nodes[target])
+        expected = _dijkstra(edges, source, target)
+
+        if math.isinf(expected):
+            assert route is None
+        else:
+            assert route is not None
+            assert route[0][0] == nodes[source]
+            assert route[-1][0] == nodes[target]
+            assert math.isclose(
+                sum(seconds for _, seconds, _ in route), expected, rel_tol=1e-4
+            )
+
+
+def test_nearest_node(tmp_path: Path) -> None:
+    """Each point maps back to its own node, and nowhere maps to nothing."""
+    points, _, graph = _graph(tmp_path)
+
+    nodes = {graph.nearest(*point) for point in points}
+
+    assert len(nodes) == len(points)
+    assert graph.nearest(0.0, 0.0) is None
+
+
+async def test_client_stack(hass: HomeAssistant, tmp_path: Path) -> None:
+    """Free-flow results pass the shared client's cache and get traffic added."""
+    points, edges, graph = _graph(tmp_path)
+    source, target = edges[0][:2]
+    origin, destination = (
+        f"{lat},{long}" for lat, long in (points[source], points[target])
+    )
+    # The threaded resolver leaves no thread behind once the session is closed
+    registry = ApiClientRegistry(
+        hass,
+        create_session=lambda: aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(resolver=aiohttp.ThreadedResolver())
+        ),
+    )
+    path = str(tmp_path / "graph.bin")
+    shared = await registry.async_acquire(CONF_SELECTED_API_OFFLINE, path)
+    client = ProfileApiClient(
+        shared.client, await async_get_history(hass), CONF_SELECTED_API_OFFLINE
+    )
+
+    try:
+        first = await client.async_get_traveltime(origin, destination)
+        second = await client.async_get_traveltime(origin, destination)
+    finally:
+        await registry.async_close()
+
+    assert first.travel_time_traffic_secs == first.travel_time_secs > 0
+    assert second == first
+    assert shared.cache.hits == 1
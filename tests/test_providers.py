@@ -0,0 +1,46 @@
+"""Tests for loading providers."""
+
+from collections.abc import Generator
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.journey import offline
+from custom_components.journey.const import CONF_SELECTED_API_OFFLINE
+from custom_components.journey.providers import (
+    PROVIDERS,
+    Provider,
+    ProviderLoader,
+    register_provider,
+)
+
+
+@pytest.fixture
+def external() -> Generator[str]:
+    """Register a provider outside this package, by its absolute module."""
+    register_provider("External", Provider("custom_components.journey.offline"))
+    yield "External"
+    del PROVIDERS["External"]
+
+
+async def test_builtin_provider(hass: HomeAssistant) -> None:
+    """A built-in provider is imported relative to the package."""
+    loader = ProviderLoader(hass)
+
+    factory = await loader.async_get_factory(CONF_SELECTED_API_OFFLINE)
+
+    assert factory is offline.create_client
+    assert loader.async_loaded(CONF_SELECTED_API_OFFLINE)
+
+
+async def test_registered_provider(hass: HomeAssistant, external: str) -> None:
+    """A registered provider can live in any importable module."""
+    loader = ProviderLoader(hass)
+
+    assert await loader.async_get_factory(external) is offline.create_client
+
+
+async def test_unknown_provider(hass: HomeAssistant) -> None:
+    """Asking for a provider nobody registered fails."""
+    with pytest.raises(ValueError):
+        await ProviderLoader(hass).async_get_factory("Unknown")
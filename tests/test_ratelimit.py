@@ -0,0 +1,74 @@
+"""Tests for rate limiting and collapsing requests."""
+
+import asyncio
+import time
+
+import pytest
+
+from custom_components.journey.ratelimit import RequestQueue, TokenBucket
+
+
+def test_bucket_allows_a_burst(monkeypatch: pytest.MonkeyPatch) -> None:
+    """A full bucket sends its capacity at once, then waits for the rate."""
+    monkeypatch.setattr(time, "monotonic", lambda: 100.0)
+    bucket = TokenBucket(rate=2, capacity=3)
+
+    for _ in range(3):
+        assert bucket.delay() == 0
+        bucket.take()
+
+    assert bucket.delay() == pytest.approx(0.5)
+
+
+def test_bucket_refills_up_to_capacity(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Tokens accrue at the rate, but never beyond the capacity."""
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.take()
+    bucket.take()
+
+    now[0] += 0.25
+    assert bucket.delay() == pytest.approx(0.75)
+
+    now[0] += 60
+    bucket.take()
+    bucket.take()
+    assert bucket.delay() == pytest.approx(1)
+
+
+async def test_requests_with_one_key_are_collapsed() -> None:
+    """A request queued under a waiting key replaces it, and both get its result."""
+    queue = RequestQueue(TokenBucket(rate=1000, capacity=1000))
+    calls: list[str] = []
+
+    async def request(name: str) -> str:
+        calls.append(name)
+        return name
+
+    results = await asyncio.gather(
+        queue.async_submit("key", 1, lambda: request("old")),
+        queue.async_submit("key", 1, lambda: request("new")),
+        queue.async_submit("other", 1, lambda: request("other")),
+    )
+
+    assert results == ["new", "new", "other"]
+    assert sorted(calls) == ["new", "other"]
+
+
+async def test_higher_priority_goes_first() -> None:
+    """Requests waiting for the limit are released in priority order."""
+    queue = RequestQueue(TokenBucket(rate=1000, capacity=1))
+    calls: list[str] = []
+
+    async def request(name: str) -> str:
+        calls.append(name)
+        return name
+
+    await asyncio.gather(
+        queue.async_submit("a", 1, lambda: request("routine 1")),
+        queue.async_submit("b", 1, lambda: request("routine 2")),
+        queue.async_submit("c", 0, lambda: request("forced")),
+    )
+
+    assert calls == ["forced", "routine 1", "routine 2"]
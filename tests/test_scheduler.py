@@ -0,0 +1,39 @@
+"""Tests for spreading polls over the interval."""
+
+from custom_components.journey.scheduler import PhaseAllocator
+
+
+def test_no_phase_is_zero() -> None:
+    """A zero phase would mean a zero startup delay, which stops polling."""
+    phases = PhaseAllocator()
+
+    assert all(phases.acquire(key) > 0 for key in range(100))
+
+
+def test_phases_are_spread_out() -> None:
+    """However many users there are, no two phases are close together."""
+    phases = PhaseAllocator()
+
+    for count in (2, 5, 10, 50):
+        values = sorted(phases.acquire(key) for key in range(count))
+        gaps = [b - a for a, b in zip(values, values[1:])]
+        assert min(gaps) > 0.3 / count
+
+
+def test_phase_is_kept_per_user() -> None:
+    """Acquiring again returns the same phase."""
+    phases = PhaseAllocator()
+
+    assert phases.acquire("a") == phases.acquire("a")
+    assert len(phases) == 1
+
+
+def test_released_phases_are_reused() -> None:
+    """A freed phase goes to the next new user."""
+    phases = PhaseAllocator()
+    first = phases.acquire("a")
+    phases.acquire("b")
+
+    phases.release("a")
+
+    assert phases.acquire("c") == first
@@ -0,0 +1,70 @@
+"""Tests for the service actions."""
+
+from pathlib import Path
+from typing import Any
+
+import pytest
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+from pytest_homeassistant_custom_component.test_util.aiohttp import (
+    AiohttpClientMocker,
+)
+
+from custom_components.journey.const import (
+    CONF_API_TOKEN,
+    CONF_DESTINATION,
+    CONF_NAME,
+    CONF_ORIGIN,
+    CONF_SELECTED_API,
+    CONF_SELECTED_API_OFFLINE,
+    DOMAIN,
+)
+from custom_components.journey.offline import write_graph
+from custom_components.journey.services import SERVICE_GET_TRAVEL_TIMES
+
+START, END = "51.5,-0.2", "51.51,-0.19"
+
+
+@pytest.mark.usefixtures("enable_custom_integrations")
+async def test_get_travel_times(
+    hass: HomeAssistant, aioclient_mock: AiohttpClientMocker, tmp_path: Path
+) -> None:
+    """Every pair is routed, and a location that can't be found fails its own."""
+    path = str(tmp_path / "graph.bin")
+    write_graph(path, [(51.5, -0.2), (51.51, -0.19)], [(0, 1, 120.0, 1300.0)])
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        version=3,
+        data={
+            CONF_NAME: "Work",
+            CONF_API_TOKEN: path,
+            CONF_SELECTED_API: CONF_SELECTED_API_OFFLINE,
+            CONF_ORIGIN: "device_tracker.a",
+            CONF_DESTINATION: "zone.home",
+        },
+    )
+    entry.add_to_hass(hass)
+    assert await hass.config_entries.async_setup(entry.entry_id)
+
+    # Nested JSON, as the caller of the action sees it
+    response: Any = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_TRAVEL_TIMES,
+        {"origins": [START, "device_tracker.missing"], "destinations": [END]},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response is not None
+    travel_times = response["travel_times"]
+    assert travel_times[START][END] == {
+        "duration": 120,
+        "duration_in_traffic": 120,
+        "distance": 1300,
+        "delay_minutes": 0,
+        "eta": travel_times[START][END]["eta"],
+    }
+    assert "error" in travel_times["device_tracker.missing"][END]
+    assert "error" in response["locations"]["device_tracker.missing"]
+
+    assert await hass.config_entries.async_unload(entry.entry_id)